@@ -0,0 +1,174 @@
+"""
+Bytes on the wire and end-to-end time of inserts and vector fetches, with
+and without gzip bodies, against a local server throttled to a given
+bandwidth
+
+    python -m benchmarks.compression --rows 20000 --dim 128 --mbps 200
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from http_request.handler import HttpHandler
+
+COLLECTION = "benchmark"
+
+
+class _Link:
+    """
+    Byte counters and throttle of the simulated link
+    """
+    def __init__(self, mbps: float, dim: int):
+        self.bytes_per_second = mbps * 1e6 / 8
+        self.dim = dim
+        self.received = 0
+        self.sent = 0
+        self.gzip_responses = True
+        self.vectors = dict()
+        self.lock = threading.Lock()
+
+    def transfer(self, size: int):
+        time.sleep(size / self.bytes_per_second)
+
+
+def _server(link: _Link):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, code, document):
+            body = json.dumps(document).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            accept = self.headers.get("Accept-Encoding", "")
+            if link.gzip_responses and "gzip" in accept:
+                body = gzip.compress(body, 6)
+                headers["Content-Encoding"] = "gzip"
+            link.transfer(len(body))
+            with link.lock:
+                link.sent += len(body)
+            self.send_response(code)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            data = self.rfile.read(int(self.headers["Content-Length"]))
+            link.transfer(len(data))
+            with link.lock:
+                link.received += len(data)
+            if self.headers.get("Content-Encoding") == "gzip":
+                data = gzip.decompress(data)
+            return json.loads(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/collections/" + COLLECTION:
+                return self._reply(
+                    200, {
+                        "collection_name": COLLECTION,
+                        "dimension": link.dim,
+                        "index_file_size": 1024,
+                        "metric_type": "L2"
+                    })
+
+            ids = parse_qs(url.query)["ids"][0].split(",")
+            self._reply(
+                200, {
+                    "vectors": [{
+                        "id": i,
+                        "vector": link.vectors[int(i)]
+                    } for i in ids]
+                })
+
+        def do_POST(self):
+            vectors = self._body()["vectors"]
+            with link.lock:
+                start = len(link.vectors)
+                for offset, vector in enumerate(vectors):
+                    link.vectors[start + offset] = vector
+            self._reply(201, {
+                "ids": [str(start + offset) for offset in range(len(vectors))]
+            })
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(args, compression):
+    link = _Link(args.mbps, args.dim)
+    link.gzip_responses = compression is not None
+    server = _server(link)
+    handler = HttpHandler(host="127.0.0.1",
+                          port=server.server_address[1],
+                          compression=compression)
+
+    data = np.random.default_rng(0).random(
+        (args.rows, args.dim), dtype=np.float32)
+    start = time.monotonic()
+    for offset in range(0, args.rows, args.batch):
+        status, _ = handler.add_vectors(COLLECTION,
+                                        data[offset:offset + args.batch],
+                                        validate=False)
+        assert status.ok(), status
+    insert_seconds = time.monotonic() - start
+    insert_bytes = link.received
+
+    ids = list(range(min(args.fetch, args.rows)))
+    start = time.monotonic()
+    status, _ = handler.get_vectors_by_ids(COLLECTION, ids, timeout=60)
+    assert status.ok(), status
+    fetch_seconds = time.monotonic() - start
+    server.shutdown()
+
+    return {
+        "compression": "off" if compression is None else
+        "gzip-{}".format(compression["level"]),
+        "insert_bytes": insert_bytes,
+        "insert_seconds": round(insert_seconds, 3),
+        "fetch_bytes": link.sent,
+        "fetch_seconds": round(fetch_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--fetch", type=int, default=2000,
+                        help="vectors fetched by id")
+    parser.add_argument("--mbps", type=float, default=200,
+                        help="simulated link bandwidth")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6])
+    parser.add_argument("--json", action="store_true",
+                        help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = [run(args, None)] + [
+        run(args, {"threshold": 64 * 1024, "level": level})
+        for level in args.levels
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("{:<12} {:>14} {:>10} {:>14} {:>10}".format(
+        "compression", "insert bytes", "insert s", "fetch bytes", "fetch s"))
+    for result in results:
+        print("{compression:<12} {insert_bytes:>14} {insert_seconds:>10} "
+              "{fetch_bytes:>14} {fetch_seconds:>10}".format(**result))
+
+
+if __name__ == "__main__":
+    main()
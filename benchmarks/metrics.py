@@ -0,0 +1,113 @@
+"""
+Throughput of the distance kernels of every MetricType and of top k
+selection, against straightforward NumPy versions
+
+    python -m benchmarks.metrics --rows 100000 --queries 100 --dim 128
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from http_request import metrics
+from http_request.constants import MetricType
+
+
+def _naive_l2(queries, vectors):
+    return ((queries[:, None, :] - vectors[None, :, :])**2).sum(axis=2)
+
+
+def _naive_hamming(queries, vectors):
+    query_bits = np.unpackbits(queries, axis=1).astype(bool)
+    vector_bits = np.unpackbits(vectors, axis=1).astype(bool)
+    return (query_bits[:, None, :] ^ vector_bits[None, :, :]).sum(axis=2)
+
+
+def _naive_top_k(distances, k):
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+def _best(function, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(args):
+    rng = np.random.default_rng(0)
+    floats = rng.random((args.rows, args.dim), dtype=np.float32)
+    float_queries = rng.random((args.queries, args.dim), dtype=np.float32)
+    width = args.dim // 8
+    packed = rng.integers(0, 256, (args.rows, width), dtype=np.uint8)
+    packed_queries = rng.integers(0, 256, (args.queries, width),
+                                  dtype=np.uint8)
+    pairs = args.rows * args.queries
+
+    cases = []
+    for metric in MetricType:
+        if metric == MetricType.INVALID:
+            continue
+        if metrics.is_binary(metric):
+            queries, vectors = packed_queries, packed
+        else:
+            queries, vectors = float_queries, floats
+        cases.append(("distances", metric.name, lambda m=metric, q=queries,
+                      v=vectors: metrics.distances(m, q, v)))
+        cases.append(("top_k", metric.name, lambda m=metric, q=queries,
+                      v=vectors: metrics.top_k(m, q, v, args.k)))
+
+    # the naive versions expand (queries, rows, dim), keep them small
+    rows = min(args.rows, args.naive_rows)
+    cases.append(("naive distances", "L2",
+                  lambda: _naive_l2(float_queries, floats[:rows])))
+    cases.append(("naive distances", "HAMMING",
+                  lambda: _naive_hamming(packed_queries, packed[:rows])))
+    full = metrics.distances(MetricType.L2, float_queries, floats)
+    cases.append(("naive top_k", "L2", lambda: _naive_top_k(full, args.k)))
+
+    results = []
+    for kernel, metric, function in cases:
+        seconds = _best(function, args.repeat)
+        case_pairs = pairs if not kernel.startswith("naive distances") else \
+            rows * args.queries
+        results.append({
+            "kernel": kernel,
+            "metric": metric,
+            "seconds": round(seconds, 5),
+            "pairs_per_second": round(case_pairs / seconds),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=128,
+                        help="float dimension, and bits of binary vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--naive-rows", type=int, default=10000,
+                        help="rows given to the naive distances")
+    parser.add_argument("--json", action="store_true",
+                        help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("{:<16} {:<15} {:>10} {:>16}".format("kernel", "metric",
+                                               "seconds", "pairs/s"))
+    for result in results:
+        print("{kernel:<16} {metric:<15} {seconds:>10} "
+              "{pairs_per_second:>16}".format(**result))
+
+
+if __name__ == "__main__":
+    main()
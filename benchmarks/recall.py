@@ -0,0 +1,133 @@
+"""
+Recall@k, QPS and latency percentiles of a collection for a grid of search
+params, against exact ground truth
+
+Queries are read from a vector file or sampled from the base file or the
+collection. Ground truth is read from an ivecs file, or computed by brute
+force over the base file, or over an export of the collection.
+
+    python -m benchmarks.recall --collection sift --base sift_base.fvecs \
+        --queries sift_query.fvecs --ground-truth sift_groundtruth.ivecs \
+        --nprobe 1 4 16 64 --output recall.json
+"""
+import argparse
+import json
+
+from http_request import evaluation
+from http_request.datasets import VectorDataset, open_array
+from http_request.handler import HttpHandler
+from http_request.local_handler import LocalHandler
+
+
+def _queries(handler, args):
+    """
+    Queries and, for those sampled from the base, their ids, which are
+    their own nearest neighbours
+    """
+    if args.queries:
+        return VectorDataset(args.queries, limit=args.sample).rows, None
+    if args.base:
+        rows, queries = evaluation.sample_rows(open_array(args.base),
+                                               args.sample, args.seed)
+        if args.ids:
+            return queries, open_array(args.ids).reshape(-1)[rows]
+        return queries, rows
+
+    status, ids, queries = evaluation.sample_queries(handler,
+                                                     args.collection,
+                                                     args.sample, args.seed)
+    if not status.ok():
+        raise SystemExit(status.message)
+    return queries, ids
+
+
+def _ground_truth(handler, args, queries, query_ids):
+    if args.ground_truth:
+        return evaluation.load_ground_truth(args.ground_truth,
+                                            args.k)[:len(queries)]
+    if args.base:
+        status, schema = handler.describe_collection(args.collection, 60)
+        if not status.ok():
+            raise SystemExit(status.message)
+        ids = open_array(args.ids).reshape(-1) if args.ids else None
+        truth, _ = evaluation.ground_truth(schema.metric_type,
+                                           queries,
+                                           open_array(args.base),
+                                           args.k,
+                                           ids=ids,
+                                           exclude_ids=query_ids)
+        return truth
+
+    status, truth = evaluation.collection_ground_truth(
+        handler,
+        args.collection,
+        queries,
+        args.k,
+        args.export_dir,
+        exclude_ids=query_ids,
+        partition_tags=args.partitions)
+    if not status.ok():
+        raise SystemExit(status.message)
+    return truth
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=19121)
+    parser.add_argument("--local", help="path of a LocalHandler instead")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--queries", help="query vector file")
+    parser.add_argument("--base", help="vector file the collection holds")
+    parser.add_argument("--ids", help="ids of the base rows, row numbers "
+                        "by default")
+    parser.add_argument("--ground-truth", help="ivecs or npy file")
+    parser.add_argument("--export-dir", default="recall-export",
+                        help="export of the collection for the ground truth")
+    parser.add_argument("--sample", type=int, default=1000,
+                        help="queries used")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--partitions", nargs="*", default=None,
+                        help="partition tags searched, all by default")
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[])
+    parser.add_argument("--ef", type=int, nargs="*", default=[])
+    parser.add_argument("--batch", type=int, default=1,
+                        help="queries per search call")
+    parser.add_argument("--output", help="path of the JSON report")
+    args = parser.parse_args()
+
+    if args.local:
+        handler = LocalHandler(path=args.local)
+    else:
+        handler = HttpHandler(args.host, args.port)
+
+    queries, query_ids = _queries(handler, args)
+    truth = _ground_truth(handler, args, queries, query_ids)
+    # only the export is restricted to the partitions searched
+    exported = not (args.ground_truth or args.base)
+    grid = {}
+    if args.nprobe:
+        grid["nprobe"] = args.nprobe
+    if args.ef:
+        grid["ef"] = args.ef
+    report = evaluation.evaluate(handler,
+                                 args.collection,
+                                 queries,
+                                 truth,
+                                 args.k,
+                                 evaluation.param_grid(grid),
+                                 batch_size=args.batch,
+                                 partition_tags=args.partitions,
+                                 truth_partition_tags=args.partitions
+                                 if exported else None,
+                                 exclude_ids=query_ids)
+    if args.output:
+        report.save(args.output)
+    else:
+        print(json.dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
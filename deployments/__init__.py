@@ -0,0 +1,85 @@
+import os
+
+import geojson
+
+from http_request.handler import HttpHandler
+from http_request.local_handler import LocalHandler
+from milvus import MILVUS_DATABASE_HOST, MILVUS_DATABASE_PORT
+from milvus.settings import MILVUS_LOCAL_PATH, MILVUS_TARGET_RECALL
+from milvus.settings import MILVUS_TUNING_PATH
+from deployments.geometry import DOUGLAS_PEUCKER, simplify_rings
+
+_handler = None
+_handler_pid = None
+
+
+def autotune_options():
+    """
+    AutoTuner options of the deployments, None when no recall is targeted
+
+    Searches only read the tunings, the tune_collections task writes them.
+    """
+    if not MILVUS_TARGET_RECALL:
+        return None
+
+    return {
+        "target_recall": MILVUS_TARGET_RECALL,
+        "path": MILVUS_TUNING_PATH,
+    }
+
+
+def create_handler():
+    """
+    LocalHandler on MILVUS_LOCAL_PATH when it is set, HttpHandler of the
+    server otherwise
+    """
+    if MILVUS_LOCAL_PATH:
+        return LocalHandler(path=MILVUS_LOCAL_PATH,
+                            autotune=autotune_options())
+
+    return HttpHandler(host=MILVUS_DATABASE_HOST,
+                       port=MILVUS_DATABASE_PORT,
+                       autotune=autotune_options())
+
+
+def shared_handler():
+    """
+    Handler of the calling process, created on first use so that forked
+    workers do not inherit the one of their parent
+
+    A MILVUS_LOCAL_PATH directory serves a single process: run the worker
+    with one process (`--pool solo`), and not next to run_http.
+    """
+    global _handler, _handler_pid
+    if _handler is None or _handler_pid != os.getpid():
+        _handler = create_handler()
+        _handler_pid = os.getpid()
+    return _handler
+
+
+def load_rings(file_path: str,
+               tolerance: float = None,
+               method: str = DOUGLAS_PEUCKER):
+    """
+    Outer ring of every feature of a GeoJSON file, simplified when a
+    tolerance is given
+
+    :return: list of (feature index, list of [x, y] vertices), features
+        simplified to no vertex are left out
+    """
+    with open(file_path, mode='r', encoding='utf-8') as file:
+        data_set = geojson.load(file)
+
+    if not data_set:
+        return []
+
+    rings = [
+        item['geometry']['coordinates'][0] for item in data_set['features']
+    ]
+    if not tolerance:
+        return list(enumerate(rings))
+
+    simplified = simplify_rings(rings, tolerance=tolerance, method=method)
+    print(f"Simplified geometry: {simplified}\n")
+    return [(index, records.tolist())
+            for index, records in simplified.feature_records()]
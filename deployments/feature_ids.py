@@ -0,0 +1,193 @@
+from typing import List, Dict
+
+import numpy as np
+
+from http_request.deadline import deadline_scope
+from milvus import ParamError
+
+VERTEX_BITS = 24
+
+
+class FeatureIdCodec:
+    """
+    Vector id scheme storing the feature index in the high bits
+
+        id = feature_index << vertex_bits | vertex_index
+
+    :type  vertex_bits: int
+    :param vertex_bits: bits reserved for the vertex index inside a feature
+    """
+    def __init__(self, vertex_bits: int = VERTEX_BITS):
+        if not 0 < vertex_bits < 63:
+            raise ParamError(
+                "`vertex_bits` value {} is illegal".format(vertex_bits))
+
+        self.vertex_bits = vertex_bits
+        self.max_feature = (1 << (63 - vertex_bits)) - 1
+        self.max_vertex = (1 << vertex_bits) - 1
+
+    def encode(self, feature_index, vertex_index):
+        """
+        Encode feature and vertex indexes into vector ids
+
+        :return: numpy.ndarray of int64 ids
+        """
+        feature_index = np.asarray(feature_index, dtype=np.int64)
+        vertex_index = np.asarray(vertex_index, dtype=np.int64)
+        if feature_index.size and (feature_index.min() < 0 or
+                                   feature_index.max() > self.max_feature):
+            raise ParamError("Feature index out of range")
+        if vertex_index.size and (vertex_index.min() < 0 or
+                                  vertex_index.max() > self.max_vertex):
+            raise ParamError("Vertex index out of range")
+
+        return (feature_index << self.vertex_bits) | vertex_index
+
+    def encode_ring(self, feature_index: int, count: int):
+        """
+        Ids of the `count` vertices of one feature
+        """
+        return self.encode(np.full(count, feature_index, dtype=np.int64),
+                           np.arange(count, dtype=np.int64))
+
+    def encode_features(self, feature_index):
+        """
+        Ids of vertices grouped by feature, as in SimplifiedGeometry
+
+        :type  feature_index: numpy.ndarray
+        :param feature_index: sorted feature index of every vertex
+        """
+        feature_index = np.asarray(feature_index, dtype=np.int64)
+        if feature_index.size == 0:
+            return feature_index
+
+        positions = np.arange(len(feature_index), dtype=np.int64)
+        boundary = np.r_[True, np.diff(feature_index) != 0]
+        starts = np.flatnonzero(boundary)
+        group = np.cumsum(boundary) - 1
+        return self.encode(feature_index, positions - starts[group])
+
+    def feature_of(self, ids):
+        """
+        Feature index of vector ids, -1 ids stay -1
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        return np.where(ids < 0, -1, ids >> self.vertex_bits)
+
+
+def group_by_feature(features, top_k: int):
+    """
+    Keep the best hit of every feature, per query row
+
+    Rows are expected in server order, best hit first.
+
+    :type  features: numpy.ndarray
+    :param features: (nq, n) feature index of every hit, -1 for padding
+
+    :return: (positions, count), positions is a (nq, top_k) array of hit
+        columns padded with -1 and count the distinct features of each row
+    """
+    features = np.asarray(features, dtype=np.int64)
+    nq, width = features.shape
+    positions = np.full((nq, top_k), -1, dtype=np.int64)
+    if width == 0:
+        return positions, np.zeros(nq, dtype=np.int64)
+
+    rows = np.repeat(np.arange(nq), width)
+    keys = np.stack((rows, features.reshape(-1)), axis=1)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    keep = np.zeros(nq * width, dtype=bool)
+    keep[first] = True
+    keep &= features.reshape(-1) >= 0
+    keep = keep.reshape(nq, width)
+
+    rank = np.cumsum(keep, axis=1) - 1
+    selected = keep & (rank < top_k)
+    row_index, column_index = np.nonzero(selected)
+    positions[row_index, rank[row_index, column_index]] = column_index
+    return positions, keep.sum(axis=1)
+
+
+class FeatureQueryResult:
+    """
+    Top-k distinct features of each query
+
+    :attribute features: (nq, top_k) feature indexes, padded with -1
+
+    :attribute ids: (nq, top_k) id of the best hit of each feature
+
+    :attribute distances: (nq, top_k) distance of the best hit of each feature
+    """
+    def __init__(self, features, ids, distances):
+        self.features = features
+        self.ids = ids
+        self.distances = distances
+
+    @property
+    def shape(self):
+        return self.features.shape
+
+    def __repr__(self):
+        return '%s(shape=%r)' % (self.__class__.__name__, self.shape)
+
+
+def search_features(handler,
+                    collection_name: str,
+                    query_records,
+                    top_k: int,
+                    partition_tags: List = None,
+                    search_params: Dict = None,
+                    codec: FeatureIdCodec = None,
+                    over_fetch: int = 4,
+                    max_top_k: int = 16384,
+                    **kwargs):
+    """
+    Search the top-k distinct features of each query
+
+    Hits are collapsed to one per feature, the search is repeated with a
+    doubled topk only when a full row holds fewer than `top_k` features.
+
+    :returns:
+        Status: indicate if query is successful
+        query_results: FeatureQueryResult
+    """
+    codec = codec or FeatureIdCodec()
+    request_top_k = min(top_k * over_fetch, max_top_k)
+    with deadline_scope(kwargs.pop("deadline", None)):
+        while True:
+            status, results = handler.search_vectors(
+                collection_name=collection_name,
+                top_k=request_top_k,
+                query_records=query_records,
+                partition_tags=partition_tags,
+                search_params=search_params,
+                **kwargs)
+            if not status.ok():
+                return status, None
+
+            ids = results.id_array
+            distances = results.distance_array
+            features = codec.feature_of(ids)
+            positions, count = group_by_feature(features, top_k)
+
+            full = (ids >= 0).sum(axis=1) >= request_top_k
+            if (not np.any(full & (count < top_k))
+                    or request_top_k >= max_top_k):
+                break
+            request_top_k = min(request_top_k * 2, max_top_k)
+
+    if ids.shape[1] == 0:
+        # no hit at all, e.g. an empty collection or pruned partitions
+        shape = (ids.shape[0], top_k)
+        return status, FeatureQueryResult(np.full(shape, -1, np.int64),
+                                          np.full(shape, -1, np.int64),
+                                          np.full(shape, np.inf))
+
+    found = positions >= 0
+    columns = np.where(found, positions, 0)
+    ids = np.where(found, np.take_along_axis(ids, columns, axis=1), -1)
+    distances = np.where(found,
+                         np.take_along_axis(distances, columns, axis=1),
+                         np.inf)
+    features = np.where(found, codec.feature_of(ids), -1)
+    return status, FeatureQueryResult(features, ids, distances)
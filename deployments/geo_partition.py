@@ -0,0 +1,248 @@
+import math
+import threading
+from typing import List, Dict
+
+import numpy as np
+
+from http_request.constants import Status
+from http_request.deadline import deadline_scope
+from milvus import ParamError
+
+
+def tile_tag(tile_x: int, tile_y: int):
+    """
+    Partition tag of a grid tile, negative indexes are written with `m`
+    """
+    def _fmt(value):
+        return "m{}".format(-value) if value < 0 else str(value)
+
+    return "tile_{}_{}".format(_fmt(tile_x), _fmt(tile_y))
+
+
+def parse_tile_tag(tag: str):
+    """
+    Grid tile of a partition tag, None when the tag is not a tile tag
+    """
+    parts = tag.split("_")
+    if len(parts) != 3 or parts[0] != "tile":
+        return None
+
+    def _parse(value):
+        if value.startswith("m"):
+            return -int(value[1:])
+        return int(value)
+
+    try:
+        return _parse(parts[1]), _parse(parts[2])
+    except ValueError:
+        return None
+
+
+class GeoTilePartitioner:
+    """
+    Route 2-D lon/lat vectors to grid-tile partitions
+
+    Every vertex is stored in the partition of the tile containing it and
+    searches only scan the tiles around the query, widening ring by ring
+    until the top-k is guaranteed to be inside the scanned tiles.
+
+    :type  handler: MilvusAbstract
+    :param handler: client handler
+
+    :type  collection_name: str
+    :param collection_name: collection storing [lon, lat] vectors
+
+    :type  tile_size: float
+    :param tile_size: tile edge, in degrees
+
+    :type  squared_distance: bool
+    :param squared_distance: True when the server returns squared L2 distances
+    """
+    def __init__(self,
+                 handler,
+                 collection_name: str,
+                 tile_size: float = 1.0,
+                 squared_distance: bool = True,
+                 timeout: int = 30):
+        if tile_size <= 0:
+            raise ParamError("`tile_size` value {} is illegal".format(tile_size))
+
+        self._handler = handler
+        self._collection_name = collection_name
+        self._tile_size = float(tile_size)
+        self._squared_distance = squared_distance
+        self._timeout = timeout
+        self._tiles = None
+        self._lock = threading.Lock()
+
+    @property
+    def tiles(self):
+        """
+        Tiles which have a partition in the collection
+        """
+        if self._tiles is None:
+            self._load_tiles()
+        return set(self._tiles or ())
+
+    def _load_tiles(self, page_size: int = 100):
+        tiles = set()
+        offset = 0
+        while True:
+            status, partitions = self._handler.show_partitions(
+                collection_name=self._collection_name,
+                timeout=self._timeout,
+                offset=offset,
+                page_size=page_size)
+            if not status.ok():
+                return status
+
+            for partition in partitions:
+                tile = parse_tile_tag(partition.tag)
+                if tile is not None:
+                    tiles.add(tile)
+
+            if len(partitions) < page_size:
+                break
+            offset += page_size
+
+        self._tiles = tiles
+        return Status()
+
+    def tile_of(self, records):
+        """
+        Tile index of each vector
+
+        :return: numpy.ndarray of shape (n, 2)
+        """
+        points = np.asarray(records, dtype=np.float64).reshape(-1, 2)
+        return np.floor(points / self._tile_size).astype(np.int64)
+
+    def _ensure_tile(self, tile):
+        with self._lock:
+            if self._tiles is None:
+                status = self._load_tiles()
+                if not status.ok():
+                    return status
+            if tile in self._tiles:
+                return Status()
+
+            status = self._handler.create_partition(
+                collection_name=self._collection_name,
+                partition_tag=tile_tag(*tile),
+                timeout=self._timeout)
+            if not status.ok():
+                # another process may have created it since the listing
+                known = self._tiles
+                if self._load_tiles().ok():
+                    self._tiles |= known
+                if tile not in self._tiles:
+                    return status
+            self._tiles.add(tile)
+            return Status()
+
+    def add_vectors(self, records, ids: List = None):
+        """
+        Insert vectors, each into the partition of its tile
+
+        :returns:
+            Status: indicate if vectors inserted successfully
+            ids: list of id, in the order of `records`
+        """
+        points = np.asarray(records, dtype=np.float64).reshape(-1, 2)
+        tiles, inverse = np.unique(self.tile_of(points),
+                                   axis=0,
+                                   return_inverse=True)
+        inverse = inverse.reshape(-1)
+        result_ids = np.zeros(len(points), dtype=np.int64)
+        for position, tile in enumerate(map(tuple, tiles.tolist())):
+            status = self._ensure_tile(tile)
+            if not status.ok():
+                return status, []
+
+            rows = np.flatnonzero(inverse == position)
+            tile_ids = None if ids is None else [ids[row] for row in rows]
+            status, inserted = self._handler.add_vectors(
+                collection_name=self._collection_name,
+                records=points[rows].tolist(),
+                ids=tile_ids,
+                partition_tag=tile_tag(*tile))
+            if not status.ok():
+                return status, []
+            result_ids[rows] = inserted
+
+        return Status(message='Add vectors successfully!'), result_ids.tolist()
+
+    def _tile_distances(self, query_tiles):
+        """
+        Existing tiles and their ring distance to the nearest query tile
+        """
+        tiles = np.asarray(sorted(self._tiles), dtype=np.int64).reshape(-1, 2)
+        if len(tiles) == 0:
+            return tiles, np.zeros(0, dtype=np.int64)
+
+        rings = np.abs(tiles[None, :, :] - query_tiles[:, None, :]).max(axis=2)
+        return tiles, rings.min(axis=0)
+
+    def _covered(self, points, query_tiles, radius: int):
+        """
+        Distance from each query to the border of its scanned square
+        """
+        low = (query_tiles - radius) * self._tile_size
+        high = (query_tiles + radius + 1) * self._tile_size
+        return np.minimum(points - low, high - points).min(axis=1)
+
+    def search_vectors(self,
+                       query_records,
+                       top_k: int,
+                       search_params: Dict = None,
+                       **kwargs):
+        """
+        Search only the tiles which can hold the top-k of the queries
+
+        :returns:
+            Status: indicate if query is successful
+            query_results: TopKQueryResult
+            partition_tags: list of searched partition tags
+        """
+        with deadline_scope(kwargs.pop("deadline", None)):
+            return self._search(query_records, top_k, search_params, **kwargs)
+
+    def _search(self, query_records, top_k: int, search_params: Dict,
+                **kwargs):
+        points = np.asarray(query_records, dtype=np.float64).reshape(-1, 2)
+        query_tiles = self.tile_of(points)
+        if self._tiles is None:
+            status = self._load_tiles()
+            if not status.ok():
+                return status, None, []
+        tiles, rings = self._tile_distances(query_tiles)
+
+        radius = int(rings.min()) if len(rings) else 0
+        max_radius = int(rings.max()) if len(rings) else 0
+        while True:
+            tags = [tile_tag(*tile) for tile in tiles[rings <= radius].tolist()]
+            status, results = self._handler.search_vectors(
+                collection_name=self._collection_name,
+                top_k=top_k,
+                query_records=points.tolist(),
+                partition_tags=tags,
+                search_params=search_params,
+                **kwargs)
+            if not status.ok() or radius >= max_radius:
+                return status, results, tags
+
+            if self._complete(results, points, query_tiles, radius, top_k):
+                return status, results, tags
+            radius += 1
+
+    def _complete(self, results, points, query_tiles, radius: int, top_k: int):
+        covered = self._covered(points, query_tiles, radius)
+        for row, limit in zip(results, covered):
+            if len(row) < top_k:
+                return False
+            distance = row[-1].distance
+            if self._squared_distance:
+                distance = math.sqrt(max(distance, 0.0))
+            if distance > limit:
+                return False
+        return True
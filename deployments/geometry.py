@@ -0,0 +1,189 @@
+from typing import List
+
+import numpy as np
+
+from milvus import ParamError
+
+DOUGLAS_PEUCKER = "douglas_peucker"
+GRID_SNAP = "grid_snap"
+
+
+def _segment_distances(points, start, end):
+    """
+    Distance of every point to the segment [start, end]
+    """
+    segment = end - start
+    length = float(np.dot(segment, segment))
+    if length == 0.0:
+        return np.hypot(points[:, 0] - start[0], points[:, 1] - start[1])
+
+    offset = points - start
+    cross = segment[0] * offset[:, 1] - segment[1] * offset[:, 0]
+    return np.abs(cross) / np.sqrt(length)
+
+
+def douglas_peucker(points, tolerance: float):
+    """
+    Mask of the vertices kept by the Douglas-Peucker algorithm
+
+    Every split computes the distances of a whole run of vertices in one
+    vectorized pass, so only the recursion itself stays in Python.
+
+    :type  points: numpy.ndarray
+    :param points: (n, 2) array of vertices
+
+    :type  tolerance: float
+    :param tolerance: max distance of a dropped vertex to the simplified line
+
+    :return: numpy.ndarray of bool, True for kept vertices
+    """
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        distances = _segment_distances(points[first + 1:last], points[first],
+                                       points[last])
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return keep
+
+
+def snap_to_grid(points, tolerance: float):
+    """
+    Mask of the vertices kept after snapping to a grid of cell `tolerance`
+
+    Only the first vertex falling into each grid cell is kept.
+
+    :type  points: numpy.ndarray
+    :param points: (n, 2) array of vertices
+
+    :type  tolerance: float
+    :param tolerance: grid cell size
+
+    :return: numpy.ndarray of bool, True for kept vertices
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) == 0:
+        return keep
+
+    cells = np.floor(points / tolerance).astype(np.int64)
+    _, first = np.unique(cells, axis=0, return_index=True)
+    keep[first] = True
+    return keep
+
+
+SIMPLIFIERS = {
+    DOUGLAS_PEUCKER: douglas_peucker,
+    GRID_SNAP: snap_to_grid,
+}
+
+
+class SimplifiedGeometry:
+    """
+    Vertices kept by a simplification pass
+
+    :attribute vectors: numpy.ndarray, (n, 2) kept vertices of all features
+
+    :attribute feature_index: numpy.ndarray, feature index of each kept vertex
+
+    :attribute original_count: int, vertex count before simplification
+    """
+    def __init__(self, vectors, feature_index, original_count: int):
+        self.vectors = vectors
+        self.feature_index = feature_index
+        self.original_count = original_count
+
+    @property
+    def count(self):
+        return len(self.vectors)
+
+    @property
+    def ratio(self):
+        """
+        Reduction ratio, original vertex count over kept vertex count
+        """
+        if self.count == 0:
+            return 0.0
+
+        return self.original_count / self.count
+
+    def feature_records(self):
+        """
+        Yield (feature index, kept vertices) per feature
+        """
+        if self.count == 0:
+            return
+
+        bounds = np.flatnonzero(np.diff(self.feature_index)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [self.count]))
+        for start, end in zip(starts, ends):
+            yield int(self.feature_index[start]), self.vectors[start:end]
+
+    def __repr__(self):
+        return '%s(count=%r, original_count=%r, ratio=%.2f)' % (
+            self.__class__.__name__, self.count, self.original_count,
+            self.ratio)
+
+
+def simplify_rings(rings: List, tolerance: float, method: str = DOUGLAS_PEUCKER):
+    """
+    Simplify one ring per feature
+
+    :type  rings: list
+    :param rings: list of rings, each ring is a list of [lon, lat] vertices
+
+    :type  tolerance: float
+    :param tolerance: simplification tolerance, in coordinate units
+
+    :type  method: str
+    :param method: `douglas_peucker` or `grid_snap`
+
+    :return: SimplifiedGeometry
+    """
+    simplifier = SIMPLIFIERS.get(method, None)
+    if simplifier is None:
+        raise ParamError("Unknown simplification method `{}`".format(method))
+
+    vectors, feature_index = [], []
+    original_count = 0
+    for index, ring in enumerate(rings):
+        points = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+        original_count += len(points)
+        kept = points[simplifier(points, tolerance)]
+        vectors.append(kept)
+        feature_index.append(np.full(len(kept), index, dtype=np.int64))
+
+    if not vectors:
+        return SimplifiedGeometry(np.empty((0, 2)), np.empty(0, np.int64), 0)
+
+    return SimplifiedGeometry(np.concatenate(vectors),
+                              np.concatenate(feature_index), original_count)
+
+
+def simplify_features(features: List,
+                      tolerance: float,
+                      method: str = DOUGLAS_PEUCKER):
+    """
+    Simplify the outer ring of every GeoJSON polygon feature
+
+    :type  features: list
+    :param features: GeoJSON features with polygon geometries
+
+    :return: SimplifiedGeometry
+    """
+    rings = [item['geometry']['coordinates'][0] for item in features]
+    return simplify_rings(rings, tolerance=tolerance, method=method)
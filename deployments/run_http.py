@@ -1,15 +1,14 @@
 from datetime import datetime
 from typing import List, Dict
 
-import geojson
-
-from http_request.handler import HttpHandler
-from milvus import MILVUS_DATABASE_HOST, MILVUS_DATABASE_PORT
 from http_request.constants import MetricType, IndexType
 from milvus.settings import BASE_DIR
+from deployments import create_handler, load_rings
+from deployments.geometry import DOUGLAS_PEUCKER
+from deployments.geo_partition import GeoTilePartitioner
+from deployments.feature_ids import FeatureIdCodec, search_features
 
-http_handler = HttpHandler(host=MILVUS_DATABASE_HOST,
-                           port=MILVUS_DATABASE_PORT)
+http_handler = create_handler()
 
 
 def ping():
@@ -91,27 +90,39 @@ def _add_vector(collection_name: str,
                 partition_tag: str = None):
     return http_handler.add_vectors(collection_name=collection_name,
                                     records=records,
+                                    ids=ids,
                                     partition_tag=partition_tag)
 
 
 def add_vector(collection_name: str,
                file_path: str,
                ids: List = None,
-               partition_tag: str = None):
-    with open(file_path, mode='r', encoding='utf-8') as file:
-        data_set = geojson.load(file)
+               partition_tag: str = None,
+               tolerance: float = None,
+               method: str = DOUGLAS_PEUCKER,
+               tile_size: float = None,
+               feature_ids: bool = False):
+    rings = load_rings(file_path, tolerance=tolerance, method=method)
 
     temp_sum = 0
-    if data_set:
+    if rings:
         start_t = datetime.now()
-        features = data_set['features']
-        for item in features:
-            records = item['geometry']['coordinates']
-            temp_sum += len(records[0])
-
-            response = _add_vector(collection_name=collection_name,
-                                   records=records[0],
-                                   partition_tag=partition_tag)
+        partitioner = GeoTilePartitioner(
+            http_handler, collection_name,
+            tile_size=tile_size) if tile_size else None
+        codec = FeatureIdCodec() if feature_ids else None
+        for index, ring in rings:
+            temp_sum += len(ring)
+            ring_ids = codec.encode_ring(index, len(ring)).tolist(
+            ) if codec is not None else None
+
+            if partitioner is not None:
+                response = partitioner.add_vectors(records=ring, ids=ring_ids)
+            else:
+                response = _add_vector(collection_name=collection_name,
+                                       records=ring,
+                                       ids=ring_ids,
+                                       partition_tag=partition_tag)
             print(f"Create vector for: {response}\n")
 
         end_t = datetime.now()
@@ -135,6 +146,36 @@ def search_vectors(collection_name: str,
     print(f"Show collection partition response: {response}\n")
 
 
+def search_tiles(collection_name: str,
+                 top_k: int,
+                 query_records,
+                 tile_size: float,
+                 search_params: Dict = None):
+    partitioner = GeoTilePartitioner(http_handler,
+                                     collection_name,
+                                     tile_size=tile_size)
+    status, results, tags = partitioner.search_vectors(
+        query_records=query_records,
+        top_k=top_k,
+        search_params=search_params)
+    print(f"Searched {len(tags)} tile partitions: {status}, {results}\n")
+
+
+def search_distinct_features(collection_name: str,
+                             top_k: int,
+                             query_records,
+                             partition_tags: List = None,
+                             search_params: Dict = None):
+    status, results = search_features(
+        http_handler,
+        collection_name=collection_name,
+        query_records=query_records,
+        top_k=top_k,
+        partition_tags=partition_tags,
+        search_params=search_params)
+    print(f"Search features response: {status}, {results}\n")
+
+
 if __name__ == '__main__':
     if ping():
         # create_collection(collection_name='Monitoring_Trends',
@@ -173,4 +214,4 @@ if __name__ == '__main__':
             top_k=20,
             query_records=[[-152.267982254686956, 57.624012394958342]],
             partition_tags=['trend'],
-            search_params={"nprobe": 16})
+            search_params=None if autotune else {"nprobe": 16})
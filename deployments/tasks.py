@@ -1,41 +1,178 @@
 from datetime import datetime
 from pathlib import Path
+from typing import List
 
-import geojson
+import numpy as np
 
-from http_request.handler import HttpHandler
-from milvus import MILVUS_DATABASE_HOST, MILVUS_DATABASE_PORT
-from http_request.constants import MetricType, IndexType
 from milvus.celery_config import app
-
-http_handler = HttpHandler(host=MILVUS_DATABASE_HOST,
-                           port=MILVUS_DATABASE_PORT)
+from milvus.settings import MILVUS_RETENTION_DAYS, MILVUS_COMPACT_THRESHOLD
+from http_request.retention import RetentionManager, RetentionPolicy
+from http_request.bulk_insert import BulkInserter, TokenBucket
+from http_request.datasets import VectorDataset, ingest, open_array
+from http_request.sync import sync_collection
+from deployments import load_rings, shared_handler
+from deployments.geometry import DOUGLAS_PEUCKER
+from deployments.geo_partition import GeoTilePartitioner
+from deployments.feature_ids import FeatureIdCodec
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+_retention = None
+
+
+def retention():
+    """
+    Retention manager of the worker process, kept across beats: it
+    remembers which collections it compacted
+    """
+    global _retention
+    if _retention is None:
+        _retention = RetentionManager(
+            shared_handler(),
+            collections=['Monitoring_Trends'],
+            policy=RetentionPolicy(
+                max_age_days=int(MILVUS_RETENTION_DAYS)
+                if MILVUS_RETENTION_DAYS else None,
+                compact_threshold=MILVUS_COMPACT_THRESHOLD))
+    return _retention
+
 
 @app.task(name='deployments.tasks.add_vector', queue='milvus_worker')
-def add_vector(symbol: str):
+def add_vector(symbol: str,
+               tolerance: float = None,
+               method: str = DOUGLAS_PEUCKER,
+               tile_size: float = None,
+               feature_ids: bool = False,
+               adaptive: bool = False,
+               max_rate: float = None):
     file_path = f"{BASE_DIR}/vector-dataset/Monitoring_Trends_in_Burn_Severity.geojson"
-    with open(file_path, mode='r', encoding='utf-8') as file:
-        data_set = geojson.load(file)
+    rings = load_rings(file_path, tolerance=tolerance, method=method)
 
     temp_sum = 0
-    if data_set:
+    if rings:
         start_t = datetime.now()
-        features = data_set['features']
-        for item in features:
-            records = item['geometry']['coordinates']
-            temp_sum += len(records[0])
-            response = http_handler.add_vectors(
-                collection_name='Monitoring_Trends',
-                records=records[0],
-                partition_tag='trend')
-
-            print(
-                f"Create vector for: {len(records[0])} vectors for {symbol}\n")
+        http_handler = shared_handler()
+        partitioner = GeoTilePartitioner(
+            http_handler, 'Monitoring_Trends',
+            tile_size=tile_size) if tile_size else None
+        codec = FeatureIdCodec() if feature_ids else None
+        if adaptive and partitioner is None:
+            inserter = BulkInserter(
+                http_handler,
+                'Monitoring_Trends',
+                partition_tag='trend',
+                token_bucket=TokenBucket(max_rate) if max_rate else None,
+                report_interval=10)
+            result = inserter.insert_chunks(
+                (ring, codec.encode_ring(index, len(ring))
+                 if codec is not None else None) for index, ring in rings)
+            temp_sum = result.inserted
+            print(f"Bulk insert for {symbol}: {result}, "
+                  f"limits: {inserter.controller}\n")
+        else:
+            for index, ring in rings:
+                temp_sum += len(ring)
+                ring_ids = codec.encode_ring(index, len(ring)).tolist(
+                ) if codec is not None else None
+                if partitioner is not None:
+                    response = partitioner.add_vectors(records=ring,
+                                                       ids=ring_ids)
+                else:
+                    response = http_handler.add_vectors(
+                        collection_name='Monitoring_Trends',
+                        records=ring,
+                        ids=ring_ids,
+                        partition_tag='trend')
+
+                print(
+                    f"Create vector for: {len(ring)} vectors for {symbol}\n")
 
         end_t = datetime.now()
         print(
             f"Total info: {temp_sum} for symbol: {symbol}, started at: {start_t} and ended at: {end_t}"
         )
+
+
+@app.task(name='deployments.tasks.ingest_dataset', queue='milvus_worker')
+def ingest_dataset(path: str,
+                   collection_name: str,
+                   offset: int = 0,
+                   limit: int = None,
+                   partition_tag: str = None,
+                   row_ids: bool = True):
+    dataset = VectorDataset(path, offset=offset, limit=limit)
+    start_t = datetime.now()
+    result = ingest(shared_handler(),
+                    collection_name,
+                    dataset,
+                    partition_tag=partition_tag,
+                    row_ids=row_ids,
+                    report_interval=10)
+    end_t = datetime.now()
+    print(f"Ingested {dataset}: {result}, started at: {start_t} "
+          f"and ended at: {end_t}\n")
+
+
+@app.task(name='deployments.tasks.sync_vector', queue='milvus_worker')
+def sync_vector(symbol: str,
+                tolerance: float = None,
+                method: str = DOUGLAS_PEUCKER,
+                dry_run: bool = False):
+    file_path = f"{BASE_DIR}/vector-dataset/Monitoring_Trends_in_Burn_Severity.geojson"
+    rings = load_rings(file_path, tolerance=tolerance, method=method)
+
+    if rings:
+        start_t = datetime.now()
+        # ids derive from the feature and vertex positions, an unchanged
+        # ring keeps its ids from one run to the next
+        codec = FeatureIdCodec()
+        records = np.concatenate([np.asarray(ring) for _, ring in rings])
+        ids = np.concatenate(
+            [codec.encode_ring(index, len(ring)) for index, ring in rings])
+        report = sync_collection(shared_handler(),
+                                 'Monitoring_Trends',
+                                 records,
+                                 ids,
+                                 partition_tag='trend',
+                                 dry_run=dry_run)
+        end_t = datetime.now()
+        print(f"Sync for symbol: {symbol}: {report}, started at: {start_t} "
+              f"and ended at: {end_t}\n")
+
+
+@app.task(name='deployments.tasks.sync_dataset', queue='milvus_worker')
+def sync_dataset(path: str,
+                 ids_path: str,
+                 collection_name: str,
+                 partition_tag: str = None,
+                 dry_run: bool = False):
+    report = sync_collection(shared_handler(),
+                             collection_name,
+                             open_array(path),
+                             open_array(ids_path).reshape(-1),
+                             partition_tag=partition_tag,
+                             dry_run=dry_run)
+    print(f"Sync of {path}: {report}\n")
+
+
+@app.task(name='deployments.tasks.apply_retention', queue='milvus_worker')
+def apply_retention(dry_run: bool = False):
+    for report in retention().run_once(dry_run=dry_run):
+        print(f"Retention report: {report}\n")
+
+
+@app.task(name='deployments.tasks.tune_collections', queue='milvus_worker')
+def tune_collections(collections: List[str] = None):
+    http_handler = shared_handler()
+    autotuner = http_handler.autotuner
+    if autotuner is None:
+        return
+    if collections is None:
+        status, collections = http_handler.show_collections(timeout=60)
+        if not status.ok():
+            print(f"Tuning skipped: {status}\n")
+            return
+    for collection_name in collections:
+        if autotuner.stale(http_handler, collection_name):
+            result = autotuner.tune(http_handler, collection_name)
+            print(f"Tuning of {collection_name}: {result}\n")
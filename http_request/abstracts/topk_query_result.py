@@ -1,39 +1,128 @@
+import numpy as np
+
 from .query_result import QueryResult
 
 
 class TopKQueryResult:
+    """
+    Hits of every query, kept as flat id and distance arrays with the
+    offset of every row; QueryResult objects are only made for the rows
+    read by index
+    """
     def __init__(self, raw_source, **kwargs):
         self._raw = raw_source
         self._nq = 0
         self._topk = 0
-        self._results = []
+        self._hit_ids = np.empty(0, dtype=np.int64)
+        self._hit_distances = np.empty(0, dtype=np.float64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._ids = None
+        self._distances = None
 
         self.__index = 0
 
-        self._unpack(self._raw)
+        if self._raw is not None:
+            self._unpack(self._raw)
+
+    @classmethod
+    def empty(cls, nq: int):
+        """
+        Result holding no hit for each of the `nq` queries
+        """
+        result = cls(None)
+        result._nq = nq
+        result._offsets = np.zeros(nq + 1, dtype=np.int64)
+        return result
+
+    @classmethod
+    def from_arrays(cls, ids, distances):
+        """
+        Result of (nq, topk) id and distance arrays, ids of -1 are no hit
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        distances = np.asarray(distances, dtype=np.float64)
+        result = cls(None)
+        result._nq = len(ids)
+        result._topk = ids.shape[1] if ids.ndim == 2 else 0
+        if ids.ndim == 2:
+            found = ids != -1
+            result._set_hits(ids[found], distances[found], found.sum(axis=1))
+        else:
+            result._offsets = np.zeros(result._nq + 1, dtype=np.int64)
+        return result
 
     def _unpack(self, raw_resources):
         js = raw_resources.json()
         self._nq = js["num"]
 
-        for row_result in js["result"]:
-            row_ = [
-                QueryResult(int(result["id"]), float(result["distance"]))
-                for result in row_result if float(result["id"]) != -1
-            ]
+        rows = js["result"]
+        # one conversion of every hit, ids may come as strings
+        ids = np.array([hit["id"] for row in rows for hit in row],
+                       dtype=np.int64)
+        distances = np.array([hit["distance"] for row in rows for hit in row],
+                             dtype=np.float64)
+        counts = np.array([len(row) for row in rows], dtype=np.int64)
+        found = ids != -1
+        if not found.all():
+            rows = np.repeat(np.arange(len(counts)), counts)
+            counts = np.bincount(rows[found], minlength=len(counts))
+        self._set_hits(ids[found], distances[found], counts)
+
+    def _set_hits(self, ids, distances, counts):
+        self._hit_ids = ids
+        self._hit_distances = distances
+        self._offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._offsets[1:])
+
+    def _row(self, index: int):
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return [
+            QueryResult(_id, distance) for _id, distance in zip(
+                self._hit_ids[start:end].tolist(),
+                self._hit_distances[start:end].tolist())
+        ]
+
+    @property
+    def id_array(self):
+        """
+        Result ids as a (nq, topk) int64 array, padded with -1
+        """
+        if self._ids is None:
+            self._ids, self._distances = self._arrays()
+        return self._ids
 
-            self._results.append(row_)
+    @property
+    def distance_array(self):
+        """
+        Result distances as a (nq, topk) float array, padded with inf
+        """
+        if self._distances is None:
+            self._ids, self._distances = self._arrays()
+        return self._distances
+
+    def _arrays(self):
+        counts = np.diff(self._offsets)
+        width = int(counts.max()) if len(counts) else 0
+        ids = np.full((len(counts), width), -1, dtype=np.int64)
+        distances = np.full((len(counts), width), np.inf, dtype=np.float64)
+        rows = np.repeat(np.arange(len(counts)), counts)
+        columns = np.arange(len(rows)) - np.repeat(self._offsets[:-1], counts)
+        ids[rows, columns] = self._hit_ids
+        distances[rows, columns] = self._hit_distances
+        return ids, distances
 
     @property
     def shape(self):
-        return len(self._results), len(
-            self._results[0]) if len(self._results) > 0 else 0
+        return len(self), int(self._offsets[1] -
+                              self._offsets[0]) if len(self) > 0 else 0
 
     def __len__(self):
-        return len(self._results)
+        return len(self._offsets) - 1
 
     def __getitem__(self, item):
-        return self._results.__getitem__(item)
+        if isinstance(item, slice):
+            return [self._row(index) for index in range(len(self))[item]]
+        return self._row(range(len(self))[item])
 
     def __iter__(self):
         return self
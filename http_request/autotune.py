@@ -0,0 +1,477 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from .constants import Status, IndexType
+from . import evaluation
+
+logger = logging.getLogger(__name__)
+
+IVF_INDEXES = (IndexType.IVFLAT, IndexType.IVF_SQ8, IndexType.IVF_SQ8H,
+               IndexType.IVF_PQ)
+# Bounds of the search params accepted by the server
+MAX_NPROBE = 16384
+MAX_EF = 32768
+# Rows a tuning exports for its ground truth unless told otherwise
+MAX_TUNING_ROWS = 1000000
+
+
+def index_fingerprint(index_param):
+    """
+    Key of an index as described by `describe_index`, it changes whenever
+    the index type or its build params do
+    """
+    return json.dumps(
+        {
+            "index_type": index_param.index_type.name,
+            "params": index_param.params,
+        },
+        sort_keys=True)
+
+
+def search_parameter(index_param, top_k: int):
+    """
+    (name, lowest, highest) of the search param trading speed for recall
+    on an index, None when there is none
+    """
+    index_type = index_param.index_type
+    if index_type in IVF_INDEXES:
+        nlist = int(index_param.params.get("nlist", MAX_NPROBE))
+        return "nprobe", 1, max(1, min(nlist, MAX_NPROBE))
+    if index_type == IndexType.HNSW:
+        return "ef", top_k, MAX_EF
+    return None
+
+
+def default_params(index_param, top_k: int):
+    """
+    Search params used on an index until it is tuned
+    """
+    if index_param is None:
+        return {}
+    if index_param.index_type in IVF_INDEXES:
+        return {"nprobe": 16}
+    if index_param.index_type == IndexType.HNSW:
+        return {"ef": max(64, top_k)}
+    return {}
+
+
+class TuningResult:
+    """
+    Smallest value of the search param of an index reaching the target
+    recall@k on a sample, or the largest one tried when none does
+
+    :attribute evaluations: recall of every value tried
+    """
+    def __init__(self, collection_name: str, fingerprint: str, params: Dict,
+                 recall: float, target_recall: float, top_k: int,
+                 evaluations: Dict = None, created: float = None):
+        self.collection_name = collection_name
+        self.fingerprint = fingerprint
+        self.params = params
+        self.recall = recall
+        self.target_recall = target_recall
+        self.top_k = top_k
+        self.evaluations = evaluations or {}
+        self.created = created if created is not None else time.time()
+
+    @property
+    def reached(self):
+        return self.recall is not None and self.recall >= self.target_recall
+
+    def to_dict(self):
+        return {
+            "collection_name": self.collection_name,
+            "fingerprint": self.fingerprint,
+            "params": self.params,
+            "recall": self.recall,
+            "target_recall": self.target_recall,
+            "top_k": self.top_k,
+            "evaluations": {
+                str(value): recall
+                for value, recall in self.evaluations.items()
+            },
+            "created": self.created,
+        }
+
+    @classmethod
+    def from_dict(cls, document: dict):
+        evaluations = {
+            int(value): recall
+            for value, recall in document.get("evaluations", {}).items()
+        }
+        return cls(document["collection_name"], document["fingerprint"],
+                   document["params"], document["recall"],
+                   document["target_recall"], document["top_k"],
+                   evaluations, document.get("created", None))
+
+    def __repr__(self):
+        return ('%s(collection_name=%r, params=%r, recall=%r, '
+                'target_recall=%r, top_k=%r, tried=%r)' %
+                (self.__class__.__name__, self.collection_name, self.params,
+                 self.recall, self.target_recall, self.top_k,
+                 len(self.evaluations)))
+
+
+def tune(handler,
+         collection_name: str,
+         target_recall: float,
+         top_k: int = 10,
+         queries=None,
+         truth_ids=None,
+         sample: int = 200,
+         directory: str = None,
+         batch_size: int = 100,
+         max_rows: int = MAX_TUNING_ROWS,
+         timeout: int = 60):
+    """
+    Smallest `nprobe`, or HNSW `ef`, whose recall@k on a sample reaches
+    `target_recall`: the value is doubled until it does, then bisected
+
+    Queries are sampled from the collection unless given, and their ground
+    truth computed by brute force over an export of the collection unless
+    given, see `evaluation.collection_ground_truth`. That export reads and
+    writes every vector of the collection: run tunings from one worker, not
+    from every process searching.
+
+    :type  directory: str
+    :param directory: export of the collection, kept and resumed; a
+        temporary one is used by default
+
+    :type  max_rows: int
+    :param max_rows: largest collection exported for the ground truth, a
+        larger one is refused unless `truth_ids` is given; None for no cap
+
+    :returns:
+        Status: indicate if operation is successful
+        TuningResult: None when the index has no search param to tune
+    """
+    status, index_param = handler.describe_index(collection_name, timeout)
+    if not status.ok():
+        return status, None
+
+    parameter = search_parameter(index_param, top_k)
+    if parameter is None:
+        return Status(), None
+    name, lowest, highest = parameter
+
+    exclude_ids = None
+    if queries is None:
+        # sampled queries find themselves, left out of truth and hits
+        status, exclude_ids, queries = evaluation.sample_queries(
+            handler, collection_name, sample, timeout=timeout)
+        if not status.ok():
+            return status, None
+    if truth_ids is None:
+        status, rows = handler.get_table_row_count(collection_name, timeout)
+        if not status.ok():
+            return status, None
+        if max_rows is not None and rows > max_rows:
+            return Status(
+                Status.ILLEGAL_ARGUMENT,
+                "{} holds {} rows, over the {} exported for a tuning".format(
+                    collection_name, rows, max_rows)), None
+        with tempfile.TemporaryDirectory() as scratch:
+            status, truth_ids = evaluation.collection_ground_truth(
+                handler,
+                collection_name,
+                queries,
+                top_k,
+                directory or scratch,
+                exclude_ids=exclude_ids,
+                timeout=timeout)
+        if not status.ok():
+            return status, None
+
+    evaluations = dict()
+
+    def recall(value):
+        if value not in evaluations:
+            report = evaluation.evaluate(handler,
+                                         collection_name,
+                                         queries,
+                                         truth_ids,
+                                         top_k, [{name: value}],
+                                         batch_size=batch_size,
+                                         warmup=0,
+                                         exclude_ids=exclude_ids,
+                                         timeout=timeout)
+            evaluations[value] = report.results[0].recall
+        return evaluations[value]
+
+    # doubling finds a passing value, bisection the smallest one below it
+    failing = lowest - 1
+    passing = lowest
+    while recall(passing) < target_recall and passing < highest:
+        failing = passing
+        passing = min(highest, passing * 2)
+    if recall(passing) >= target_recall:
+        while passing - failing > 1:
+            middle = (failing + passing) // 2
+            if recall(middle) >= target_recall:
+                passing = middle
+            else:
+                failing = middle
+
+    result = TuningResult(collection_name, index_fingerprint(index_param),
+                          {name: passing}, recall(passing), target_recall,
+                          top_k, evaluations)
+    logger.info("Tuned {}: {}".format(collection_name, result))
+    return Status(), result
+
+
+class AutoTuner:
+    """
+    Tuned search params of every collection, re-tuned once its index
+    changes
+
+    A tuning exports the whole collection, see `tune`, so tunings only
+    come from `tune` calls and from `path` by default, which processes
+    share: one worker tunes, every process searching reads the file again
+    once it changed. With `auto_tune`, a collection whose index has no
+    tuning yet is tuned at its first search, in a background thread,
+    meanwhile searches get `default_params`.
+
+    Params are tuned for recall@`top_k`. Searches of another top k get the
+    same `nprobe`, HNSW `ef` being raised to their top k only: recall of a
+    larger top k may fall below the target, which is logged once per
+    collection. Tune with the largest top k searched to avoid it.
+
+    The index of a collection is described again at most every
+    `check_interval` seconds, or at the next search after `invalidate`.
+
+    :type  target_recall: float
+    :param target_recall: recall@k the tuned params reach on the sample
+
+    :type  path: str
+    :param path: JSON file keeping the tunings across restarts, shared by
+        the processes using it
+
+    :type  auto_tune: bool
+    :param auto_tune: tune collections when they are searched, in the
+        searching process
+
+    :type  background: bool
+    :param background: False tunes within the search needing it
+
+    :type  max_rows: int
+    :param max_rows: largest collection tuned, see `tune`
+    """
+    def __init__(self,
+                 target_recall: float = 0.95,
+                 top_k: int = 10,
+                 sample: int = 200,
+                 check_interval: float = 60.0,
+                 path: str = None,
+                 auto_tune: bool = False,
+                 background: bool = True,
+                 max_rows: int = MAX_TUNING_ROWS,
+                 timeout: int = 600):
+        self.target_recall = target_recall
+        self.top_k = top_k
+        self.sample = sample
+        self.check_interval = check_interval
+        self.auto_tune = auto_tune
+        self.max_rows = max_rows
+        self._path = path
+        self._background = background
+        self._timeout = timeout
+        self._results = dict()
+        self._indexes = dict()
+        self._tuning = set()
+        self._warned = set()
+        self._loaded = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _read(self):
+        """
+        Tunings of the file, by collection
+        """
+        if self._path is None or not os.path.exists(self._path):
+            return dict()
+        with open(self._path, mode='r', encoding='utf-8') as file:
+            documents = json.load(file)
+        results = [TuningResult.from_dict(item) for item in documents]
+        return {result.collection_name: result for result in results}
+
+    def _reload(self):
+        """
+        Take the tunings of the file once another process rewrote it
+        """
+        if self._path is None or not os.path.exists(self._path):
+            return
+        modified = os.stat(self._path).st_mtime_ns
+        if modified == self._loaded:
+            return
+        results = self._read()
+        with self._lock:
+            self._results.update(results)
+            self._loaded = modified
+
+    def result(self, collection_name: str):
+        with self._lock:
+            return self._results.get(collection_name, None)
+
+    def invalidate(self, collection_name: str):
+        """
+        Describe the index of a collection again at its next search
+        """
+        with self._lock:
+            self._indexes.pop(collection_name, None)
+
+    def forget(self, collection_name: str):
+        with self._lock:
+            self._indexes.pop(collection_name, None)
+            self._results.pop(collection_name, None)
+            self._warned.discard(collection_name)
+        self._save(collection_name)
+
+    def stale(self, handler, collection_name: str, timeout: int = None):
+        """
+        Whether the index of a collection has a search param and no tuning
+        of its current build
+        """
+        self.invalidate(collection_name)
+        index_param = self._index(handler, collection_name, timeout)
+        if index_param is None or \
+                search_parameter(index_param, self.top_k) is None:
+            return False
+        result = self.result(collection_name)
+        return result is None or \
+            result.fingerprint != index_fingerprint(index_param)
+
+    def tune(self, handler, collection_name: str):
+        """
+        Tune a collection now, saving the result to `path`
+
+        :return: TuningResult, None when it failed or the index has no
+            search param
+        """
+        with self._lock:
+            self._tuning.add(collection_name)
+        return self._tune(handler, collection_name)
+
+    def _index(self, handler, collection_name: str, timeout: int):
+        with self._lock:
+            known = self._indexes.get(collection_name, None)
+        if known is not None and \
+                time.monotonic() - known[0] < self.check_interval:
+            return known[1]
+
+        status, index_param = handler.describe_index(collection_name,
+                                                     timeout)
+        if not status.ok():
+            return None
+        with self._lock:
+            self._indexes[collection_name] = (time.monotonic(), index_param)
+        return index_param
+
+    def params(self, handler, collection_name: str, top_k: int,
+               timeout: int = None):
+        """
+        Search params of a collection, tuning it if its index is not and
+        `auto_tune` is on
+        """
+        if time.monotonic() - self._checked >= self.check_interval:
+            self._checked = time.monotonic()
+            self._reload()
+        index_param = self._index(handler, collection_name, timeout)
+        if index_param is None or \
+                search_parameter(index_param, top_k) is None:
+            return default_params(index_param, top_k)
+
+        fingerprint = index_fingerprint(index_param)
+        with self._lock:
+            result = self._results.get(collection_name, None)
+            fresh = result is not None and result.fingerprint == fingerprint
+            start = not fresh and self.auto_tune and \
+                collection_name not in self._tuning
+            if start:
+                self._tuning.add(collection_name)
+        if fresh:
+            if top_k > result.top_k:
+                self._warn_top_k(collection_name, result, top_k)
+            params = dict(result.params)
+            # ef below top k is refused
+            if "ef" in params:
+                params["ef"] = max(params["ef"], top_k)
+            return params
+
+        if start and self._background:
+            threading.Thread(target=self._tune,
+                             args=(handler, collection_name),
+                             name="milvus-autotune",
+                             daemon=True).start()
+        elif start:
+            result = self._tune(handler, collection_name)
+            if result is not None:
+                return dict(result.params)
+        return default_params(index_param, top_k)
+
+    def _warn_top_k(self, collection_name: str, result: TuningResult,
+                    top_k: int):
+        with self._lock:
+            if collection_name in self._warned:
+                return
+            self._warned.add(collection_name)
+        logger.warning(
+            "{} is tuned for recall@{}, searches of top k {} may not reach "
+            "{}".format(collection_name, result.top_k, top_k,
+                        result.target_recall))
+
+    def _tune(self, handler, collection_name: str):
+        result = None
+        try:
+            status, result = tune(handler,
+                                  collection_name,
+                                  self.target_recall,
+                                  top_k=self.top_k,
+                                  sample=self.sample,
+                                  max_rows=self.max_rows,
+                                  timeout=self._timeout)
+            if not status.ok():
+                logger.warning("Tuning of {} failed: {}".format(
+                    collection_name, status))
+        except Exception as ex:
+            logger.warning("Tuning of {} failed: {}".format(
+                collection_name, ex))
+        finally:
+            with self._lock:
+                self._tuning.discard(collection_name)
+                if result is not None:
+                    self._results[collection_name] = result
+        if result is not None:
+            self._save(collection_name)
+        return result
+
+    def _save(self, collection_name: str):
+        """
+        Write the tuning of a collection to the file, keeping those other
+        processes wrote for other collections
+        """
+        if self._path is None:
+            return
+        results = self._read()
+        with self._lock:
+            result = self._results.get(collection_name, None)
+        if result is None:
+            results.pop(collection_name, None)
+        else:
+            results[collection_name] = result
+        documents = [result.to_dict() for result in results.values()]
+        temporary = "{}.{}.tmp".format(self._path, os.getpid())
+        with open(temporary, mode='w', encoding='utf-8') as file:
+            json.dump(documents, file, indent=2)
+        os.replace(temporary, self._path)
+
+    def __repr__(self):
+        with self._lock:
+            return '%s(target_recall=%r, top_k=%r, results=%r)' % (
+                self.__class__.__name__, self.target_recall, self.top_k,
+                list(self._results.values()))
@@ -0,0 +1,377 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .constants import Status
+
+logger = logging.getLogger(__name__)
+
+
+class AimdController:
+    """
+    Additive increase, multiplicative decrease of insert batch size and
+    concurrency
+
+    While batches finish under `target_latency` without error, the batch
+    size grows by `batch_step` and, every `concurrency_every` good batches,
+    concurrency grows by one. A slow or failed batch cuts both by
+    `decrease_factor`, at most once per `cooldown` seconds so a burst of
+    failures in flight counts as one congestion signal.
+
+    :type  target_latency: float
+    :param target_latency: seconds, insert latency target
+
+    :type  max_error_rate: float
+    :param max_error_rate: error rate tolerated over the recent batches
+    """
+    def __init__(self,
+                 batch_size: int = 1000,
+                 min_batch_size: int = 100,
+                 max_batch_size: int = 50000,
+                 batch_step: int = 500,
+                 concurrency: int = 1,
+                 min_concurrency: int = 1,
+                 max_concurrency: int = 8,
+                 concurrency_every: int = 4,
+                 target_latency: float = 1.0,
+                 max_error_rate: float = 0.05,
+                 decrease_factor: float = 0.5,
+                 cooldown: float = 1.0,
+                 window: int = 20):
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_step = batch_step
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency_every = concurrency_every
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self._batch_size = min(max(batch_size, min_batch_size),
+                               max_batch_size)
+        self._concurrency = min(max(concurrency, min_concurrency),
+                                max_concurrency)
+        self._outcomes = deque(maxlen=window)
+        self._good = 0
+        self._decreased_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self):
+        with self._lock:
+            return self._batch_size
+
+    @property
+    def concurrency(self):
+        with self._lock:
+            return self._concurrency
+
+    def record(self, latency: float, success: bool):
+        """
+        Adjust the limits with the outcome of a batch
+        """
+        with self._lock:
+            self._outcomes.append(not success)
+            error_rate = sum(self._outcomes) / len(self._outcomes)
+            if (not success or latency > self.target_latency
+                    or error_rate > self.max_error_rate):
+                self._decrease()
+            else:
+                self._increase()
+
+    def _decrease(self):
+        self._good = 0
+        now = time.monotonic()
+        if now - self._decreased_at < self.cooldown:
+            return
+
+        self._decreased_at = now
+        self._batch_size = max(self.min_batch_size,
+                               int(self._batch_size * self.decrease_factor))
+        self._concurrency = max(
+            self.min_concurrency,
+            int(self._concurrency * self.decrease_factor))
+
+    def _increase(self):
+        self._good += 1
+        self._batch_size = min(self.max_batch_size,
+                               self._batch_size + self.batch_step)
+        if self._good >= self.concurrency_every:
+            self._good = 0
+            self._concurrency = min(self.max_concurrency,
+                                    self._concurrency + 1)
+
+    def __repr__(self):
+        return '%s(batch_size=%r, concurrency=%r)' % (
+            self.__class__.__name__, self.batch_size, self.concurrency)
+
+
+class TokenBucket:
+    """
+    Cap of the insert rate, to keep room for foreground searches
+
+    :type  rate: float
+    :param rate: vectors per second
+
+    :type  burst: float
+    :param burst: bucket size in vectors, `rate` by default
+
+    :type  clock: callable
+    :param clock: seconds of a monotonic clock
+
+    :type  sleep: callable
+    :param sleep: wait of the given seconds
+
+    A batch larger than the tokens left puts the bucket in debt, its caller
+    sleeping until the debt is paid off, so the sustained rate holds
+    whatever the batch size.
+    """
+    def __init__(self, rate: float, burst: float = None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, count: int):
+        """
+        Block until `count` vectors may be sent
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # reserved at once, a caller sleeps off the debt it made
+            self._tokens -= count
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+
+
+class _Rebatcher:
+    """
+    Cut a stream of (records, ids) chunks into batches of any size
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._records = None
+        self._ids = None
+        self._offset = 0
+
+    def _next_chunk(self):
+        for records, ids in self._chunks:
+            if len(records) > 0:
+                self._records, self._ids, self._offset = records, ids, 0
+                return True
+        return False
+
+    def take(self, size: int):
+        """
+        Up to `size` rows as (records, ids), None once exhausted
+
+        Slices of ndarray chunks stay ndarrays, the encoder of the handler
+        formats them without a detour through lists.
+        """
+        records, ids = [], []
+        with_ids = None
+        while size > 0:
+            if self._records is None or self._offset >= len(self._records):
+                if not self._next_chunk():
+                    break
+
+            end = min(len(self._records), self._offset + size)
+            records.append(self._records[self._offset:end])
+            with_ids = self._ids is not None
+            if with_ids:
+                ids.append(self._ids[self._offset:end])
+            size -= end - self._offset
+            self._offset = end
+
+        if not records:
+            return None
+        return _join(records), _join(ids) if with_ids else None
+
+
+def _join(parts):
+    if all(isinstance(part, np.ndarray) for part in parts):
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    joined = []
+    for part in parts:
+        joined.extend(
+            part.tolist() if isinstance(part, np.ndarray) else part)
+    return joined
+
+
+class BulkInsertResult:
+    """
+    Outcome of a bulk insert
+
+    :attribute ids: list of inserted ids, in batch completion order
+
+    :attribute failures: list of (Status, batch size)
+    """
+    def __init__(self):
+        self.ids = []
+        self.failures = []
+        self.inserted = 0
+        self.elapsed = 0.0
+
+    @property
+    def status(self):
+        if self.failures:
+            return self.failures[0][0]
+        return Status()
+
+    @property
+    def vectors_per_second(self):
+        return self.inserted / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return ('%s(inserted=%r, failures=%r, elapsed=%.3f, '
+                'vectors_per_second=%.1f)' %
+                (self.__class__.__name__, self.inserted, len(self.failures),
+                 self.elapsed, self.vectors_per_second))
+
+
+class BulkInserter:
+    """
+    Insert a large stream of vectors with adaptive batch size and concurrency
+
+    :type  handler: MilvusAbstract
+    :param handler: client handler
+
+    :type  controller: AimdController
+    :param controller: batch size and concurrency controller
+
+    :type  token_bucket: TokenBucket
+    :param token_bucket: optional cap of the vectors sent per second
+    """
+    def __init__(self,
+                 handler,
+                 collection_name: str,
+                 partition_tag: str = None,
+                 controller: AimdController = None,
+                 token_bucket: TokenBucket = None,
+                 timeout: int = None,
+                 report_interval: float = None):
+        self._handler = handler
+        self._collection_name = collection_name
+        self._partition_tag = partition_tag
+        self._controller = controller or AimdController()
+        self._token_bucket = token_bucket
+        self._timeout = timeout
+        self._report_interval = report_interval
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._inserted = 0
+        self._errors = 0
+        self._recent = deque()
+        self._started = None
+
+    @property
+    def controller(self):
+        return self._controller
+
+    def stats(self):
+        """
+        Current limits and throughput, safe to call while inserting
+        """
+        with self._condition:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0][0] > 5.0:
+                self._recent.popleft()
+            recent = sum(count for _, count in self._recent)
+            span = min(5.0, now - self._started) if self._started else 0.0
+            return {
+                "batch_size": self._controller.batch_size,
+                "concurrency": self._controller.concurrency,
+                "in_flight": self._in_flight,
+                "inserted": self._inserted,
+                "errors": self._errors,
+                "vectors_per_second": recent / span if span > 0 else 0.0,
+            }
+
+    def _send(self, records, ids, result: BulkInsertResult):
+        start = time.monotonic()
+        status, inserted = Status(Status.UNEXPECTED_ERROR), []
+        try:
+            status, inserted = self._handler.add_vectors(
+                collection_name=self._collection_name,
+                records=records,
+                ids=ids,
+                partition_tag=self._partition_tag,
+                timeout=self._timeout)
+        except Exception as ex:
+            status = Status(Status.UNEXPECTED_ERROR, message=str(ex))
+        finally:
+            latency = time.monotonic() - start
+            self._controller.record(latency, status.ok())
+            with self._condition:
+                self._in_flight -= 1
+                if status.ok():
+                    self._inserted += len(records)
+                    self._recent.append((time.monotonic(), len(records)))
+                    result.ids.extend(inserted)
+                    result.inserted += len(records)
+                else:
+                    self._errors += 1
+                    result.failures.append((status, len(records)))
+                self._condition.notify_all()
+
+    def insert(self, records, ids=None):
+        """
+        Insert vectors held in memory, an ndarray or a list of rows
+
+        :return: BulkInsertResult
+        """
+        return self.insert_chunks([(records, ids)])
+
+    def insert_chunks(self, chunks):
+        """
+        Insert a stream of (records, ids) chunks, ids may be None
+
+        :return: BulkInsertResult
+        """
+        result = BulkInsertResult()
+        batches = _Rebatcher(chunks)
+        self._started = time.monotonic()
+        last_report = self._started
+        with ThreadPoolExecutor(
+                max_workers=self._controller.max_concurrency,
+                thread_name_prefix="milvus-bulk-insert") as executor:
+            while True:
+                with self._condition:
+                    while self._in_flight >= self._controller.concurrency:
+                        self._condition.wait()
+
+                batch = batches.take(self._controller.batch_size)
+                if batch is None:
+                    break
+
+                records, ids = batch
+                if self._token_bucket is not None:
+                    self._token_bucket.acquire(len(records))
+                with self._condition:
+                    self._in_flight += 1
+                executor.submit(self._send, records, ids, result)
+
+                now = time.monotonic()
+                if (self._report_interval is not None
+                        and now - last_report >= self._report_interval):
+                    last_report = now
+                    logger.info("Bulk insert {}".format(self.stats()))
+
+        result.elapsed = time.monotonic() - self._started
+        return result
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Request refused locally because the circuit of the endpoint is open
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one endpoint
+
+    The circuit opens when, over the last `window` calls, the failure rate
+    or the slow call rate passes its threshold. Once `open_seconds` have
+    elapsed it lets `probes` trial calls through, closes again if they all
+    succeed and reopens on the first failing one.
+
+    :type  failure_rate: float
+    :param failure_rate: failed call ratio opening the circuit
+
+    :type  slow_call_seconds: float
+    :param slow_call_seconds: calls slower than this count as slow, None
+        disables the latency threshold
+
+    :type  slow_call_rate: float
+    :param slow_call_rate: slow call ratio opening the circuit
+
+    :type  window: int
+    :param window: number of recent calls the rates are computed on
+
+    :type  min_calls: int
+    :param min_calls: calls needed in the window before the circuit can open
+
+    :type  open_seconds: float
+    :param open_seconds: time spent open before the trial probes
+
+    :type  probes: int
+    :param probes: trial calls let through while half-open
+    """
+    def __init__(self,
+                 failure_rate: float = 0.5,
+                 slow_call_seconds: float = None,
+                 slow_call_rate: float = 0.8,
+                 window: int = 20,
+                 min_calls: int = 10,
+                 open_seconds: float = 5.0,
+                 probes: int = 3,
+                 on_state_change=None):
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self._on_state_change = on_state_change
+
+        self._calls = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._expire()
+            return self._state
+
+    def _transition(self, state):
+        previous, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == HALF_OPEN:
+            self._probes_started = self._probes_passed = 0
+        if state == CLOSED:
+            self._calls.clear()
+        if self._on_state_change is not None and previous != state:
+            self._on_state_change(previous, state)
+
+    def _expire(self):
+        if self._state == OPEN and (time.monotonic() - self._opened_at >=
+                                    self.open_seconds):
+            self._transition(HALF_OPEN)
+
+    def allow(self):
+        """
+        Whether a call may be sent now
+        """
+        with self._lock:
+            self._expire()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_started < self.probes:
+                self._probes_started += 1
+                return True
+            return False
+
+    def release(self):
+        """
+        Give back the probe of an allowed call which got no outcome
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_started > 0:
+                self._probes_started -= 1
+
+    def record(self, success: bool, latency: float):
+        """
+        Record the outcome of an allowed call
+        """
+        slow = (self.slow_call_seconds is not None
+                and latency > self.slow_call_seconds)
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if not success or slow:
+                    self._transition(OPEN)
+                    return
+                self._probes_passed += 1
+                if self._probes_passed >= self.probes:
+                    self._transition(CLOSED)
+                return
+
+            if self._state != CLOSED:
+                return
+
+            self._calls.append((not success, slow))
+            if len(self._calls) < self.min_calls:
+                return
+
+            failures = sum(1 for failed, _ in self._calls if failed)
+            slows = sum(1 for _, is_slow in self._calls if is_slow)
+            if (failures / len(self._calls) >= self.failure_rate
+                    or slows / len(self._calls) >= self.slow_call_rate):
+                self._transition(OPEN)
+
+    def __repr__(self):
+        return '%s(state=%r)' % (self.__class__.__name__, self.state)
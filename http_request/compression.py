@@ -0,0 +1,153 @@
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+GZIP = "gzip"
+
+# Status of a server refusing the Content-Encoding of a body
+UNSUPPORTED_MEDIA_TYPE = 415
+
+# Words of a 400 body telling the server could not decode the request, the
+# ones of ordinary parameter errors do not hold them
+_DECODING_ERRORS = ("gzip", "encoding", "decod", "parse", "malformed")
+
+_GZIP_HEADER = b"\x1f\x8b\x08\x00" + struct.pack("<I", 0) + b"\x00\xff"
+
+
+def rejects_gzip(response):
+    """
+    Whether `response` refuses a gzip body rather than its content
+
+    Milvus answers 400 to parameter errors too, such a status only counts
+    when its body reports a decoding error.
+    """
+    if response.status_code == UNSUPPORTED_MEDIA_TYPE:
+        return True
+    if response.status_code != 400:
+        return False
+
+    text = (getattr(response, "text", None) or "")[:1024].lower()
+    return any(word in text for word in _DECODING_ERRORS)
+
+
+class Compressor:
+    """
+    Gzip compression of request bodies
+
+    Bodies under `threshold` bytes are sent as they are. Bodies of at least
+    `parallel_threshold` bytes are cut in `chunk_size` slices deflated on a
+    worker pool, zlib releasing the GIL, and joined into one gzip member
+    the way pigz does, so the caller thread only computes the CRC.
+
+    :type  threshold: int
+    :param threshold: bytes, smallest body compressed
+
+    :type  level: int
+    :param level: zlib compression level, 1 (fast) to 9 (small)
+
+    :type  parallel_threshold: int
+    :param parallel_threshold: bytes, smallest body compressed off the
+        caller thread
+
+    :type  chunk_size: int
+    :param chunk_size: bytes deflated per worker task
+    """
+    def __init__(self,
+                 threshold: int = 64 * 1024,
+                 level: int = 6,
+                 parallel_threshold: int = 8 * 1024 * 1024,
+                 chunk_size: int = 1024 * 1024,
+                 max_workers: int = 4):
+        if not 1 <= level <= 9:
+            raise ValueError("level must be within [1, 9]")
+
+        self.threshold = threshold
+        self.level = level
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def accepts(self, data):
+        """
+        Whether `data` is a body worth compressing
+        """
+        return isinstance(data, (bytes, bytearray, str)) and \
+            len(data) >= self.threshold
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix="milvus-gzip")
+            return self._executor
+
+    def _deflate(self, chunk, last: bool):
+        deflater = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return deflater.compress(chunk) + deflater.flush(
+            zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    def compress(self, data):
+        """
+        Gzip member of `data`
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        view = memoryview(data)
+        if len(data) < self.parallel_threshold:
+            blocks = [self._deflate(view, True)]
+        else:
+            futures = [
+                self._pool().submit(self._deflate,
+                                    view[offset:offset + self.chunk_size],
+                                    offset + self.chunk_size >= len(data))
+                for offset in range(0, len(data), self.chunk_size)
+            ]
+        crc = zlib.crc32(view)
+        if len(data) >= self.parallel_threshold:
+            blocks = [future.result() for future in futures]
+
+        trailer = struct.pack("<II", crc, len(data) & 0xffffffff)
+        return b"".join([_GZIP_HEADER] + blocks + [trailer])
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+class CompressionStats:
+    """
+    Body bytes before and after compression, for benchmarks and metrics
+    """
+    def __init__(self):
+        self.requests = 0
+        self.compressed = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, raw: int, sent: int, seconds: float = 0.0):
+        with self._lock:
+            self.requests += 1
+            self.compressed += int(sent != raw)
+            self.raw_bytes += raw
+            self.sent_bytes += sent
+            self.seconds += seconds
+
+    @property
+    def ratio(self):
+        return self.sent_bytes / self.raw_bytes if self.raw_bytes else 1.0
+
+    def __repr__(self):
+        return ('%s(requests=%r, compressed=%r, raw_bytes=%r, sent_bytes=%r, '
+                'ratio=%.3f, seconds=%.3f)' %
+                (self.__class__.__name__, self.requests, self.compressed,
+                 self.raw_bytes, self.sent_bytes, self.ratio, self.seconds))
+
@@ -31,6 +31,10 @@ class Status:
     ILLEGAL_METRIC_TYPE = 23
     OUT_OF_MEMORY = 24
 
+    # client side codes
+    CIRCUIT_OPEN = 100
+    DEADLINE_EXCEEDED = 101
+
     def __init__(self, code=SUCCESS, message="Success"):
         self.code = code
         self.message = message
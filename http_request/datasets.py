@@ -0,0 +1,208 @@
+import os
+
+import numpy as np
+
+from milvus import ParamError
+from .bulk_insert import BulkInserter
+
+NPY = "npy"
+FVECS = "fvecs"
+BVECS = "bvecs"
+IVECS = "ivecs"
+
+# Component type of each *vecs format, every row is an int32 dimension
+# followed by that many components
+_VECS_TYPES = {
+    FVECS: np.float32,
+    BVECS: np.uint8,
+    IVECS: np.int32,
+}
+
+
+def _map_vecs(path: str, kind: str):
+    component = np.dtype(_VECS_TYPES[kind])
+    size = os.path.getsize(path)
+    if size == 0:
+        return np.empty((0, 0), dtype=component)
+
+    dim = int(np.fromfile(path, dtype=np.int32, count=1)[0]) \
+        if size >= 4 else 0
+    row_bytes = 4 + dim * component.itemsize
+    if dim <= 0 or size % row_bytes:
+        raise ParamError("{} is not a valid {} file".format(path, kind))
+
+    rows = size // row_bytes
+    raw = np.memmap(path, dtype=np.uint8, mode="r")
+    last = raw[size - row_bytes:size - row_bytes + 4].view(np.int32)[0]
+    if last != dim:
+        raise ParamError("{} mixes dimensions {} and {}".format(
+            path, dim, last))
+
+    # strided view skipping the dimension of every row, a view of another
+    # itemsize over a non-contiguous slice needs numpy 1.23
+    return np.ndarray(shape=(rows, dim),
+                      dtype=component,
+                      buffer=raw,
+                      offset=4,
+                      strides=(row_bytes, component.itemsize))
+
+
+def _kind_of(path: str):
+    return os.path.splitext(path)[1].lstrip(".").lower()
+
+
+def open_array(path: str, kind: str = None):
+    """
+    Memory-mapped 2-d array of a vector file, nothing is read up front
+
+    :type  kind: str
+    :param kind: `npy`, `fvecs`, `bvecs` or `ivecs`, from the extension of
+        the path by default
+    """
+    kind = kind or _kind_of(path)
+    if kind == NPY:
+        array = np.load(path, mmap_mode="r")
+    elif kind in _VECS_TYPES:
+        array = _map_vecs(path, kind)
+    else:
+        raise ParamError("Unknown vector file format `{}`".format(kind))
+
+    if array.ndim != 2:
+        raise ParamError("{} does not hold a 2-dimensional array".format(path))
+    return array
+
+
+class VectorDataset:
+    """
+    Rows `offset` to `offset + limit` of a memory-mapped vector file
+
+    Disjoint ranges of one file can be ingested by different workers, see
+    `shard`.
+
+    :type  path: str
+    :param path: .npy, .fvecs, .bvecs or .ivecs file
+
+    :type  offset: int
+    :param offset: first row
+
+    :type  limit: int
+    :param limit: max rows, all the remaining ones by default
+    """
+    def __init__(self,
+                 path: str,
+                 offset: int = 0,
+                 limit: int = None,
+                 kind: str = None):
+        self._path = path
+        self._kind = kind or _kind_of(path)
+        self._file = open_array(path, self._kind)
+        total = len(self._file)
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ParamError("`offset` and `limit` must not be negative")
+
+        self._offset = min(offset, total)
+        end = total if limit is None else min(total, self._offset + limit)
+        self._rows = self._file[self._offset:end]
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def offset(self):
+        return self._offset
+
+    @property
+    def dim(self):
+        return self._rows.shape[1]
+
+    @property
+    def dtype(self):
+        return self._rows.dtype
+
+    @property
+    def rows(self):
+        """
+        Memory-mapped view of the rows
+        """
+        return self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def shard(self, index: int, count: int):
+        """
+        Part `index` of `count` disjoint, contiguous parts of this dataset
+        """
+        if not 0 <= index < count:
+            raise ParamError("Shard {} out of {}".format(index, count))
+
+        start = len(self) * index // count
+        end = len(self) * (index + 1) // count
+        return VectorDataset(self._path,
+                             offset=self._offset + start,
+                             limit=end - start,
+                             kind=self._kind)
+
+    def batches(self, batch_size: int = 10000):
+        """
+        Memory-mapped views of `batch_size` rows, pages are only read when
+        a batch is encoded
+        """
+        for start in range(0, len(self), batch_size):
+            yield self._rows[start:start + batch_size]
+
+    def chunks(self, batch_size: int = 10000, ids=None,
+               row_ids: bool = False):
+        """
+        (records, ids) chunks for `BulkInserter.insert_chunks`
+
+        :type  ids: numpy.ndarray
+        :param ids: ids of the rows of this dataset, e.g. the rows of an
+            ivecs file
+
+        :type  row_ids: bool
+        :param row_ids: use the row numbers in the file as ids, so retried
+            or repeated ingestions of a range write the same ids
+        """
+        if ids is not None and len(ids) != len(self):
+            raise ParamError("{} ids for {} rows".format(len(ids), len(self)))
+
+        for start in range(0, len(self), batch_size):
+            end = min(len(self), start + batch_size)
+            if ids is not None:
+                batch_ids = np.asarray(ids[start:end]).reshape(-1)
+            elif row_ids:
+                batch_ids = np.arange(self._offset + start, self._offset + end)
+            else:
+                batch_ids = None
+            yield self._rows[start:end], batch_ids
+
+    def __repr__(self):
+        return '%s(path=%r, offset=%r, rows=%r, dim=%r, dtype=%s)' % (
+            self.__class__.__name__, self._path, self._offset, len(self),
+            self.dim, self.dtype)
+
+
+def ingest(handler,
+           collection_name: str,
+           dataset: VectorDataset,
+           partition_tag: str = None,
+           batch_size: int = 10000,
+           ids=None,
+           row_ids: bool = False,
+           **kwargs):
+    """
+    Insert a dataset through the adaptive bulk insert path
+
+    Batches of `batch_size` rows are read from the mapped file and re-cut to
+    the batch size of the AIMD controller, see `BulkInserter`.
+
+    :return: BulkInsertResult
+    """
+    inserter = BulkInserter(handler,
+                            collection_name,
+                            partition_tag=partition_tag,
+                            **kwargs)
+    return inserter.insert_chunks(
+        dataset.chunks(batch_size, ids=ids, row_ids=row_ids))
@@ -0,0 +1,80 @@
+import contextlib
+import contextvars
+import time
+
+import requests
+
+# Deadline of the handler call in progress, inherited by nested calls
+current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceededError(requests.exceptions.RequestException):
+    """
+    The time budget of the call is spent
+    """
+
+
+class Deadline:
+    """
+    Point in time by which a call, with all its sub-requests, must be done
+
+    :type  seconds: float
+    :param seconds: time budget from now
+    """
+    def __init__(self, seconds: float):
+        self._expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def of(cls, value):
+        """
+        Deadline from a Deadline or a number of seconds, None stays None
+        """
+        if value is None or isinstance(value, Deadline):
+            return value
+
+        return cls(float(value))
+
+    def remaining(self):
+        """
+        Seconds left, negative once expired
+        """
+        return self._expires_at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, timeout: float = None):
+        """
+        `timeout` capped to the remaining budget
+        """
+        remaining = max(0.0, self.remaining())
+        if timeout is None:
+            return remaining
+
+        return min(timeout, remaining)
+
+    def __repr__(self):
+        return '%s(remaining=%.3f)' % (self.__class__.__name__,
+                                       self.remaining())
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline):
+    """
+    Share one deadline with every handler call made in the block
+
+    :type  deadline: Deadline or float
+    :param deadline: Deadline or seconds, None keeps the current deadline
+    """
+    deadline = Deadline.of(deadline)
+    current = current_deadline.get()
+    if deadline is None or (current is not None
+                            and current.remaining() <= deadline.remaining()):
+        yield current
+        return
+
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        current_deadline.reset(token)
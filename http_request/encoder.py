@@ -0,0 +1,281 @@
+import json
+import threading
+
+import numpy as np
+
+
+class _Marker:
+    """
+    Marks where encoded values go in a request document
+    """
+    def __init__(self, name: str):
+        self._name = name
+        self.placeholder = json.dumps("\x00milvus-{}\x00".format(name))
+
+    def __repr__(self):
+        return self._name
+
+
+VECTORS = _Marker("VECTORS")
+# ids streamed by `iter_dumps`, as strings
+IDS = _Marker("IDS")
+
+
+def shortest_digits(values):
+    """
+    Fewest significant digits, 1 to 9, with which each float32 value
+    round-trips through `%g` formatting
+
+    :type  values: numpy.ndarray
+    :param values: float32 values
+    """
+    flat = values.ravel()
+    x = flat.astype(np.float64)
+    digits = np.full(x.shape, 9, dtype=np.int8)
+    digits[x == 0] = 1
+
+    nonzero = np.flatnonzero((x != 0) & np.isfinite(x))
+    magnitude = np.abs(x[nonzero])
+    exponent = np.floor(np.log10(magnitude))
+    exponent[magnitude >= 10.0**(exponent + 1)] += 1
+    exponent[magnitude < 10.0**exponent] -= 1
+
+    def round_trips(candidates, count):
+        index = nonzero[candidates]
+        scale = 10.0**(count - 1 - exponent[candidates])
+        rounded = np.round(x[index] * scale) / scale
+        with np.errstate(over='ignore'):
+            return rounded.astype(np.float32) == flat[index]
+
+    # Random float32 data mostly needs 7 or 8 digits, start in between
+    candidates = np.arange(len(nonzero))
+    ok = round_trips(candidates, 7)
+    longer, shorter = candidates[~ok], candidates[ok]
+    digits[nonzero[shorter]] = 7
+    if len(longer):
+        digits[nonzero[longer[round_trips(longer, 8)]]] = 8
+    for count in range(6, 0, -1):
+        if not len(shorter):
+            break
+        ok = round_trips(shorter, count)
+        shorter = shorter[ok]
+        digits[nonzero[shorter]] = count
+
+    # `%g` turns to exponent notation once the exponent reaches the digits,
+    # e.g. 1e+02, pad whole numbers while the positional form is shorter
+    found = digits[nonzero]
+    exponent_length = found + (found > 1) + 4
+    positional = ((exponent >= found) & (exponent < 9)
+                  & (exponent + 1 <= exponent_length))
+    digits[nonzero[positional]] = exponent[positional] + 1
+
+    return digits.reshape(values.shape)
+
+
+class VectorEncoder:
+    """
+    JSON encoder of the vectors of insert and search bodies
+
+    Floats are sent as float32, the type the server stores, written with
+    the shortest representation which round-trips, or with a fixed number
+    of significant digits. Each row is laid out by a `%` format template
+    built in NumPy, so the values are formatted in one C-level pass instead
+    of a `json.dumps` walk over nested lists.
+
+    :type  digits: int
+    :param digits: significant digits of every float, None writes the
+        shortest round-trip representation
+    """
+    def __init__(self, digits: int = None):
+        if digits is not None and not 1 <= digits <= 17:
+            raise ValueError("digits must be within [1, 17]")
+
+        self._digits = digits
+        self._local = threading.local()
+
+    @property
+    def digits(self):
+        return self._digits
+
+    def _scratch(self, size: int):
+        """
+        Template buffer of the calling thread, grown on demand and reused
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.size < size:
+            buffer = self._local.buffer = np.empty(max(size, 1 << 16),
+                                                   dtype=np.uint8)
+        return buffer[:size]
+
+    def _shortest_template(self, digits):
+        rows, dim = digits.shape
+        width = dim * 5 + 2
+        template = self._scratch(rows * width).reshape(rows, width)
+        template[:, 0] = ord('[')
+        cells = template[:, 1:dim * 5 + 1].reshape(rows, dim, 5)
+        cells[:, :, 0] = ord('%')
+        cells[:, :, 1] = ord('.')
+        cells[:, :, 2] = digits + ord('0')
+        cells[:, :, 3] = ord('g')
+        cells[:, :, 4] = ord(',')
+        template[:, dim * 5] = ord(']')
+        template[:, dim * 5 + 1] = ord(',')
+        return template.tobytes()[:-1].decode('ascii')
+
+    @staticmethod
+    def _fixed_template(code: str, rows: int, dim: int):
+        row = "[" + ",".join([code] * dim) + "]"
+        return ",".join([row] * rows)
+
+    def encode_vectors(self, vectors):
+        """
+        JSON text of a list of vectors
+
+        :type  vectors: list[list[float]], list[bytes] or numpy.ndarray
+        :param vectors: float vectors, or binary vectors sent as lists of
+            their bytes
+        """
+        if isinstance(vectors, list) and vectors and isinstance(
+                vectors[0], bytes):
+            array = np.frombuffer(b"".join(vectors), dtype=np.uint8)
+            array = array.reshape(len(vectors), -1)
+        else:
+            try:
+                array = np.asarray(vectors)
+            except ValueError:
+                array = None
+
+        if array is None or array.ndim != 2 or array.dtype.kind not in 'biuf':
+            if isinstance(vectors, np.ndarray):
+                vectors = vectors.tolist()
+            return json.dumps(vectors)
+
+        rows, dim = array.shape
+        if rows == 0 or dim == 0:
+            return json.dumps(array.tolist())
+
+        if array.dtype.kind in 'biu':
+            template = self._fixed_template("%d", rows, dim)
+            values = array.astype(np.int64)
+        else:
+            with np.errstate(over='ignore'):
+                values = array.astype(np.float32)
+            if self._digits is None:
+                template = self._shortest_template(shortest_digits(values))
+            else:
+                template = self._fixed_template("%.{}g".format(self._digits),
+                                                rows, dim)
+            values = values.astype(np.float64)
+
+        return "[" + template % tuple(values.ravel().tolist()) + "]"
+
+    def dumps(self, document, vectors):
+        """
+        Encoded request body of `document`, in which the `VECTORS` marker is
+        replaced with `vectors`
+        """
+        head, tail = _split(document)
+        return "".join((head, self.encode_vectors(vectors),
+                        tail)).encode('utf-8')
+
+    def iter_dumps(self, document, chunks, id_chunks=None):
+        """
+        Encoded request body of `document` yielded piece by piece, the
+        `VECTORS` marker being replaced with the rows of `chunks` and the
+        `IDS` one with the ids of `id_chunks`
+
+        Only one chunk is encoded at a time, the body is never held whole.
+
+        :type  chunks: iterable
+        :param chunks: vectors in chunks, see `row_chunks`
+
+        :type  id_chunks: iterable
+        :param id_chunks: integer ids in chunks, see `row_chunks`
+        """
+        encoded = {
+            VECTORS: (self.encode_vectors(chunk)[1:-1] for chunk in chunks)
+        }
+        if id_chunks is not None:
+            encoded[IDS] = (_encode_ids(chunk) for chunk in id_chunks)
+
+        text = _dumps(document)
+        while True:
+            found = [(text.find(marker.placeholder), marker)
+                     for marker in encoded if marker.placeholder in text]
+            if not found:
+                break
+            position, marker = min(found, key=lambda item: item[0])
+            yield (text[:position] + "[").encode('utf-8')
+            first = True
+            for piece in encoded[marker]:
+                if not piece:
+                    continue
+                yield (piece if first else "," + piece).encode('utf-8')
+                first = False
+            text = "]" + text[position + len(marker.placeholder):]
+        yield text.encode('utf-8')
+
+
+def row_chunks(vectors, chunk_rows: int = 4096):
+    """
+    Cut vectors in chunks of at most `chunk_rows` rows
+
+    :type  vectors: numpy.ndarray or iterable
+    :param vectors: an ndarray, memory-mapped or not, or an iterable of rows
+        (lists, 1-d arrays or bytes) and of 2-d ndarray chunks
+    """
+    if isinstance(vectors, np.ndarray):
+        for offset in range(0, len(vectors), chunk_rows):
+            yield vectors[offset:offset + chunk_rows]
+        return
+
+    rows = []
+    for item in vectors:
+        if isinstance(item, np.ndarray) and item.ndim == 2:
+            if rows:
+                yield _stack(rows)
+                rows = []
+            yield from row_chunks(item, chunk_rows)
+            continue
+
+        rows.append(item)
+        if len(rows) >= chunk_rows:
+            yield _stack(rows)
+            rows = []
+    if rows:
+        yield _stack(rows)
+
+
+def _stack(rows):
+    return np.stack(rows) if isinstance(rows[0], np.ndarray) else rows
+
+
+def _encode_ids(ids):
+    """
+    JSON text of ids as strings, without the brackets
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    return ",".join(['"%d"'] * len(ids)) % tuple(ids.tolist())
+
+
+def _dumps(document):
+    """
+    JSON text of `document`, markers written as their placeholders
+    """
+    return json.dumps(document,
+                      default=lambda value: json.loads(value.placeholder)
+                      if isinstance(value, _Marker) else
+                      _unserializable(value))
+
+
+def _split(document):
+    """
+    JSON text of `document` before and after the `VECTORS` marker
+    """
+    head, _, tail = _dumps(document).partition(VECTORS.placeholder)
+    return head, tail
+
+
+def _unserializable(value):
+    raise TypeError("Object of type {} is not JSON serializable".format(
+        value.__class__.__name__))
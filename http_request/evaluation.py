@@ -0,0 +1,398 @@
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from milvus import ParamError
+from .constants import Status
+from .datasets import open_array
+from .export import IDS, VECTORS, export_collection
+from .rerank import as_matrix, fetch_vectors
+from .sync import collection_ids
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+def param_grid(grid: Dict):
+    """
+    Every combination of the values of `grid`, e.g.
+    {"nprobe": [8, 16], "ef": [64]} gives [{"nprobe": 8, "ef": 64},
+    {"nprobe": 16, "ef": 64}]
+    """
+    keys = sorted(grid)
+    return [
+        dict(zip(keys, values))
+        for values in itertools.product(*(grid[key] for key in keys))
+    ]
+
+
+def sample_rows(vectors, count: int, seed: int = 0):
+    """
+    `count` distinct rows of a 2-d array, e.g. a memory-mapped dataset, in
+    file order
+
+    :return: rows numbers and the rows
+    """
+    count = min(count, len(vectors))
+    rows = np.sort(
+        np.random.default_rng(seed).choice(len(vectors), count,
+                                           replace=False))
+    return rows, np.asarray(vectors[rows])
+
+
+def sample_queries(handler,
+                   collection_name: str,
+                   count: int,
+                   seed: int = 0,
+                   timeout: int = 60):
+    """
+    Vectors of `count` random ids of a collection
+
+    Every query is in the collection and its own nearest neighbour: pass
+    the ids as `exclude_ids` of the ground truth and of `evaluate`.
+
+    :returns:
+        Status: indicate if operation is successful
+        ids: numpy.ndarray of the sampled ids
+        queries: numpy.ndarray, float32 or packed binary uint8
+    """
+    status, schema = handler.describe_collection(collection_name, timeout)
+    if not status.ok():
+        return status, None, None
+
+    status, ids = collection_ids(handler, collection_name, timeout=timeout)
+    if not status.ok():
+        return status, None, None
+
+    _, ids = sample_rows(ids, count, seed)
+    binary = metrics.is_binary(schema.metric_type)
+    width = schema.dimension // 8 if binary else schema.dimension
+    status, vectors, found, _ = fetch_vectors(handler, collection_name, ids,
+                                              binary, width,
+                                              timeout=timeout)
+    if not status.ok():
+        return status, None, None
+    # ids deleted since they were listed are left out
+    return Status(), ids[found], vectors[found]
+
+
+def exclude(ids, exclude_ids, top_k: int, distances=None):
+    """
+    First `top_k` ids of every row other than its id of `exclude_ids`,
+    padded with -1, with their distances when given
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    kept = ids != np.asarray(exclude_ids, dtype=np.int64)[:, None]
+    # stable: the kept ids move to the front in their order
+    order = np.argsort(~kept, axis=1, kind="stable")[:, :top_k]
+    kept = np.take_along_axis(kept, order, axis=1)
+    ids = np.where(kept, np.take_along_axis(ids, order, axis=1), -1)
+    if distances is None:
+        return ids
+    distances = np.take_along_axis(np.asarray(distances), order, axis=1)
+    return ids, distances
+
+
+def ground_truth(metric_type,
+                 queries,
+                 vectors,
+                 top_k: int,
+                 ids=None,
+                 exclude_ids=None,
+                 max_bytes: int = metrics.MAX_BYTES):
+    """
+    Exact top k ids of every query by brute force over `vectors`, which may
+    be memory-mapped
+
+    :type  ids: numpy.ndarray
+    :param ids: id of every row of `vectors`, the row numbers by default
+
+    :type  exclude_ids: numpy.ndarray
+    :param exclude_ids: id left out of the top k of every query, that of
+        queries sampled from `vectors`
+
+    :return: (queries, top_k) int64 ids padded with -1, and distances
+    """
+    limit = top_k if exclude_ids is None else top_k + 1
+    distances, rows = metrics.top_k(metric_type,
+                                    queries,
+                                    vectors,
+                                    limit,
+                                    max_bytes=max_bytes)
+    if ids is not None:
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.where(rows >= 0, ids[np.maximum(rows, 0)], -1)
+    if exclude_ids is None:
+        return rows, distances
+    return exclude(rows, exclude_ids, top_k, distances)
+
+
+def load_ground_truth(path: str, top_k: int = None):
+    """
+    Ids of an ivecs or npy ground truth file, row numbers of the base set
+    """
+    truth = np.asarray(open_array(path), dtype=np.int64)
+    return truth if top_k is None else truth[:, :top_k]
+
+
+def collection_ground_truth(handler,
+                            collection_name: str,
+                            queries,
+                            top_k: int,
+                            directory: str,
+                            exclude_ids=None,
+                            timeout: int = 60,
+                            **kwargs):
+    """
+    Exact top k ids of a collection, exported into `directory` first, an
+    existing export there being resumed, see `export_collection`; pass
+    `partition_tags` to it for the truth of searches of some partitions
+
+    :returns:
+        Status: indicate if operation is successful
+        ids: (queries, top_k) numpy.ndarray padded with -1
+    """
+    status, schema = handler.describe_collection(collection_name, timeout)
+    if not status.ok():
+        return status, None
+
+    status, _ = export_collection(handler, collection_name, directory,
+                                  timeout=timeout, **kwargs)
+    if not status.ok():
+        return status, None
+
+    ids = np.load(os.path.join(directory, IDS), mmap_mode="r")
+    vectors = np.load(os.path.join(directory, VECTORS), mmap_mode="r")
+    truth, _ = ground_truth(schema.metric_type,
+                            queries,
+                            vectors,
+                            top_k,
+                            ids=ids,
+                            exclude_ids=exclude_ids)
+    return Status(), truth
+
+
+def recall_at_k(found_ids, truth_ids, top_k: int):
+    """
+    Mean share of the first `top_k` true ids of every query found in its
+    first `top_k` hits
+    """
+    found = np.asarray(found_ids, dtype=np.int64)[:, :top_k]
+    truth = np.asarray(truth_ids, dtype=np.int64)[:, :top_k]
+    if found.shape[1] < truth.shape[1]:
+        found = np.pad(found, ((0, 0), (0, truth.shape[1] - found.shape[1])),
+                       constant_values=-1)
+    shared = 0
+    total = 0
+    for start in range(0, len(truth), 256):
+        block = truth[start:start + 256]
+        matches = (block[:, :, None] == found[start:start + 256, None, :])
+        valid = block >= 0
+        shared += int((matches.any(axis=2) & valid).sum())
+        total += int(valid.sum())
+    return shared / total if total else 1.0
+
+
+class EvaluationResult:
+    """
+    Recall and latency of the searches of one configuration
+
+    :attribute latencies: seconds of every search call, each holding
+        `batch_size` queries
+    """
+    def __init__(self, params: Dict, recall: float, queries: int,
+                 seconds: float, latencies, errors: int = 0):
+        self.params = params
+        self.recall = recall
+        self.queries = queries
+        self.seconds = seconds
+        self.latencies = np.asarray(latencies, dtype=np.float64)
+        self.errors = errors
+
+    @property
+    def qps(self):
+        return self.queries / self.seconds if self.seconds else 0.0
+
+    def percentile(self, percent: float):
+        if not len(self.latencies):
+            return None
+        return float(np.percentile(self.latencies, percent))
+
+    def to_dict(self):
+        document = {
+            "params": self.params,
+            "recall": self.recall,
+            "queries": self.queries,
+            "seconds": self.seconds,
+            "qps": self.qps,
+            "errors": self.errors,
+        }
+        for percent in PERCENTILES:
+            document["p{}".format(percent)] = self.percentile(percent)
+        return document
+
+    def __repr__(self):
+        return ('%s(params=%r, recall=%r, qps=%.1f, p50=%r, p95=%r, p99=%r, '
+                'errors=%r)' %
+                (self.__class__.__name__, self.params, self.recall, self.qps,
+                 self.percentile(50), self.percentile(95),
+                 self.percentile(99), self.errors))
+
+
+class EvaluationReport:
+    """
+    Results of every configuration of an evaluation, with the index they
+    were measured on
+    """
+    def __init__(self, collection_name: str, top_k: int, queries: int,
+                 index: Dict = None):
+        self.collection_name = collection_name
+        self.top_k = top_k
+        self.queries = queries
+        self.index = index
+        self.created = time.time()
+        self.results = []
+
+    def best(self, recall: float):
+        """
+        Fastest result reaching `recall`, None when none does
+        """
+        reaching = [
+            result for result in self.results
+            if result.recall is not None and result.recall >= recall
+        ]
+        return max(reaching, key=lambda result: result.qps, default=None)
+
+    def to_dict(self):
+        return {
+            "collection_name": self.collection_name,
+            "top_k": self.top_k,
+            "queries": self.queries,
+            "index": self.index,
+            "created": self.created,
+            "results": [result.to_dict() for result in self.results],
+        }
+
+    def save(self, path: str):
+        with open(path + ".tmp", mode='w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def __repr__(self):
+        return '%s(collection_name=%r, top_k=%r, queries=%r, results=%r)' % (
+            self.__class__.__name__, self.collection_name, self.top_k,
+            self.queries, self.results)
+
+
+def evaluate(handler,
+             collection_name: str,
+             queries,
+             truth_ids,
+             top_k: int,
+             params: List[Dict],
+             batch_size: int = 1,
+             warmup: int = 1,
+             partition_tags: List = None,
+             truth_partition_tags: List = None,
+             exclude_ids=None,
+             timeout: int = 60):
+    """
+    Run the queries through `search_vectors` with every search params of
+    `params` and measure recall@k against `truth_ids`
+
+    :type  params: list[dict]
+    :param params: search params of every configuration, see `param_grid`
+
+    :type  batch_size: int
+    :param batch_size: queries per search call, latencies are per call
+
+    :type  warmup: int
+    :param warmup: untimed search calls before every configuration
+
+    :type  truth_partition_tags: list
+    :param truth_partition_tags: partitions `truth_ids` was computed over,
+        those searched; the whole collection by default
+
+    :type  exclude_ids: numpy.ndarray
+    :param exclude_ids: id left out of the hits of every query, see
+        `sample_queries`
+
+    :return: EvaluationReport
+    """
+    if sorted(partition_tags or []) != sorted(truth_partition_tags or []):
+        raise ParamError(
+            "searches of partitions {} against ground truth of {}".format(
+                partition_tags or "all", truth_partition_tags or "all"))
+    if exclude_ids is not None and len(exclude_ids) != len(queries):
+        raise ParamError("{} excluded ids for {} queries".format(
+            len(exclude_ids), len(queries)))
+
+    status, schema = handler.describe_collection(collection_name, timeout)
+    if not status.ok():
+        raise ParamError(status.message)
+    if len(truth_ids) != len(queries):
+        raise ParamError("{} ground truth rows for {} queries".format(
+            len(truth_ids), len(queries)))
+
+    queries = as_matrix(queries, metrics.is_binary(schema.metric_type))
+    if metrics.is_binary(schema.metric_type):
+        records = [row.tobytes() for row in queries]
+    else:
+        records = queries.tolist()
+    index = None
+    status, index_param = handler.describe_index(collection_name, timeout)
+    if status.ok():
+        index = {
+            "index_type": index_param.index_type.name,
+            "params": index_param.params,
+        }
+    report = EvaluationReport(collection_name, top_k, len(queries), index)
+    # one more hit makes up for the excluded one
+    limit = top_k if exclude_ids is None else top_k + 1
+
+    for search_params in params:
+        for start in range(0, min(warmup * batch_size, len(records)),
+                           batch_size):
+            handler.search_vectors(collection_name,
+                                   limit,
+                                   records[start:start + batch_size],
+                                   partition_tags=partition_tags,
+                                   search_params=search_params,
+                                   timeout=timeout)
+
+        found = np.full((len(queries), limit), -1, dtype=np.int64)
+        latencies = []
+        errors = 0
+        begin = time.perf_counter()
+        for start in range(0, len(records), batch_size):
+            call = time.perf_counter()
+            status, results = handler.search_vectors(
+                collection_name,
+                limit,
+                records[start:start + batch_size],
+                partition_tags=partition_tags,
+                search_params=search_params,
+                timeout=timeout)
+            latencies.append(time.perf_counter() - call)
+            if not status.ok():
+                errors += 1
+                continue
+            ids = results.id_array[:, :limit]
+            found[start:start + len(ids), :ids.shape[1]] = ids
+        seconds = time.perf_counter() - begin
+        if exclude_ids is not None:
+            found = exclude(found, exclude_ids, top_k)
+
+        result = EvaluationResult(search_params,
+                                  recall_at_k(found, truth_ids, top_k),
+                                  len(records), seconds, latencies, errors)
+        logger.info("Evaluated {}: {}".format(collection_name, result))
+        report.results.append(result)
+    return report
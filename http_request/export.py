@@ -0,0 +1,325 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
+
+import numpy as np
+
+from .constants import Status, MetricType
+from .metrics import BINARY_METRICS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+IDS = "ids.npy"
+VECTORS = "vectors.npy"
+_IDS_PARTIAL = "ids.partial"
+
+
+class ExportManifest:
+    """
+    Progress of an export, saved next to the exported files so an
+    interrupted export resumes where it stopped
+
+    Ids are paged segment by segment into a raw file first, which sizes the
+    vector file; vectors are then fetched in chunks of `chunk_size` rows.
+    """
+    def __init__(self, directory: str, document: dict):
+        self._directory = directory
+        self.document = document
+
+    @classmethod
+    def load(cls, directory: str):
+        path = os.path.join(directory, MANIFEST)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, mode='r', encoding='utf-8') as file:
+            return cls(directory, json.load(file))
+
+    def save(self):
+        path = os.path.join(self._directory, MANIFEST)
+        with open(path + ".tmp", mode='w', encoding='utf-8') as file:
+            json.dump(self.document, file)
+        os.replace(path + ".tmp", path)
+
+    @property
+    def complete(self):
+        return self.document.get("complete", False)
+
+    def __repr__(self):
+        document = self.document
+        return ('%s(collection_name=%r, total=%r, chunks_done=%r, '
+                'complete=%r)' %
+                (self.__class__.__name__, document["collection_name"],
+                 document.get("total", None), len(document["chunks_done"]),
+                 self.complete))
+
+
+class CollectionExporter:
+    """
+    Snapshot of the ids and vectors of a collection into `ids.npy` and
+    `vectors.npy`, float32 vectors or packed binary ones as uint8
+
+    :type  directory: str
+    :param directory: output directory, holding the manifest of a previous
+        run to resume
+
+    :type  chunk_size: int
+    :param chunk_size: ids per `get_vectors_by_ids` call, they are sent in
+        the query string
+
+    :type  page_size: int
+    :param page_size: ids per `get_vector_ids` page
+
+    :type  max_workers: int
+    :param max_workers: concurrent vector fetches
+
+    :type  save_interval: float
+    :param save_interval: seconds between flushes of the files and the
+        manifest
+
+    :type  partition_tags: list
+    :param partition_tags: partitions exported, all by default
+    """
+    def __init__(self,
+                 handler,
+                 collection_name: str,
+                 directory: str,
+                 chunk_size: int = 1000,
+                 page_size: int = 100000,
+                 max_workers: int = 8,
+                 timeout: int = 60,
+                 save_interval: float = 5.0,
+                 partition_tags: List = None):
+        self._handler = handler
+        self._collection_name = collection_name
+        self._directory = directory
+        self._chunk_size = chunk_size
+        self._page_size = page_size
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._save_interval = save_interval
+        self._partition_tags = sorted(partition_tags) \
+            if partition_tags else None
+
+    def _path(self, name: str):
+        return os.path.join(self._directory, name)
+
+    def _start(self):
+        """
+        Manifest of a new export, with the segments of the collection
+        """
+        status, schema = self._handler.describe_collection(
+            self._collection_name, self._timeout)
+        if not status.ok():
+            return status, None
+
+        status, stats = self._handler.show_collection_info(
+            self._collection_name, self._timeout)
+        if not status.ok():
+            return status, None
+
+        segments = [{
+            "partition_tag": partition.get("tag", None),
+            "name": segment["name"],
+            "count": segment.get("count", 0),
+            "ids_done": False,
+        } for partition in stats.get("partitions", None) or []
+                    if self._partition_tags is None
+                    or partition.get("tag", None) in self._partition_tags
+                    for segment in partition.get("segments", None) or []]
+        binary = schema.metric_type in BINARY_METRICS
+        manifest = ExportManifest(
+            self._directory, {
+                "collection_name": self._collection_name,
+                "partition_tags": self._partition_tags,
+                "dimension": schema.dimension,
+                "metric_type": MetricType(schema.metric_type).name,
+                "binary": binary,
+                "chunk_size": self._chunk_size,
+                "segments": segments,
+                "ids_bytes": 0,
+                "total": None,
+                "chunks_done": [],
+                "missing": [],
+                "complete": False,
+            })
+        open(self._path(_IDS_PARTIAL), mode='wb').close()
+        manifest.save()
+        return Status(), manifest
+
+    def _export_ids(self, manifest: ExportManifest):
+        """
+        Page the ids of every segment not exported yet into the raw id file
+        """
+        document = manifest.document
+        with open(self._path(_IDS_PARTIAL), mode='r+b') as file:
+            # drop the ids of a segment interrupted midway
+            file.truncate(document["ids_bytes"])
+            file.seek(document["ids_bytes"])
+            for segment in document["segments"]:
+                if segment["ids_done"]:
+                    continue
+
+                offset = 0
+                while True:
+                    status, ids = self._handler.get_vector_ids(
+                        self._collection_name,
+                        segment["name"],
+                        self._timeout,
+                        offset=offset,
+                        page_size=self._page_size)
+                    if not status.ok():
+                        return status
+
+                    np.asarray(ids, dtype=np.int64).tofile(file)
+                    offset += len(ids)
+                    if len(ids) < self._page_size:
+                        break
+
+                file.flush()
+                segment["rows"] = offset
+                segment["ids_done"] = True
+                document["ids_bytes"] = file.tell()
+                manifest.save()
+
+        total = document["ids_bytes"] // 8
+        ids = np.memmap(self._path(_IDS_PARTIAL),
+                        dtype=np.int64,
+                        mode='r',
+                        shape=(total, )) if total else np.empty(0, np.int64)
+        exported = np.lib.format.open_memmap(self._path(IDS),
+                                             mode='w+',
+                                             dtype=np.int64,
+                                             shape=ids.shape)
+        exported[:] = ids
+        exported.flush()
+        del exported, ids
+
+        width = document["dimension"] // 8 if document["binary"] else \
+            document["dimension"]
+        vectors = np.lib.format.open_memmap(
+            self._path(VECTORS),
+            mode='w+',
+            dtype=np.uint8 if document["binary"] else np.float32,
+            shape=(total, width))
+        del vectors
+
+        document["total"] = total
+        manifest.save()
+        os.remove(self._path(_IDS_PARTIAL))
+        return Status()
+
+    def _fetch(self, ids, vectors, chunk: int, binary: bool):
+        start = chunk * self._chunk_size
+        chunk_ids = ids[start:start + self._chunk_size]
+        status, fetched = self._handler.get_vectors_by_ids(
+            self._collection_name, chunk_ids.tolist(), self._timeout)
+        if not status.ok():
+            return status, chunk, []
+
+        missing = []
+        for row, vector in enumerate(fetched):
+            if len(vector) == 0:
+                # deleted since its id was paged
+                missing.append(start + row)
+                continue
+            vectors[start + row] = np.frombuffer(
+                vector, dtype=np.uint8) if binary else vector
+        return status, chunk, missing
+
+    def _export_vectors(self, manifest: ExportManifest):
+        document = manifest.document
+        ids = np.load(self._path(IDS), mmap_mode='r')
+        vectors = np.load(self._path(VECTORS), mmap_mode='r+')
+        chunks = -(-len(ids) // self._chunk_size)
+        done = set(document["chunks_done"])
+        pending = [chunk for chunk in range(chunks) if chunk not in done]
+
+        error = Status()
+        last_save = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self._max_workers,
+                                thread_name_prefix="milvus-export") as pool:
+            futures = [
+                pool.submit(self._fetch, ids, vectors, chunk,
+                            document["binary"]) for chunk in pending
+            ]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    # left for the next run after a failed chunk
+                    continue
+
+                status, chunk, missing = future.result()
+                if not status.ok():
+                    error = status
+                    for other in futures:
+                        other.cancel()
+                    continue
+
+                document["chunks_done"].append(chunk)
+                document["missing"].extend(missing)
+                if time.monotonic() - last_save >= self._save_interval:
+                    vectors.flush()
+                    manifest.save()
+                    last_save = time.monotonic()
+
+        vectors.flush()
+        document["complete"] = error.ok()
+        manifest.save()
+        return error
+
+    def run(self):
+        """
+        Export the collection, resuming from the manifest of the directory
+
+        :returns:
+            Status: indicate if the export is complete
+            ExportManifest: progress of the export
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        manifest = ExportManifest.load(self._directory)
+        if manifest is not None and manifest.document[
+                "collection_name"] != self._collection_name:
+            return Status(
+                Status.ILLEGAL_ARGUMENT,
+                "{} holds an export of {}".format(
+                    self._directory,
+                    manifest.document["collection_name"])), manifest
+        if manifest is not None and manifest.document.get(
+                "partition_tags", None) != self._partition_tags:
+            return Status(
+                Status.ILLEGAL_ARGUMENT,
+                "{} holds an export of partitions {}".format(
+                    self._directory,
+                    manifest.document.get("partition_tags", None)
+                    or "all")), manifest
+
+        if manifest is not None and manifest.complete:
+            return Status(), manifest
+
+        if manifest is None:
+            status, manifest = self._start()
+            if not status.ok():
+                return status, manifest
+
+        if manifest.document["total"] is None:
+            status = self._export_ids(manifest)
+            if not status.ok():
+                return status, manifest
+
+        status = self._export_vectors(manifest)
+        logger.info("Export of {}: {}".format(self._collection_name,
+                                              manifest))
+        return status, manifest
+
+
+def export_collection(handler, collection_name: str, directory: str,
+                      **kwargs):
+    """
+    Export the ids and vectors of a collection, see CollectionExporter
+    """
+    return CollectionExporter(handler, collection_name, directory,
+                              **kwargs).run()
@@ -1,14 +1,32 @@
 import json
 import logging
-import struct
+import threading
+import time
+import numpy as np
 import requests
 from typing import List, Dict
+from urllib.parse import urlparse
 
 from .abstracts import MilvusAbstract, IndexParam, CollectionSchema
 from .abstracts import TopKQueryResult, PartitionParam
+from .autotune import AutoTuner
 from .constants import Status, IndexType, MetricType
-from milvus import NotConnectError
+from milvus import NotConnectError, ParamError
+from milvus.check import check_records, validation_enabled
 from .handler_wrapper import handle_error
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .compression import (GZIP, Compressor, CompressionStats,
+                          rejects_gzip)
+from .deadline import (DeadlineExceededError, current_deadline,
+                       deadline_scope)
+from .encoder import IDS, VECTORS, VectorEncoder, row_chunks
+from .hedging import Hedger, hedged_operation
+from .hooks import HandlerHooks
+from .metrics import BINARY_METRICS
+from .retry import RetryPolicy, RetryBudget, RetryableResponseError
+from .shadow import ShadowMirror
+from .time_partition import DAY, bucket_tag, overlapping_tags
+from .vector_cache import VectorCache
 
 logger = logging.getLogger(__name__)
 
@@ -47,14 +65,133 @@ MetricValueNameMap = {
 }
 
 
+def _has_client_ids(arguments):
+    """
+    Inserts are only safe to retry when the client sets the ids
+    """
+    ids = arguments.get("ids", None)
+    return ids is not None and len(ids) > 0
+
+
+def _replayable_stream(arguments):
+    """
+    Streamed inserts are only safe to retry when the client sets the ids
+    and the records can be read again
+    """
+    return _has_client_ids(arguments) and isinstance(
+        arguments.get("records", None), np.ndarray)
+
+
+def _checked_chunks(chunks, dimension, binary):
+    for chunk in chunks:
+        check_records(chunk, dimension, validate=True, binary=binary)
+        yield chunk
+
+
 class HttpHandler(MilvusAbstract):
     """
     Client http handler class
+
+    :type  max_retry: int
+    :param max_retry: attempts per call of the default retry policy
+
+    :type  retry_policy: RetryPolicy
+    :param retry_policy: retry policy applied to every call
+
+    :type  hooks: HandlerHooks
+    :param hooks: callbacks for retries, failures and circuit changes
+
+    :type  time_bucket: str
+    :param time_bucket: `day`, `week` or `month` partitions of timestamped
+        inserts
+
+    :type  partition_interval: float
+    :param partition_interval: seconds searches of `query_ranges` trust the
+        cached partitions of a collection, those other clients create are
+        searched after it
+
+    :type  default_timeout: float
+    :param default_timeout: seconds, used by calls given no timeout
+
+    :type  circuit_breaker: dict
+    :param circuit_breaker: CircuitBreaker options of every endpoint, None
+        disables the breakers
+
+    :type  replicas: list[tuple]
+    :param replicas: (host, port) of replicas which may serve hedged reads
+
+    :type  hedge: dict
+    :param hedge: Hedger options, hedging of the requests of read-only
+        calls is off unless given, e.g. {"percentile": 95, "max_ratio": 0.05}
+
+    :type  float_digits: int
+    :param float_digits: significant digits of the floats sent in insert and
+        search bodies, None sends the shortest float32 round-trip form
+
+    :type  compression: dict
+    :param compression: Compressor options, request bodies are gzipped above
+        the threshold when given, e.g. {"threshold": 65536, "level": 6};
+        responses are always negotiated with `Accept-Encoding: gzip, deflate`
+        and decompressed by requests
+
+    :type  vector_cache: dict
+    :param vector_cache: VectorCache options, get_vectors_by_ids reads the
+        cache first and only fetches the ids missing from it when given,
+        e.g. {"max_bytes": 64 * 1024 * 1024}
+
+    :type  autotune: dict
+    :param autotune: AutoTuner options, searches given no search params use
+        the params tuned for the index of the collection when given, e.g.
+        {"target_recall": 0.95}
+
+    :type  shadow: dict
+    :param shadow: ShadowMirror options, a sampled fraction of the searches
+        of the primary collections is mirrored asynchronously to their
+        candidate collections when given, e.g.
+        {"targets": {"trends": "trends_hnsw"}, "fraction": 0.05}
     """
     def __init__(self, host: str, port: int, **kwargs):
         self._status = None
         self._uri = self._set_uri(host=host, port=port)
         self._max_retry = kwargs.get("max_retry", 3)
+        self._retry_policy = kwargs.get("retry_policy", None) or RetryPolicy(
+            max_attempts=self._max_retry, budget=RetryBudget())
+        self._hooks = kwargs.get("hooks", None) or HandlerHooks()
+        self._default_timeout = kwargs.get("default_timeout", None)
+        self._circuit_breaker = kwargs.get("circuit_breaker", dict())
+        self._breakers = dict()
+        self._breakers_lock = threading.Lock()
+        replicas = kwargs.get("replicas", None) or []
+        self._endpoints = [self._uri] + [
+            self._set_uri(host=replica[0], port=replica[1])
+            for replica in replicas
+        ]
+        self._hedger = None
+        if kwargs.get("hedge", None) is not None:
+            self._hedger = Hedger(self._endpoints,
+                                  hooks=self._hooks,
+                                  **kwargs["hedge"])
+        self._time_bucket = kwargs.get("time_bucket", DAY)
+        self._partition_interval = kwargs.get("partition_interval", 60.0)
+        self._partitions = dict()
+        self._partitions_listed = dict()
+        self._partitions_lock = threading.RLock()
+        self._dimensions = dict()
+        self._encoder = VectorEncoder(kwargs.get("float_digits", None))
+        self._compressor = None
+        if kwargs.get("compression", None) is not None:
+            self._compressor = Compressor(**kwargs["compression"])
+        self._compression_stats = CompressionStats()
+        self._gzip_rejected = set()
+        self._vector_cache = None
+        if kwargs.get("vector_cache", None) is not None:
+            self._vector_cache = VectorCache(**kwargs["vector_cache"])
+        self._autotuner = None
+        if kwargs.get("autotune", None) is not None:
+            self._autotuner = AutoTuner(**kwargs["autotune"])
+        self._shadow = None
+        if kwargs.get("shadow", None) is not None:
+            self._shadow = ShadowMirror(**kwargs["shadow"])
 
     def __enter__(self):
         self.ping()
@@ -77,29 +214,230 @@ class HttpHandler(MilvusAbstract):
         """
         return self._status
 
-    def ping(self, timeout: int = 10):
+    def ping(self, timeout: int = 10, deadline=None):
         """
         Check the network connectivity
+
+        :type  deadline: Deadline or float
+        :param deadline: time budget of all the attempts, see handle_error
         """
         logging.info("Connecting server {}".format(self._uri))
-        retry = self._max_retry
-        try:
-            while retry > 0:
+        attempt = 0
+        with deadline_scope(deadline) as deadline:
+            while True:
+                attempt += 1
                 try:
-                    requests.get(self._uri + "/state", timeout=timeout)
-                    return True
-                except:
-                    retry -= 1
-                    if retry > 0:
-                        continue
-                    else:
-                        raise
-        except Exception as ex:
-            logger.error("Cannot connect server {}... {}".format(
-                self._uri, str(ex)))
-            raise NotConnectError("Cannot get server status")
+                    self._request("get",
+                                  self._uri + "/state",
+                                  timeout=timeout)
+                    break
+                except requests.exceptions.RequestException as ex:
+                    delay = self._retry_policy.next_delay(attempt,
+                                                          ex,
+                                                          idempotent=True)
+                    if (delay is not None and deadline is not None
+                            and delay >= deadline.remaining()):
+                        delay = None
+                    if delay is None:
+                        logger.error("Cannot connect server {}... {}".format(
+                            self._uri, str(ex)))
+                        raise NotConnectError("Cannot get server status")
+
+                    self._hooks.on_retry("ping", attempt, delay, ex)
+                    time.sleep(delay)
 
         logger.info("Connected server {}".format(self._uri))
+        return True
+
+    def _breaker(self, endpoint: str):
+        """
+        Circuit breaker of an endpoint, None when breakers are disabled
+        """
+        if self._circuit_breaker is None:
+            return None
+
+        with self._breakers_lock:
+            breaker = self._breakers.get(endpoint, None)
+            if breaker is None:
+                def on_state_change(previous, state):
+                    logger.warning("Circuit of {} is {}".format(
+                        endpoint, state))
+                    self._hooks.on_circuit_state(endpoint, previous, state)
+
+                breaker = CircuitBreaker(on_state_change=on_state_change,
+                                         **self._circuit_breaker)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def circuit_state(self, endpoint: str = None):
+        """
+        State of the circuit breaker of an endpoint, the server by default
+        """
+        breaker = self._breaker(endpoint or self._uri)
+        return breaker.state if breaker is not None else None
+
+    @property
+    def compression_stats(self):
+        """
+        Request body bytes before and after compression
+        """
+        return self._compression_stats
+
+    @property
+    def vector_cache(self):
+        """
+        VectorCache of get_vectors_by_ids, None unless enabled
+        """
+        return self._vector_cache
+
+    @property
+    def autotuner(self):
+        """
+        AutoTuner of the search params, None unless enabled
+        """
+        return self._autotuner
+
+    @property
+    def shadow(self):
+        """
+        ShadowMirror of the searches, its `report` holding the comparisons,
+        None unless enabled
+        """
+        return self._shadow
+
+    def _forget_vectors(self, collection_name: str, ids=None):
+        """
+        Drop cached vectors of ids, of the whole collection by default
+        """
+        if self._vector_cache is None:
+            return
+        if ids is None:
+            self._vector_cache.drop(collection_name)
+        else:
+            self._vector_cache.discard(collection_name, ids)
+
+    def _send_write(self, collection_name: str, ids, method: str, url: str,
+                    **kwargs):
+        """
+        Request writing vectors of ids, their cached vectors forgotten
+        before and again after it, so a read racing the write can't cache
+        the vectors it replaces
+        """
+        self._forget_vectors(collection_name, ids)
+        try:
+            return self._request(method, url, **kwargs)
+        finally:
+            self._forget_vectors(collection_name, ids)
+
+    def _compress(self, endpoint: str, kwargs):
+        """
+        Request arguments with a gzipped body, None when the body is not
+        compressed
+        """
+        data = kwargs.get("data", None)
+        if self._compressor is None or endpoint in self._gzip_rejected \
+                or not self._compressor.accepts(data):
+            return None
+
+        start = time.monotonic()
+        compressed = dict(kwargs)
+        compressed["data"] = self._compressor.compress(data)
+        compressed["headers"] = dict(kwargs.get("headers", None) or {})
+        compressed["headers"]["Content-Encoding"] = GZIP
+        self._compression_stats.record(len(data), len(compressed["data"]),
+                                       time.monotonic() - start)
+        return compressed
+
+    def _request(self, method: str, url: str, **kwargs):
+        """
+        Send a request, responses with a retryable status code are raised
+        as RetryableResponseError
+
+        The timeout is capped to the remaining budget of the current deadline.
+        Within a read-only call, the hedger may send the request to another
+        endpoint as well. With compression on, large bodies are gzipped; an
+        endpoint refusing them gets the plain body and is not sent
+        compressed bodies again.
+        """
+        if kwargs.get("timeout", None) is None:
+            kwargs["timeout"] = self._default_timeout
+
+        deadline = current_deadline.get()
+        bounded = False
+        if deadline is not None:
+            if deadline.expired():
+                raise DeadlineExceededError(
+                    "Deadline exceeded before {} {}".format(
+                        method.upper(), url))
+            timeout = deadline.timeout(kwargs["timeout"])
+            bounded = timeout != kwargs["timeout"]
+            kwargs["timeout"] = timeout
+
+        operation = hedged_operation.get()
+        if self._hedger is not None and operation is not None \
+                and url.startswith(self._uri):
+            path = url[len(self._uri):]
+            return self._hedger.run(
+                operation, lambda endpoint: self._send(
+                    method, endpoint + path, bounded, kwargs))
+        return self._send(method, url, bounded, kwargs)
+
+    def _send(self, method: str, url: str, bounded: bool, kwargs):
+        """
+        One request to the endpoint of `url`, through its circuit breaker
+        """
+        parsed = urlparse(url)
+        endpoint = "{}://{}".format(parsed.scheme, parsed.netloc)
+        breaker = self._breaker(endpoint)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError("Circuit of {} is open".format(endpoint))
+
+        # success of the call for the breaker, None gives the probe back
+        outcome = None
+        try:
+            compressed = self._compress(endpoint, kwargs)
+            if compressed is None and isinstance(kwargs.get("data", None),
+                                                 (bytes, str)):
+                self._compression_stats.record(len(kwargs["data"]),
+                                               len(kwargs["data"]))
+
+            start = time.monotonic()
+            try:
+                if compressed is None:
+                    response = requests.request(method, url, **kwargs)
+                else:
+                    response = requests.request(method, url, **compressed)
+                    if rejects_gzip(response):
+                        response = requests.request(method, url, **kwargs)
+                        if not rejects_gzip(response):
+                            logger.warning(
+                                "{} rejects gzip request bodies, sending "
+                                "them uncompressed".format(endpoint))
+                            self._gzip_rejected.add(endpoint)
+            except requests.exceptions.Timeout:
+                if bounded:
+                    # the client deadline cut the request, not the server
+                    raise DeadlineExceededError(
+                        "Deadline exceeded during {} {}".format(
+                            method.upper(), url))
+                outcome = False
+                raise
+            except requests.exceptions.RequestException:
+                outcome = False
+                raise
+            outcome = response.status_code < 500
+        finally:
+            # errors which say nothing of the endpoint, such as a body
+            # generator raising ParamError, give the probe back
+            if breaker is not None and outcome is None:
+                breaker.release()
+            elif breaker is not None:
+                breaker.record(outcome, time.monotonic() - start)
+
+        if self._retry_policy.is_retryable_status(response.status_code):
+            raise RetryableResponseError(response)
+
+        return response
 
     def _set_config(self, cmd, timeout: int):
         """
@@ -112,7 +450,10 @@ class HttpHandler(MilvusAbstract):
 
             url = self._uri + "/system/config"
             payload = json.dumps(request)
-            response = requests.put(url, data=payload, timeout=timeout)
+            response = self._request("put",
+                                     url,
+                                     data=payload,
+                                     timeout=timeout)
             if response.status_code == 200:
                 js = response.json()
                 return Status(), js["message"]
@@ -131,7 +472,7 @@ class HttpHandler(MilvusAbstract):
             config_node = cmd_node[1].split(".")
 
             url = self._uri + "/system/config"
-            response = requests.get(url, timeout=timeout)
+            response = self._request("get", url, timeout=timeout)
             if response.status_code == 200:
                 js = response.json()
                 rc_parent = js.get(config_node[0], None)
@@ -160,28 +501,34 @@ class HttpHandler(MilvusAbstract):
             return self._set_config(cmd, timeout)
 
         url = self._uri + "/system/{}".format(cmd)
-        response = requests.get(url, timeout=timeout)
+        response = self._request("get", url, timeout=timeout)
         js = response.json()
         if response.status_code == 200:
             return Status(), js["reply"]
 
         return Status(code=js["code"], message=js["message"]), None
 
+    @handle_error(returns=(None, ))
     def server_version(self, timeout: int):
         """
         Show the version of server
         """
         return self._cmd("version", timeout)
 
+    @handle_error(returns=(None, ))
     def server_status(self, timeout):
         """
         Show the version of server
         """
         return self._cmd("status", timeout)
 
-    @handle_error()
-    def create_collection(self, collection_name: str, dimension: int,
-                          index_file_size: int, metric_type: MetricType):
+    @handle_error(idempotent=False)
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          index_file_size: int,
+                          metric_type: MetricType,
+                          timeout: int = None):
         """
         Create collection
 
@@ -197,6 +544,9 @@ class HttpHandler(MilvusAbstract):
         :type  metric_type: MetricType
         :param metric_type:
 
+        :type  timeout: int
+        :param timeout:
+
         :return: Status, indicate if connect is successful
         """
         metric = MetricValueNameMap.get(metric_type, None)
@@ -208,15 +558,13 @@ class HttpHandler(MilvusAbstract):
         }
         data = json.dumps(table_param)
         url = self._uri + "/collections"
-        try:
-            response = requests.post(url, data=data)
-            if response.status_code == 201:
-                return Status(message='Create table successfully!')
+        response = self._request("post", url, data=data, timeout=timeout)
+        if response.status_code == 201:
+            self._dimensions.pop(collection_name, None)
+            return Status(message='Create table successfully!')
 
-            js = response.json()
-            return Status(js["code"], js["message"])
-        except Exception as ex:
-            return Status(Status.UNEXPECTED_ERROR, message=str(ex))
+        js = response.json()
+        return Status(js["code"], js["message"])
 
     @handle_error(returns=(False, ))
     def has_collection(self, collection_name: str, timeout: int):
@@ -235,18 +583,15 @@ class HttpHandler(MilvusAbstract):
 
         """
         url = self._uri + "/collections/" + collection_name
-        try:
-            response = requests.get(url=url, timeout=timeout)
-            if response.status_code == 200:
-                return Status(), True
+        response = self._request("get", url=url, timeout=timeout)
+        if response.status_code == 200:
+            return Status(), True
 
-            if response.status_code == 404:
-                return Status(), False
+        if response.status_code == 404:
+            return Status(), False
 
-            js = response.json()
-            return Status(js["code"], js["message"]), False
-        except Exception as ex:
-            return Status(Status.UNEXPECTED_ERROR, message=str(ex))
+        js = response.json()
+        return Status(js["code"], js["message"]), False
 
     @handle_error(returns=(None, ))
     def get_table_row_count(self, table_name: str, timeout: int):
@@ -264,17 +609,14 @@ class HttpHandler(MilvusAbstract):
             count: int, table row count
         """
         url = self._uri + "/collections/{}".format(table_name)
-        try:
-            response = requests.get(url, timeout=timeout)
-            js = response.json()
-            if response.status_code == 200:
-                return Status(), js["count"]
+        response = self._request("get", url, timeout=timeout)
+        js = response.json()
+        if response.status_code == 200:
+            return Status(), js["count"]
 
-            return Status(js["code"], js["message"]), None
-        except Exception as e:
-            return Status(Status.UNEXPECTED_ERROR, message=str(e)), None
+        return Status(js["code"], js["message"]), None
 
-    @handle_error(returns=(None, ))
+    @handle_error(returns=(None, ), hedge=True)
     def describe_collection(self, collection_name: str, timeout: int):
         """
         Show table information
@@ -290,7 +632,7 @@ class HttpHandler(MilvusAbstract):
             table_schema: TableSchema, given when operation is successful
         """
         url = self._uri + "/collections/{}".format(collection_name)
-        response = requests.get(url, timeout=timeout)
+        response = self._request("get", url, timeout=timeout)
         if response.status_code >= 500:
             return Status(Status.UNEXPECTED_ERROR, response.reason), None
 
@@ -322,23 +664,25 @@ class HttpHandler(MilvusAbstract):
             tables: list[str], list of table names
         """
         url = self._uri + "/collections"
-        response = requests.get(url,
-                                params={
-                                    "offset": 0,
-                                    "page_size": 0
-                                },
-                                timeout=timeout)
+        response = self._request("get",
+                                 url,
+                                 params={
+                                     "offset": 0,
+                                     "page_size": 0
+                                 },
+                                 timeout=timeout)
         if response.status_code != 200:
             return Status(Status.UNEXPECTED_ERROR, response.reason), []
 
         js = response.json()
         count = js["count"]
-        response = requests.get(url,
-                                params={
-                                    "offset": 0,
-                                    "page_size": count
-                                },
-                                timeout=timeout)
+        response = self._request("get",
+                                 url,
+                                 params={
+                                     "offset": 0,
+                                     "page_size": count
+                                 },
+                                 timeout=timeout)
         if response.status_code != 200:
             return Status(Status.UNEXPECTED_ERROR, response.reason), []
 
@@ -364,7 +708,7 @@ class HttpHandler(MilvusAbstract):
             query_results: information of state
         """
         url = self._uri + "/collections/{}?info=stat".format(collection_name)
-        response = requests.get(url, timeout=timeout)
+        response = self._request("get", url, timeout=timeout)
         if response.status_code == 200:
             return Status(), response.json()
 
@@ -406,14 +750,14 @@ class HttpHandler(MilvusAbstract):
             params["load"]["partition_tags"] = partition_tags
 
         data = json.dumps(params)
-        response = requests.put(url, data=data, timeout=timeout)
+        response = self._request("put", url, data=data, timeout=timeout)
         if response.status_code == 200:
             return Status(message="Load successfully")
 
         js = response.json()
         return Status(code=js["code"], message=js["message"])
 
-    @handle_error()
+    @handle_error(idempotent=False)
     def drop_collection(self, collection_name: str, timeout: int):
         """
         Drop collection
@@ -427,19 +771,123 @@ class HttpHandler(MilvusAbstract):
         :return: Status, indicate if connect is successful
         """
         url = self._uri + "/collections/" + collection_name
-        response = requests.delete(url, timeout=timeout)
+        response = self._request("delete", url, timeout=timeout)
         if response.status_code == 204:
+            with self._partitions_lock:
+                self._partitions.pop(collection_name, None)
+                self._partitions_listed.pop(collection_name, None)
+            self._dimensions.pop(collection_name, None)
+            self._forget_vectors(collection_name)
+            if self._autotuner is not None:
+                self._autotuner.forget(collection_name)
             return Status(message="Delete successfully!")
 
         js = response.json()
         return Status(js["code"], js["message"])
 
-    @handle_error(returns=([], ))
+    def _dimension(self, collection_name: str, timeout: int):
+        """
+        Cached (dimension, binary) of a collection, (None, None) when it
+        cannot be described
+        """
+        shape = self._dimensions.get(collection_name, None)
+        if shape is None:
+            status, schema = self.describe_collection(collection_name,
+                                                      timeout)
+            if not status.ok():
+                return None, None
+            shape = self._dimensions[collection_name] = (
+                schema.dimension, schema.metric_type in BINARY_METRICS)
+        return shape
+
+    def _check_records(self, collection_name: str, records, validate: bool,
+                       timeout: int):
+        """
+        Check records when asked to, the first check of a collection
+        describes it
+        """
+        if validate is None:
+            validate = validation_enabled()
+        if validate:
+            dimension, binary = self._dimension(collection_name, timeout)
+            check_records(records,
+                          dimension=dimension,
+                          validate=True,
+                          binary=binary)
+
+    def _partition_tags(self, collection_name: str, timeout: int,
+                        page_size: int = 100):
+        """
+        All partition tags of a collection, walking `show_partitions` pages
+        """
+        tags = []
+        offset = 0
+        while True:
+            status, partitions = self.show_partitions(
+                collection_name=collection_name,
+                timeout=timeout,
+                offset=offset,
+                page_size=page_size)
+            if not status.ok():
+                return status, []
+
+            tags.extend(partition.tag for partition in partitions)
+            if len(partitions) < page_size:
+                return Status(), tags
+            offset += page_size
+
+    def _known_partitions(self, collection_name: str, timeout: int,
+                          max_age: float = None):
+        """
+        Cached partition tags of a collection, listed again when missing or
+        older than `max_age` seconds; call with `_partitions_lock` held
+        """
+        known = self._partitions.get(collection_name, None)
+        listed = self._partitions_listed.get(collection_name, 0.0)
+        if known is None or (max_age is not None
+                             and time.monotonic() - listed >= max_age):
+            status, tags = self._partition_tags(collection_name, timeout)
+            if not status.ok():
+                return status, None
+            known = self._partitions[collection_name] = set(tags)
+            self._partitions_listed[collection_name] = time.monotonic()
+        return Status(), known
+
+    def _ensure_partition(self, collection_name: str, partition_tag: str,
+                          timeout: int):
+        """
+        Create a partition unless it is known to exist, one another client
+        created meanwhile being taken as created
+        """
+        with self._partitions_lock:
+            status, known = self._known_partitions(collection_name, timeout)
+            if not status.ok():
+                return status
+
+            if partition_tag in known:
+                return Status()
+
+            status = self.create_partition(collection_name=collection_name,
+                                           partition_tag=partition_tag,
+                                           timeout=timeout)
+            if not status.ok():
+                listed, tags = self._partition_tags(collection_name, timeout)
+                if listed.ok():
+                    known.update(tags)
+                if partition_tag not in known:
+                    return status
+            known.add(partition_tag)
+            return Status()
+
+    @handle_error(returns=([], ), idempotent=_has_client_ids)
     def add_vectors(self,
                     collection_name: str,
                     records,
                     ids: List = None,
-                    partition_tag: str = None):
+                    partition_tag: str = None,
+                    timestamp=None,
+                    timeout: int = None,
+                    validate: bool = None):
         """
         Add vectors to table
 
@@ -455,27 +903,145 @@ class HttpHandler(MilvusAbstract):
         :type  partition_tag: str
         :param partition_tag:
 
+        :type  timestamp: datetime.date, datetime.datetime, str or int
+        :param timestamp: time of the records, they are inserted into the
+            time bucket partition containing it, created on demand
+
+        :type  timeout: int
+        :param timeout:
+
+        :type  validate: bool
+        :param validate: check the records against the collection dimension,
+            raising ParamError, None follows `milvus.check.set_validation`
+
         :returns:
             Status : indicate if vectors inserted successfully
             ids :list of id, after inserted every vector is given a id
         """
+        self._check_records(collection_name, records, validate, timeout)
+        if timestamp is not None:
+            if partition_tag:
+                raise ParamError(
+                    "`partition_tag` and `timestamp` are exclusive")
+
+            partition_tag = bucket_tag(timestamp, self._time_bucket)
+            status = self._ensure_partition(collection_name, partition_tag,
+                                            timeout=timeout)
+            if not status.ok():
+                return status, []
+
         url = self._uri + "/collections/{}/vectors".format(collection_name)
         data_dict = dict()
-        if ids:
+        if ids is not None and len(ids) > 0:
             data_dict["ids"] = list(map(str, ids))
 
         if partition_tag:
             data_dict["partition_tag"] = partition_tag
 
-        if isinstance(records[0], bytes):
-            vectors = [struct.unpack(str(len(r)) + 'B', r) for r in records]
-            data_dict["vectors"] = vectors
+        data_dict["vectors"] = VECTORS
+        data = self._encoder.dumps(data_dict, records)
+        headers = {"Content-Type": "application/json"}
+        if ids is not None and len(ids) > 0:
+            response = self._send_write(collection_name,
+                                        ids,
+                                        "post",
+                                        url,
+                                        data=data,
+                                        headers=headers,
+                                        timeout=timeout)
         else:
-            data_dict["vectors"] = records
+            response = self._request("post",
+                                     url,
+                                     data=data,
+                                     headers=headers,
+                                     timeout=timeout)
+        js = response.json()
+        if response.status_code == 201:
+            ids = [int(item) for item in list(js["ids"])]
+            return Status(message='Add vectors successfully!'), ids
+
+        return Status(js["code"], js["message"]), []
+
+    @handle_error(returns=([], ), idempotent=_replayable_stream)
+    def add_vectors_stream(self,
+                           collection_name: str,
+                           records,
+                           ids: List = None,
+                           partition_tag: str = None,
+                           chunk_rows: int = 4096,
+                           timeout: int = None,
+                           validate: bool = None):
+        """
+        Add vectors with a body streamed in chunked transfer encoding
+
+        The body is encoded `chunk_rows` rows at a time while it is sent, so
+        neither the records, the ids nor the body need to be held in memory.
+        With memory-mapped arrays the request memory stays constant whatever
+        the size of the insert; the ids of the response are returned as a
+        list, one per row.
+
+        :type  collection_name: str
+        :param collection_name: collection name been inserted
+
+        :type  records: numpy.ndarray or iterable
+        :param records: an ndarray, e.g. `np.load(path, mmap_mode="r")`, or an
+            iterable of rows and of 2-d ndarray chunks
 
-        data = json.dumps(data_dict)
+        :type  ids: list[int] or numpy.ndarray
+        :param ids: list of ids, or an integer ndarray, memory-mapped or not
+
+        :type  partition_tag: str
+        :param partition_tag:
+
+        :type  chunk_rows: int
+        :param chunk_rows: rows encoded at a time
+
+        :type  timeout: int
+        :param timeout:
+
+        :type  validate: bool
+        :param validate: check every chunk against the collection dimension,
+            None follows `milvus.check.set_validation`; an invalid chunk
+            raises ParamError and aborts the request midway
+
+        :returns:
+            Status : indicate if vectors inserted successfully
+            ids :list of id, after inserted every vector is given a id
+        """
+        chunks = row_chunks(records, chunk_rows)
+        if validate is None:
+            validate = validation_enabled()
+        if validate:
+            dimension, binary = self._dimension(collection_name, timeout)
+            chunks = _checked_chunks(chunks, dimension, binary)
+
+        url = self._uri + "/collections/{}/vectors".format(collection_name)
+        document = dict()
+        id_chunks = None
+        if ids is not None and len(ids) > 0:
+            document["ids"] = IDS
+            id_chunks = row_chunks(ids, chunk_rows)
+
+        if partition_tag:
+            document["partition_tag"] = partition_tag
+
+        document["vectors"] = VECTORS
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url, data=data, headers=headers)
+        data = self._encoder.iter_dumps(document, chunks, id_chunks)
+        if ids is not None and len(ids) > 0:
+            response = self._send_write(collection_name,
+                                        ids,
+                                        "post",
+                                        url,
+                                        data=data,
+                                        headers=headers,
+                                        timeout=timeout)
+        else:
+            response = self._request("post",
+                                     url,
+                                     data=data,
+                                     headers=headers,
+                                     timeout=timeout)
         js = response.json()
         if response.status_code == 201:
             ids = [int(item) for item in list(js["ids"])]
@@ -483,9 +1049,58 @@ class HttpHandler(MilvusAbstract):
 
         return Status(js["code"], js["message"]), []
 
-    @handle_error(returns=(None, ))
+    @handle_error(returns=(None, ), hedge=True)
     def get_vectors_by_ids(self, collection_name: str, ids: List,
                            timeout: int):
+        """
+        Vectors of ids, lists of floats or bytes of binary vectors, empty
+        for ids with no vector
+
+        With a vector cache only the ids missing from it are fetched, in a
+        single request; cached float vectors come back as float32 values.
+        """
+        cache = self._vector_cache
+        if cache is None or not len(ids):
+            return self._fetch_vectors(collection_name, ids, timeout)
+
+        # vectors fetched before a write of the collection ends are dropped
+        generation = cache.generation(collection_name)
+        cached, found = cache.get(collection_name, ids)
+        missing = [id_ for id_, hit in zip(ids, found) if not hit]
+        fetched = []
+        if missing:
+            status, fetched = self._fetch_vectors(collection_name, missing,
+                                                  timeout)
+            if not status.ok():
+                return status, fetched
+            if not fetched:
+                fetched = [[]] * len(missing)
+            present = [i for i, vector in enumerate(fetched) if len(vector)]
+            if present:
+                rows = [fetched[i] for i in present]
+                if isinstance(rows[0], bytes):
+                    matrix = np.frombuffer(b"".join(rows),
+                                           dtype=np.uint8).reshape(
+                                               len(rows), -1)
+                else:
+                    matrix = np.asarray(rows, dtype=np.float32)
+                cache.put(collection_name, [missing[i] for i in present],
+                          matrix,
+                          generation=generation)
+
+        binary = cached is not None and cached.dtype == np.uint8
+        results = iter(fetched)
+        vectors = []
+        for row, hit in enumerate(found):
+            if not hit:
+                vectors.append(next(results))
+            elif binary:
+                vectors.append(cached[row].tobytes())
+            else:
+                vectors.append(cached[row].tolist())
+        return Status(), vectors
+
+    def _fetch_vectors(self, collection_name: str, ids: List, timeout: int):
         status, table_schema = self.describe_collection(
             collection_name, timeout)
         if not status.ok():
@@ -497,7 +1112,7 @@ class HttpHandler(MilvusAbstract):
         ids_list = list(map(str, ids))
         query_ids = ",".join(ids_list)
         url = url + "?ids=" + query_ids
-        response = requests.get(url, timeout=timeout)
+        response = self._request("get", url, timeout=timeout)
         result = response.json()
 
         if response.status_code == 200:
@@ -517,11 +1132,29 @@ class HttpHandler(MilvusAbstract):
         return Status(result["code"], result["message"]), None
 
     @handle_error(returns=(None, ))
-    def get_vector_ids(self, collection_name: str, segment_name: str,
-                       timeout: int):
-        url = self._uri + "/collections/{}/segments/{}/ids?page_size=1000000".format(
+    def get_vector_ids(self,
+                       collection_name: str,
+                       segment_name: str,
+                       timeout: int,
+                       offset: int = 0,
+                       page_size: int = 1000000):
+        """
+        Page of the ids of a segment
+
+        :type  offset: int
+        :param offset: position of the first id of the page in the segment
+
+        :type  page_size: int
+        :param page_size: max ids returned
+
+        :returns:
+            Status: indicate if operation is successful
+            ids: list[int]
+        """
+        url = self._uri + "/collections/{}/segments/{}/ids".format(
             collection_name, segment_name)
-        response = requests.get(url, timeout=timeout)
+        url = url + "?offset={}&page_size={}".format(offset, page_size)
+        response = self._request("get", url, timeout=timeout)
         result = response.json()
 
         if response.status_code == 200:
@@ -529,7 +1162,7 @@ class HttpHandler(MilvusAbstract):
 
         return Status(result["code"], result["message"]), None
 
-    @handle_error()
+    @handle_error(idempotent=False)
     def create_index(self, collection_name: str, index_type: IndexType,
                      index_params: Dict, timeout: int):
         """
@@ -563,14 +1196,17 @@ class HttpHandler(MilvusAbstract):
         request["params"] = index_params
         data = json.dumps(request)
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url,
+        response = self._request("post",
+                                 url,
                                  data=data,
                                  headers=headers,
                                  timeout=timeout)
+        if self._autotuner is not None:
+            self._autotuner.invalidate(collection_name)
         js = response.json()
         return Status(js["code"], js["message"])
 
-    @handle_error(returns=(None, ))
+    @handle_error(returns=(None, ), hedge=True)
     def describe_index(self, collection_name: str, timeout: int):
         """
         Show index information
@@ -589,7 +1225,7 @@ class HttpHandler(MilvusAbstract):
         :rtype: (Status, TableSchema)
         """
         url = self._uri + "/collections/{}/indexes".format(collection_name)
-        response = requests.get(url, timeout=timeout)
+        response = self._request("get", url, timeout=timeout)
         if response.status_code >= 500:
             return Status(
                 Status.UNEXPECTED_ERROR,
@@ -604,7 +1240,7 @@ class HttpHandler(MilvusAbstract):
 
         return Status(js["code"], js["message"]), None
 
-    @handle_error()
+    @handle_error(idempotent=False)
     def drop_index(self, collection_name: str, timeout: int):
         """
         Drop index
@@ -621,14 +1257,16 @@ class HttpHandler(MilvusAbstract):
         ：:rtype: Status
         """
         url = self._uri + "/collections/{}/indexes".format(collection_name)
-        response = requests.delete(url)
+        response = self._request("delete", url, timeout=timeout)
+        if self._autotuner is not None:
+            self._autotuner.invalidate(collection_name)
         if response.status_code == 204:
             return Status()
 
         js = response.json()
         return Status(js["code"], js["message"])
 
-    @handle_error()
+    @handle_error(idempotent=False)
     def create_partition(self,
                          collection_name: str,
                          partition_tag: str,
@@ -653,11 +1291,16 @@ class HttpHandler(MilvusAbstract):
         url = self._uri + "/collections/{}/partitions".format(collection_name)
         data = json.dumps({"partition_tag": partition_tag})
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url,
+        response = self._request("post",
+                                 url,
                                  data=data,
                                  headers=headers,
                                  timeout=timeout)
         if response.status_code == 201:
+            with self._partitions_lock:
+                known = self._partitions.get(collection_name, None)
+                if known is not None:
+                    known.add(partition_tag)
             return Status()
 
         js = response.json()
@@ -691,7 +1334,10 @@ class HttpHandler(MilvusAbstract):
         """
         url = self._uri + "/collections/{}/partitions".format(collection_name)
         query_data = {"offset": offset, "page_size": page_size}
-        response = requests.get(url, params=query_data, timeout=timeout)
+        response = self._request("get",
+                                 url,
+                                 params=query_data,
+                                 timeout=timeout)
         if response.status_code >= 500:
             return Status(
                 Status.UNEXPECTED_ERROR,
@@ -728,7 +1374,7 @@ class HttpHandler(MilvusAbstract):
         ：:rtype: Status
         """
         url = self._uri + "/collections/{}/partitions".format(collection_name)
-        response = requests.get(url, timeout=timeout)
+        response = self._request("get", url, timeout=timeout)
         if response.status_code == 200:
             result = response.json()
             if result["count"] > 0:
@@ -741,7 +1387,7 @@ class HttpHandler(MilvusAbstract):
         js = response.json()
         return Status(js["code"], js["message"]), False
 
-    @handle_error()
+    @handle_error(idempotent=False)
     def drop_partition(self,
                        collection_name: str,
                        partition_tag: str,
@@ -766,20 +1412,31 @@ class HttpHandler(MilvusAbstract):
         url = self._uri + "/collections/{}/partitions".format(collection_name)
         request = {"partition_tag": partition_tag}
         payload = json.dumps(request)
-        response = requests.delete(url, data=payload, timeout=timeout)
+        response = self._request("delete",
+                                 url,
+                                 data=payload,
+                                 timeout=timeout)
         if response.status_code == 204:
+            with self._partitions_lock:
+                self._partitions.get(collection_name, set()).discard(
+                    partition_tag)
+            # the ids of the partition are unknown here
+            self._forget_vectors(collection_name)
             return Status()
 
         js = response.json()
         return Status(js["code"], js["message"])
 
-    @handle_error(returns=(None, ))
+    @handle_error(returns=(None, ), hedge=True)
     def search_vectors(self,
                        collection_name: str,
                        top_k: int,
                        query_records,
                        partition_tags: List = None,
                        search_params: Dict = None,
+                       query_ranges: List = None,
+                       timeout: int = None,
+                       validate: bool = None,
                        **kwargs):
         """
         Query vectors in a table
@@ -794,10 +1451,25 @@ class HttpHandler(MilvusAbstract):
         :param partition_tags:
 
         :type  search_params: dict
-        :param search_params:
+        :param search_params: None applies the tuned params of the
+            collection when autotune is enabled
 
             example: {"nprobe": 16}
 
+        :type  query_ranges: list
+        :param query_ranges: Optional (start, end) date pairs, only the time
+            bucket partitions overlapping them are searched
+
+            example: [("2021-06-01", "2021-06-30")]
+
+        :type  timeout: int
+        :param timeout:
+
+        :type  validate: bool
+        :param validate: check the query records against the collection
+            dimension, raising ParamError, None follows
+            `milvus.check.set_validation`
+
         :type  top_k: int
         :param top_k: how many similar vectors will be searched
 
@@ -805,32 +1477,56 @@ class HttpHandler(MilvusAbstract):
             Status:  indicate if query is successful
             query_results: list[TopKQueryResult]
         """
+        start = time.monotonic()
+        requested_params = search_params
+        self._check_records(collection_name, query_records, validate, timeout)
+        if not search_params and self._autotuner is not None:
+            search_params = self._autotuner.params(self, collection_name,
+                                                   top_k, timeout)
+        if query_ranges:
+            with self._partitions_lock:
+                status, tags = self._known_partitions(
+                    collection_name, timeout, self._partition_interval)
+                tags = sorted(tags) if status.ok() else None
+            if not status.ok():
+                return status, None
+
+            tags = overlapping_tags(tags, query_ranges)
+            if partition_tags:
+                tags = [tag for tag in tags if tag in partition_tags]
+            if not tags:
+                return Status(), TopKQueryResult.empty(len(query_records))
+            partition_tags = tags
+
         url = self._uri + "/collections/{}/vectors".format(collection_name)
         search_body = dict()
         if partition_tags:
             search_body["partition_tags"] = partition_tags
         search_body["topk"] = top_k
         search_body["params"] = search_params
-        if isinstance(query_records[0], bytes):
-            vectors = [
-                struct.unpack(str(len(r)) + 'B', r) for r in query_records
-            ]
-            search_body["vectors"] = vectors
-        else:
-            vectors = query_records
-            search_body["vectors"] = vectors
-
-        data = json.dumps({"search": search_body})
+        search_body["vectors"] = VECTORS
+        data = self._encoder.dumps({"search": search_body}, query_records)
         headers = {"Content-Type": "application/json"}
-        response = requests.put(url, data, headers=headers)
+        response = self._request("put",
+                                 url,
+                                 data=data,
+                                 headers=headers,
+                                 timeout=timeout)
 
         if response.status_code == 200:
-            return Status(), TopKQueryResult(response)
+            results = TopKQueryResult(response)
+            if self._shadow is not None and self._shadow.sampled(
+                    collection_name):
+                self._shadow.mirror(self, collection_name, top_k,
+                                    query_records, partition_tags,
+                                    requested_params,
+                                    time.monotonic() - start, results)
+            return Status(), results
 
         js = response.json()
         return Status(js["code"], js["message"]), None
 
-    @handle_error(returns=(None, ))
+    @handle_error(returns=(None, ), hedge=True)
     def search_by_ids(self,
                       collection_name: str,
                       ids: List,
@@ -875,7 +1571,11 @@ class HttpHandler(MilvusAbstract):
 
         data = json.dumps({"search": body_dict})
         headers = {"Content-Type": "application/json"}
-        response = requests.put(url, data, headers=headers, timeout=timeout)
+        response = self._request("put",
+                                 url,
+                                 data=data,
+                                 headers=headers,
+                                 timeout=timeout)
         if response.status_code == 200:
             return Status(), TopKQueryResult(response)
 
@@ -916,18 +1616,14 @@ class HttpHandler(MilvusAbstract):
         body_dict["topk"] = top_k
         body_dict["file_ids"] = list(map(str, file_ids))
         body_dict["params"] = search_params
-        if isinstance(query_records[0], bytes):
-            vectors = [
-                struct.unpack(str(len(r)) + 'B', r) for r in query_records
-            ]
-            body_dict["vectors"] = vectors
-        else:
-            vectors = query_records
-            body_dict["vectors"] = vectors
-
-        data = json.dumps({"search": body_dict})
+        body_dict["vectors"] = VECTORS
+        data = self._encoder.dumps({"search": body_dict}, query_records)
         headers = {"Content-Type": "application/json"}
-        response = requests.put(url, data, headers=headers, timeout=timeout)
+        response = self._request("put",
+                                 url,
+                                 data=data,
+                                 headers=headers,
+                                 timeout=timeout)
         if response.status_code == 200:
             return Status(), TopKQueryResult(response)
 
@@ -960,27 +1656,38 @@ class HttpHandler(MilvusAbstract):
         headers = {"Content-Type": "application/json"}
         ids = list(map(str, id_array))
         request = {"delete": {"ids": ids}}
-        response = requests.put(url,
-                                data=json.dumps(request),
-                                headers=headers,
-                                timeout=timeout)
+        response = self._send_write(collection_name,
+                                    id_array,
+                                    "put",
+                                    url,
+                                    data=json.dumps(request),
+                                    headers=headers,
+                                    timeout=timeout)
         result = response.json()
         return Status(result["code"], result["message"])
 
     @handle_error()
-    def flush(self, collection_name_array: List):
+    def flush(self, collection_name_array: List, timeout: int = None):
         url = self._uri + "/system/task"
         headers = {"Content-Type": "application/json"}
         request = {"flush": {"collection_names": collection_name_array}}
-        response = requests.put(url, json.dumps(request), headers=headers)
+        response = self._request("put",
+                                 url,
+                                 data=json.dumps(request),
+                                 headers=headers,
+                                 timeout=timeout)
         result = response.json()
         return Status(result["code"], result["message"])
 
     @handle_error()
-    def compact(self, collection_name):
+    def compact(self, collection_name, timeout: int = None):
         url = self._uri + "/system/task"
         headers = {"Content-Type": "application/json"}
         request = {"compact": {"collection_name": collection_name}}
-        response = requests.put(url, json.dumps(request), headers=headers)
+        response = self._request("put",
+                                 url,
+                                 data=json.dumps(request),
+                                 headers=headers,
+                                 timeout=timeout)
         result = response.json()
         return Status(result["code"], result["message"])
@@ -1,24 +1,126 @@
+import contextvars
 import functools
+import inspect
+import time
+
 import requests
 import json
 
 from .constants import Status
+from .circuit_breaker import CircuitOpenError
+from .deadline import DeadlineExceededError, deadline_scope
+from .hedging import hedged_operation
+from .hooks import HandlerHooks
+from .retry import NO_RETRY
+
+_DEFAULT_HOOKS = HandlerHooks()
+
+# Set within a decorated call, whose retries cover the calls it makes
+_retrying = contextvars.ContextVar("retrying", default=False)
+
+
+def _error_status(error):
+    if isinstance(error, CircuitOpenError):
+        return Status(Status.CIRCUIT_OPEN, message=str(error))
+    if isinstance(error, DeadlineExceededError):
+        return Status(Status.DEADLINE_EXCEEDED, message=str(error))
+    if isinstance(error, requests.exceptions.Timeout):
+        return Status(Status.UNEXPECTED_ERROR, message='Request timeout')
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return Status(Status.CONNECT_FAILED, message=str(error))
+
+    return Status(Status.UNEXPECTED_ERROR, message=str(error))
+
+
+def handle_error(returns=tuple(), idempotent=True, hedge=False):
+    """
+    Turn request errors into a failed Status and retry them with the
+    `_retry_policy` of the handler
+
+    :type  returns: tuple
+    :param returns: values returned after the Status on failure
 
+    :type  idempotent: bool or callable
+    :param idempotent: whether the operation is safe to retry, a callable
+        gets the bound arguments of the call and decides per call
 
-def handle_error(returns=tuple()):
+    :type  hedge: bool
+    :param hedge: read-only operation whose requests the `_hedger` of the
+        handler may duplicate when they are slow
+
+    Every decorated method also takes a `deadline=` keyword, a Deadline or
+    a number of seconds, shared with the handler calls it makes. Decorated
+    calls made within another one are not retried: their errors go up to
+    the outer call, whose retries cover them, so nesting doesn't multiply
+    the attempts.
+    """
     def decorator(func):
+        signature = inspect.signature(func)
+
+        def is_idempotent(self, args, kwargs):
+            if not callable(idempotent):
+                return idempotent
+
+            bound = signature.bind(self, *args, **kwargs)
+            return idempotent(bound.arguments)
+
+        def failure(error):
+            status = _error_status(error)
+            return status if not returns else tuple([status]) + returns
+
+        def call(self, args, kwargs, deadline, nested):
+            policy = getattr(self, "_retry_policy", None) or NO_RETRY
+            hooks = getattr(self, "_hooks", None) or _DEFAULT_HOOKS
+            hedger = getattr(self, "_hedger", None) if hedge else None
+            operation = func.__name__
+            if policy.budget is not None and not nested:
+                policy.budget.deposit()
+
+            attempt = 0
+            while True:
+                attempt += 1
+                start = time.monotonic()
+                try:
+                    if deadline is not None and deadline.expired():
+                        raise DeadlineExceededError(
+                            "Deadline exceeded before {}".format(operation))
+                    token = hedged_operation.set(
+                        operation if hedger is not None else None)
+                    try:
+                        result = func(self, *args, **kwargs)
+                    finally:
+                        hedged_operation.reset(token)
+                except (requests.exceptions.RequestException,
+                        json.decoder.JSONDecodeError) as e:
+                    hooks.on_failure(operation, time.monotonic() - start, e)
+                    if nested:
+                        # retried, or turned into a Status, by the outer call
+                        raise
+                    delay = policy.next_delay(
+                        attempt, e, is_idempotent(self, args, kwargs))
+                    if (delay is not None and deadline is not None
+                            and delay >= deadline.remaining()):
+                        delay = None
+                    if delay is None:
+                        hooks.on_give_up(operation, attempt, e)
+                        return failure(e)
+
+                    hooks.on_retry(operation, attempt, delay, e)
+                    time.sleep(delay)
+                    continue
+
+                hooks.on_success(operation, time.monotonic() - start)
+                return result
+
         @functools.wraps(func)
         def wrapper(self, *args, **kwargs):
-            nonlocal returns
-            try:
-                return func(self, *args, **kwargs)
-            except requests.exceptions.Timeout:
-                status = Status(Status.UNEXPECTED_ERROR,
-                                message='Request timeout')
-                return returns if not returns else tuple([status]) + returns
-            except json.decoder.JSONDecodeError as e:
-                status = Status(Status.UNEXPECTED_ERROR, message=str(e))
-                return returns if not returns else tuple([status]) + returns
+            with deadline_scope(kwargs.pop("deadline", None)) as deadline:
+                nested = _retrying.get()
+                token = _retrying.set(True)
+                try:
+                    return call(self, args, kwargs, deadline, nested)
+                finally:
+                    _retrying.reset(token)
 
         return wrapper
 
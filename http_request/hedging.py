@@ -0,0 +1,213 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .retry import RetryBudget
+
+# Read-only operation in progress, whose requests the hedger may duplicate
+hedged_operation = contextvars.ContextVar("hedged_operation", default=None)
+
+
+class LatencyTracker:
+    """
+    Recent latencies of each operation
+
+    :type  window: int
+    :param window: latencies kept per operation
+    """
+    def __init__(self, window: int = 256):
+        self._window = window
+        self._latencies = defaultdict(lambda: deque(maxlen=self._window))
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, latency: float):
+        with self._lock:
+            self._latencies[operation].append(latency)
+
+    def count(self, operation: str):
+        with self._lock:
+            return len(self._latencies[operation])
+
+    def percentile(self, operation: str, percentile: float):
+        """
+        Latency percentile of an operation, None without samples
+        """
+        with self._lock:
+            samples = sorted(self._latencies[operation])
+        if not samples:
+            return None
+
+        index = min(len(samples) - 1,
+                    int(round(percentile / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class Hedger:
+    """
+    Send a duplicate of a slow read request to the same or another endpoint
+    and keep whichever answer arrives first
+
+    Only the HTTP request is duplicated, not the handler call around it.
+    The hedge fires once the primary request is slower than the
+    `percentile` latency observed for the operation. Every call deposits
+    `max_ratio` token in a budget and every hedge withdraws one, so hedges
+    stay below `max_ratio` of the calls. A request which can't be hedged,
+    for lack of samples, budget or room in the pool, is sent inline.
+
+    :type  endpoints: list[str]
+    :param endpoints: server uris, the first one gets the primary requests
+
+    :type  percentile: float
+    :param percentile: latency percentile after which a hedge is sent
+
+    :type  min_samples: int
+    :param min_samples: latencies needed before an operation is hedged
+
+    :type  min_delay: float
+    :param min_delay: seconds, lower bound of the hedge delay
+
+    :type  max_ratio: float
+    :param max_ratio: max ratio of hedged calls
+
+    :type  max_workers: int
+    :param max_workers: requests in flight in the pool, losers which have
+        not returned yet included
+    """
+    def __init__(self,
+                 endpoints,
+                 percentile: float = 95,
+                 min_samples: int = 20,
+                 min_delay: float = 0.005,
+                 max_ratio: float = 0.05,
+                 max_workers: int = 16,
+                 hooks=None):
+        self._endpoints = list(endpoints)
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._min_delay = min_delay
+        self._budget = RetryBudget(ratio=max_ratio,
+                                   min_per_second=0,
+                                   max_tokens=max(1.0, max_ratio * 100))
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="milvus-hedge")
+        self._tracker = LatencyTracker()
+        self._hooks = hooks
+        self._next = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tracker(self):
+        return self._tracker
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    def delay(self, operation: str):
+        """
+        Seconds to wait for the primary request before hedging, None when
+        the operation has too few samples yet
+        """
+        if self._tracker.count(operation) < self._min_samples:
+            return None
+
+        return max(self._min_delay,
+                   self._tracker.percentile(operation, self._percentile))
+
+    def _hedge_endpoint(self):
+        if len(self._endpoints) == 1:
+            return self._endpoints[0]
+
+        with self._lock:
+            self._next = self._next % (len(self._endpoints) - 1) + 1
+            return self._endpoints[self._next]
+
+    def _reserve(self, count: int):
+        with self._lock:
+            if self._in_flight + count > self._max_workers:
+                return False
+            self._in_flight += count
+            return True
+
+    def _release(self, _=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _submit(self, send, endpoint):
+        def attempt():
+            start = time.monotonic()
+            result = send(endpoint)
+            return result, time.monotonic() - start
+
+        future = self._executor.submit(contextvars.copy_context().run,
+                                       attempt)
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, operation: str, send):
+        """
+        Send a request with `send(endpoint)`, hedging it when the primary
+        one is slow
+
+        The response of the loser is closed once it arrives. Exceptions only
+        win when every request failed.
+        """
+        self._budget.deposit()
+        delay = self.delay(operation)
+        # room for the primary request and its hedge
+        if delay is None or self._budget.tokens < 1 or \
+                not self._reserve(2):
+            start = time.monotonic()
+            result = send(self._endpoints[0])
+            self._tracker.record(operation, time.monotonic() - start)
+            return result
+
+        start = time.monotonic()
+        primary = self._submit(send, self._endpoints[0])
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._budget.withdraw():
+            self._release()
+            result, latency = primary.result()
+            self._tracker.record(operation, latency)
+            return result
+
+        endpoint = self._hedge_endpoint()
+        if self._hooks is not None:
+            self._hooks.on_hedge(operation, endpoint, delay)
+        hedge = self._submit(send, endpoint)
+
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+
+                for other in pending:
+                    other.add_done_callback(_close)
+                result, _ = future.result()
+                self._tracker.record(operation, time.monotonic() - start)
+                return result
+
+        raise error
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _close(future):
+    """
+    Close the response of a request which lost the race
+    """
+    if future.exception() is None:
+        response, _ = future.result()
+        close = getattr(response, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,83 @@
+import threading
+from collections import defaultdict
+
+
+class HandlerHooks:
+    """
+    Callbacks fired by the handler around every operation
+
+    Subclass it and pass an instance as `hooks=` to the handler, every
+    method is a no-op by default.
+    """
+    def on_success(self, operation: str, latency: float):
+        """
+        An attempt of `operation` got a response after `latency` seconds
+        """
+
+    def on_failure(self, operation: str, latency: float, error: Exception):
+        """
+        An attempt of `operation` failed with `error`
+        """
+
+    def on_retry(self, operation: str, attempt: int, delay: float,
+                 error: Exception):
+        """
+        `operation` is retried, `attempt` starts at 1, after `delay` seconds
+        """
+
+    def on_give_up(self, operation: str, attempts: int, error: Exception):
+        """
+        `operation` failed after `attempts` attempts and won't be retried
+        """
+
+    def on_circuit_state(self, endpoint: str, previous: str, state: str):
+        """
+        The circuit breaker of `endpoint` moved from `previous` to `state`
+        """
+
+    def on_hedge(self, operation: str, endpoint: str, delay: float):
+        """
+        A duplicate of `operation` is sent to `endpoint` after `delay`
+        seconds without answer
+        """
+
+
+class MetricsHooks(HandlerHooks):
+    """
+    Hooks counting events per operation
+
+    :attribute counters: dict of (operation, event) -> count
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.latency = defaultdict(float)
+
+    def _count(self, operation: str, event: str, latency: float = None):
+        with self._lock:
+            self.counters[(operation, event)] += 1
+            if latency is not None:
+                self.latency[operation] += latency
+
+    def on_success(self, operation: str, latency: float):
+        self._count(operation, "success", latency)
+
+    def on_failure(self, operation: str, latency: float, error: Exception):
+        self._count(operation, "failure", latency)
+
+    def on_retry(self, operation: str, attempt: int, delay: float,
+                 error: Exception):
+        self._count(operation, "retry")
+
+    def on_give_up(self, operation: str, attempts: int, error: Exception):
+        self._count(operation, "give_up")
+
+    def on_circuit_state(self, endpoint: str, previous: str, state: str):
+        self._count(endpoint, "circuit_{}".format(state))
+
+    def on_hedge(self, operation: str, endpoint: str, delay: float):
+        self._count(operation, "hedge")
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
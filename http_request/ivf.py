@@ -0,0 +1,316 @@
+import numpy as np
+
+from .constants import IndexType, MetricType
+from . import metrics
+
+IVF_TYPES = (IndexType.IVFLAT, IndexType.IVF_SQ8)
+MAX_NLIST = 65536
+MAX_NPROBE = 16384
+
+# Rows used per centroid to train, the others are only assigned
+_POINTS_PER_CENTROID = 256
+# Rows scored at a time while assigning
+_ASSIGN_BLOCK = 16384
+
+
+def _assign(metric: MetricType, vectors, centroids):
+    """
+    Closest centroid of every vector
+    """
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_BLOCK):
+        block = vectors[start:start + _ASSIGN_BLOCK]
+        scores = metrics.scores(metric, block, centroids)
+        lists[start:start + len(block)] = np.argmin(scores, axis=1)
+    return lists
+
+
+def kmeans(data, k: int, iterations: int = 10, seed: int = 0):
+    """
+    Lloyd's k-means of float32 rows, at most 256 rows per centroid are used
+
+    An empty cluster takes over half of the largest one: its centroid is
+    the largest one, both being nudged apart.
+
+    :return: (k, dim) float32 centroids
+    """
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    if len(data) > k * _POINTS_PER_CENTROID:
+        data = data[np.sort(
+            rng.choice(len(data), k * _POINTS_PER_CENTROID, replace=False))]
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        lists = _assign(MetricType.L2, data, centroids)
+        order = np.argsort(lists, kind="stable")
+        counts = np.bincount(lists, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        sums = np.add.reduceat(data[order], starts, axis=0, dtype=np.float64)
+        centroids[filled] = sums / counts[filled, None]
+
+        for empty in np.flatnonzero(counts == 0):
+            largest = int(np.argmax(counts))
+            nudge = rng.standard_normal(data.shape[1]).astype(np.float32)
+            nudge *= 1e-3 * (np.abs(centroids[largest]).mean() + 1e-6)
+            centroids[empty] = centroids[largest] + nudge
+            centroids[largest] -= nudge
+            counts[empty] = counts[largest] // 2
+            counts[largest] -= counts[empty]
+
+    return centroids
+
+
+class _Lists:
+    """
+    Inverted lists: entries sorted by list with the offsets of every list,
+    followed by a short unsorted tail of the entries added since
+
+    Never modified once built, a search keeps the one it started with.
+    """
+    def __init__(self, offsets, rows, codes, tail_lists, tail_rows,
+                 tail_codes):
+        self.offsets = offsets
+        self.rows = rows
+        self.codes = codes
+        self.tail_lists = tail_lists
+        self.tail_rows = tail_rows
+        self.tail_codes = tail_codes
+
+    def __len__(self):
+        return len(self.rows) + len(self.tail_rows)
+
+
+class IvfIndex:
+    """
+    Inverted file index of float vectors: IVF_FLAT keeps the vectors of
+    every list contiguous, IVF_SQ8 keeps them quantized to one byte per
+    component, min/max per dimension being learnt at training
+
+    Entries refer to rows of the collection; deleted rows are skipped at
+    search time through the alive flags of the collection.
+
+    :type  index_type: IndexType
+    :param index_type: IndexType.IVFLAT or IndexType.IVF_SQ8
+
+    :type  metric_type: MetricType
+    :param metric_type: MetricType.L2 or MetricType.IP, the lists are
+        assigned and probed with it
+    """
+    def __init__(self, index_type: IndexType, metric_type: MetricType,
+                 nlist: int):
+        self.index_type = IndexType(index_type)
+        self.metric_type = MetricType(metric_type)
+        self.nlist = nlist
+        self.centroids = None
+        self._minimum = None
+        self._scale = None
+        self._lists = None
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def __len__(self):
+        return 0 if self._lists is None else len(self._lists)
+
+    def train(self, vectors, iterations: int = 10, seed: int = 0):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.centroids = kmeans(vectors, self.nlist, iterations, seed)
+        if self.index_type == IndexType.IVF_SQ8:
+            minimum = vectors.min(axis=0)
+            self._minimum = minimum
+            self._scale = np.maximum(vectors.max(axis=0) - minimum, 1e-12)
+        self.reset()
+
+    def reset(self):
+        """
+        Drop every entry, keeping the training
+        """
+        dim = self.centroids.shape[1]
+        dtype = np.uint8 if self.index_type == IndexType.IVF_SQ8 else \
+            np.float32
+        self._lists = _Lists(np.zeros(self.nlist + 1, dtype=np.int64),
+                             np.empty(0, dtype=np.int64),
+                             np.empty((0, dim), dtype=dtype),
+                             np.empty(0, dtype=np.int32),
+                             np.empty(0, dtype=np.int64),
+                             np.empty((0, dim), dtype=dtype))
+
+    def encode(self, vectors):
+        if self.index_type != IndexType.IVF_SQ8:
+            return np.ascontiguousarray(vectors, dtype=np.float32)
+
+        codes = (vectors - self._minimum) / self._scale * 255.0
+        return np.clip(np.rint(codes), 0, 255).astype(np.uint8)
+
+    def decode(self, codes):
+        if self.index_type != IndexType.IVF_SQ8:
+            return codes
+
+        # codes are rounded to the nearest step, not floored
+        return codes.astype(np.float32) / 255.0 * self._scale + self._minimum
+
+    def assign(self, vectors):
+        return _assign(self.metric_type,
+                       np.asarray(vectors, dtype=np.float32), self.centroids)
+
+    def add(self, vectors, rows, lists=None, encoded: bool = False):
+        """
+        Add vectors of the given rows, to the lists given or to those of
+        their closest centroids
+        """
+        if lists is None:
+            lists = self.assign(vectors)
+        codes = vectors if encoded else self.encode(vectors)
+        current = self._lists
+        tail_lists = np.concatenate((current.tail_lists, lists))
+        tail_rows = np.concatenate((current.tail_rows, rows))
+        tail_codes = np.concatenate((current.tail_codes, codes))
+        self._lists = _Lists(current.offsets, current.rows, current.codes,
+                             tail_lists, tail_rows, tail_codes)
+        # sorting cost is paid once the tail reaches an eighth of the lists
+        if len(tail_rows) > max(1024, len(current.rows) // 8):
+            self._sort()
+
+    def _entries(self):
+        """
+        (lists, rows, codes) of every entry
+        """
+        current = self._lists
+        lists = np.repeat(np.arange(self.nlist, dtype=np.int32),
+                          np.diff(current.offsets))
+        return (np.concatenate((lists, current.tail_lists)),
+                np.concatenate((current.rows, current.tail_rows)),
+                np.concatenate((current.codes, current.tail_codes)))
+
+    def _sort(self):
+        lists, rows, codes = self._entries()
+        order = np.argsort(lists, kind="stable")
+        offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=self.nlist), out=offsets[1:])
+        self._lists = _Lists(offsets, rows[order], codes[order],
+                             np.empty(0, dtype=np.int32),
+                             np.empty(0, dtype=np.int64),
+                             codes[:0])
+
+    def remapped(self, mapping):
+        """
+        Index of the rows renumbered after the collection dropped its
+        deleted rows, `mapping` holding the new row of every old row, -1
+        once dropped
+
+        A new index is returned so that searches running on this one keep
+        rows matching the arrays they took.
+        """
+        lists, rows, codes = self._entries()
+        rows = mapping[rows]
+        kept = rows >= 0
+        index = IvfIndex(self.index_type, self.metric_type, self.nlist)
+        index.centroids = self.centroids
+        index._minimum = self._minimum
+        index._scale = self._scale
+        index.reset()
+        index.add(codes[kept], rows[kept], lists=lists[kept], encoded=True)
+        index._sort()
+        return index
+
+    def state(self):
+        """
+        Arrays to save the index, see `from_state`
+        """
+        lists, rows, _ = self._entries()
+        state = {
+            "centroids": self.centroids,
+            "lists": lists,
+            "rows": rows,
+        }
+        if self.index_type == IndexType.IVF_SQ8:
+            state["minimum"] = self._minimum
+            state["scale"] = self._scale
+        return state
+
+    @classmethod
+    def from_state(cls, index_type: IndexType, metric_type: MetricType,
+                   state, vectors):
+        """
+        Index of saved arrays, the codes are computed again from the rows of
+        `vectors`
+        """
+        index = cls(index_type, metric_type, len(state["centroids"]))
+        index.centroids = state["centroids"]
+        if index.index_type == IndexType.IVF_SQ8:
+            index._minimum = state["minimum"]
+            index._scale = state["scale"]
+        index.reset()
+        rows = state["rows"]
+        index.add(vectors[rows], rows, lists=state["lists"])
+        index._sort()
+        return index
+
+    def search(self, queries, top_k: int, nprobe: int, live):
+        """
+        Top k of the entries of the `nprobe` lists closest to each query
+
+        :type  live: numpy.ndarray
+        :param live: flags of the rows which may be returned, rows past its
+            end are not
+
+        :return: (queries, top_k) distances, the lower the closer, inf
+            padded, and the rows they belong to
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        current = self._lists
+        nprobe = min(nprobe, self.nlist)
+        coarse = metrics.scores(self.metric_type, queries, self.centroids)
+        if nprobe < self.nlist:
+            probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist),
+                                     (len(queries), self.nlist))
+
+        tail_order = np.argsort(current.tail_lists, kind="stable")
+        tail_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(current.tail_lists, minlength=self.nlist),
+                  out=tail_offsets[1:])
+
+        best_scores = np.full((len(queries), top_k), np.inf,
+                              dtype=np.float32)
+        best_rows = np.full((len(queries), top_k), -1, dtype=np.int64)
+        # every list is scored once against all the queries probing it
+        flat = probes.ravel()
+        order = np.argsort(flat, kind="stable")
+        bounds = np.flatnonzero(np.diff(flat[order])) + 1
+        for group in np.split(order, bounds):
+            if not len(group):
+                continue
+            number = flat[group[0]]
+            members = group // probes.shape[1]
+            start, end = current.offsets[number], current.offsets[number + 1]
+            tail = tail_order[tail_offsets[number]:tail_offsets[number + 1]]
+            rows = np.concatenate((current.rows[start:end],
+                                   current.tail_rows[tail]))
+            if not len(rows):
+                continue
+            # rows added after `live` was taken are skipped
+            keep = rows < len(live)
+            keep[keep] = live[rows[keep]]
+            if not keep.any():
+                continue
+
+            codes = np.concatenate((current.codes[start:end],
+                                    current.tail_codes[tail]))[keep]
+            rows = rows[keep]
+            scores = metrics.scores(self.metric_type, queries[members],
+                                    self.decode(codes))
+            best_scores[members], best_rows[members] = metrics.merge_top_k(
+                best_scores[members], best_rows[members], scores, rows,
+                top_k)
+
+        return best_scores, best_rows
+
+    def __repr__(self):
+        return '%s(index_type=%s, metric_type=%s, nlist=%r, entries=%r)' % (
+            self.__class__.__name__, self.index_type, self.metric_type,
+            self.nlist, len(self))
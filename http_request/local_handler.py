@@ -0,0 +1,1162 @@
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from typing import List, Dict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .abstracts import MilvusAbstract, IndexParam, CollectionSchema
+from .abstracts import TopKQueryResult, PartitionParam
+from .autotune import AutoTuner
+from .constants import Status, IndexType, MetricType
+from milvus import NotConnectError, ParamError
+from milvus.check import check_records, validation_enabled
+from .encoder import row_chunks
+from .handler_wrapper import handle_error
+from .ivf import IVF_TYPES, MAX_NLIST, MAX_NPROBE, IvfIndex
+from .metrics import BINARY_METRICS, MAX_BYTES
+from . import metrics
+from .time_partition import DAY, bucket_tag, overlapping_tags
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAG = "_default"
+VERSION = "0.10.0"
+
+_META = "meta.json"
+_LOCK = ".lock"
+_IVF = "ivf.npz"
+_ARRAYS = ("vectors", "ids", "partitions", "alive")
+_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,254}$")
+_MAX_TOP_K = 16384
+_MAX_DIMENSION = 32768
+_INITIAL_CAPACITY = 1024
+
+
+def _lock_directory(path: str):
+    """
+    Open and lock the lock file of a handler directory, the lock is held
+    until the file is closed
+
+    Locks are advisory flock locks, taken on POSIX systems only.
+    """
+    file = open(os.path.join(path, _LOCK), mode='a')
+    if fcntl is None:
+        return file
+
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        raise NotConnectError(
+            "{} is used by another handler or process".format(path))
+    return file
+
+
+def _not_found(collection_name: str):
+    return Status(Status.COLLECTION_NOT_EXISTS,
+                  "Collection {} does not exist".format(collection_name))
+
+
+class _IdIndex:
+    """
+    Sorted ids of the live rows of a collection with their row numbers,
+    looked up with binary searches
+    """
+    def __init__(self, ids=None, rows=None):
+        if ids is None:
+            ids = np.empty(0, dtype=np.int64)
+            rows = np.empty(0, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        self._keys = ids[order]
+        self._rows = rows[order]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _find(self, ids):
+        positions = np.searchsorted(self._keys, ids)
+        positions[positions == len(self._keys)] = 0
+        return positions, self._keys[positions] == ids
+
+    def lookup(self, ids):
+        """
+        Row of each id, -1 for unknown ids
+        """
+        if not len(self._keys):
+            return np.full(len(ids), -1, dtype=np.int64)
+
+        positions, found = self._find(ids)
+        return np.where(found, self._rows[positions], -1)
+
+    def add(self, ids, rows):
+        """
+        Index ids which are not indexed yet
+        """
+        order = np.argsort(ids, kind="stable")
+        positions = np.searchsorted(self._keys, ids[order])
+        self._keys = np.insert(self._keys, positions, ids[order])
+        self._rows = np.insert(self._rows, positions, rows[order])
+
+    def remove(self, ids):
+        if not len(self._keys):
+            return
+
+        positions, found = self._find(ids)
+        keep = np.ones(len(self._keys), dtype=bool)
+        keep[positions[found]] = False
+        self._keys = self._keys[keep]
+        self._rows = self._rows[keep]
+
+
+class _Collection:
+    """
+    Rows of a collection in contiguous arrays of doubling capacity: the
+    vectors, float32 or packed bits as uint8, their ids, the number of their
+    partition and whether they are alive
+
+    Deletes only clear the alive flag and rows are only appended, so a
+    search can work on the arrays it got without holding the lock. With a
+    directory the arrays are memory-mapped .npy files next to a JSON meta
+    file.
+    """
+    def __init__(self, meta: dict, directory: str = None, arrays=None):
+        self.meta = meta
+        self._directory = directory
+        if arrays is None:
+            arrays = self._allocate(_INITIAL_CAPACITY)
+            self._replace(arrays)
+        self.vectors, self.ids, self.partitions, self.alive = arrays
+        self._reindex()
+        self.ivf = None
+        self._load_ivf()
+
+    @classmethod
+    def create(cls, collection_name: str, dimension: int,
+               index_file_size: int, metric_type: MetricType,
+               directory: str = None):
+        meta = {
+            "collection_name": collection_name,
+            "dimension": dimension,
+            "index_file_size": index_file_size,
+            "metric_type": int(metric_type),
+            "size": 0,
+            "next_id": 1,
+            "auto_id": None,
+            "partitions": {
+                DEFAULT_TAG: 0
+            },
+            "next_partition": 1,
+            "index": {
+                "index_type": int(IndexType.FLAT),
+                "params": {}
+            },
+        }
+        if directory is not None:
+            os.makedirs(directory)
+        collection = cls(meta, directory)
+        collection.save()
+        return collection
+
+    @classmethod
+    def open(cls, directory: str):
+        with open(os.path.join(directory, _META), mode='r',
+                  encoding='utf-8') as file:
+            meta = json.load(file)
+        arrays = tuple(
+            np.load(os.path.join(directory, name + ".npy"), mmap_mode='r+')
+            for name in _ARRAYS)
+        return cls(meta, directory, arrays)
+
+    def _load_ivf(self):
+        """
+        IVF index of the saved lists, the rows added since are assigned
+        again; trained on the next search when nothing was saved
+        """
+        index = self.meta["index"]
+        if not self.indexable(index["index_type"]):
+            return
+
+        self.ivf = IvfIndex(index["index_type"], self.meta["metric_type"],
+                            index["params"]["nlist"])
+        path = None if self._directory is None else os.path.join(
+            self._directory, _IVF)
+        if path is None or not os.path.exists(path):
+            return
+
+        with np.load(path) as state:
+            state = dict(state)
+        self.ivf = IvfIndex.from_state(index["index_type"],
+                                       self.meta["metric_type"], state,
+                                       self.vectors)
+        rows = np.arange(int(state["size"]), self.size)
+        rows = rows[self.alive[rows]]
+        if len(rows):
+            self.ivf.add(self.vectors[rows], rows)
+
+    def indexable(self, index_type: IndexType):
+        """
+        Whether searches go through an IVF index of this type, the other
+        index types are only recorded
+        """
+        return index_type in IVF_TYPES and not self.binary
+
+    def build_index(self):
+        """
+        Train the IVF index once the collection holds a row per list
+
+        :return: the trained IvfIndex, None while searches stay exact
+        """
+        if self.ivf is None:
+            return None
+        if not self.ivf.trained:
+            if self.count < self.ivf.nlist:
+                return None
+
+            rows = np.flatnonzero(self.alive[:self.size])
+            self.ivf.train(self.vectors[rows])
+            self.ivf.add(self.vectors[rows], rows)
+        return self.ivf
+
+    @property
+    def binary(self):
+        return self.meta["metric_type"] in BINARY_METRICS
+
+    @property
+    def width(self):
+        dimension = self.meta["dimension"]
+        return dimension // 8 if self.binary else dimension
+
+    @property
+    def size(self):
+        return self.meta["size"]
+
+    @property
+    def count(self):
+        return len(self._id_index)
+
+    def _allocate(self, capacity: int):
+        shapes = ((capacity, self.width), (capacity, ), (capacity, ),
+                  (capacity, ))
+        types = (np.uint8 if self.binary else np.float32, np.int64, np.int32,
+                 bool)
+        if self._directory is None:
+            return tuple(
+                np.zeros(shape, dtype=dtype)
+                for shape, dtype in zip(shapes, types))
+
+        return tuple(
+            np.lib.format.open_memmap(os.path.join(self._directory,
+                                                   name + ".npy.tmp"),
+                                      mode='w+',
+                                      dtype=dtype,
+                                      shape=shape)
+            for name, shape, dtype in zip(_ARRAYS, shapes, types))
+
+    def _replace(self, arrays):
+        """
+        Move freshly allocated files over the current ones, the mappings
+        stay valid
+        """
+        if self._directory is None:
+            return
+
+        for name, array in zip(_ARRAYS, arrays):
+            array.flush()
+            path = os.path.join(self._directory, name + ".npy")
+            os.replace(path + ".tmp", path)
+
+    def _reserve(self, rows: int):
+        size = self.size
+        capacity = len(self.ids)
+        if size + rows <= capacity:
+            return
+
+        while capacity < size + rows:
+            capacity *= 2
+        arrays = self._allocate(capacity)
+        for new, old in zip(arrays, self.arrays()):
+            new[:size] = old[:size]
+        self._replace(arrays)
+        self.vectors, self.ids, self.partitions, self.alive = arrays
+
+    def _reindex(self):
+        rows = np.flatnonzero(self.alive[:self.size])
+        self._id_index = _IdIndex(self.ids[rows], rows)
+
+    def arrays(self):
+        return self.vectors, self.ids, self.partitions, self.alive
+
+    def convert(self, records):
+        """
+        Records as a (rows, width) array of the storage type
+        """
+        if self.binary:
+            if isinstance(records, np.ndarray):
+                array = records
+            elif all(isinstance(record, bytes) for record in records):
+                array = np.frombuffer(b"".join(records), dtype=np.uint8)
+                array = array.reshape(len(records), -1) if len(
+                    records) else array.reshape(0, self.width)
+            else:
+                raise ParamError("Binary vectors must be given as bytes")
+            dtype = np.uint8
+        else:
+            array = np.asarray(records)
+            dtype = np.float32
+
+        if array.ndim != 2 or array.shape[1] != self.width:
+            raise ParamError(
+                "Vector dimension does not match the collection dimension "
+                "{}".format(self.meta["dimension"]))
+        with np.errstate(over='ignore'):
+            return np.ascontiguousarray(array, dtype=dtype)
+
+    def lookup(self, ids):
+        return self._id_index.lookup(np.asarray(ids, dtype=np.int64))
+
+    def insert(self, vectors, ids, partition: int):
+        """
+        Append rows, a row replaces the live row holding the same id
+        """
+        rows = len(vectors)
+        if ids is None:
+            ids = np.arange(self.meta["next_id"],
+                            self.meta["next_id"] + rows,
+                            dtype=np.int64)
+            self.meta["next_id"] += rows
+        else:
+            replaced = self.lookup(ids)
+            self.alive[replaced[replaced >= 0]] = False
+            self._id_index.remove(ids)
+
+        self._reserve(rows)
+        start = self.size
+        end = start + rows
+        self.vectors[start:end] = vectors
+        self.ids[start:end] = ids
+        self.partitions[start:end] = partition
+        self.alive[start:end] = True
+        self._id_index.add(ids, np.arange(start, end, dtype=np.int64))
+        self.meta["size"] = end
+        if self.ivf is not None and self.ivf.trained:
+            self.ivf.add(vectors, np.arange(start, end, dtype=np.int64))
+        return ids
+
+    def delete(self, ids):
+        rows = self.lookup(ids)
+        rows = rows[rows >= 0]
+        self.alive[rows] = False
+        self._id_index.remove(self.ids[rows])
+        return len(rows)
+
+    def drop_partition(self, partition: int):
+        rows = self.partition_rows(partition)
+        self.alive[rows] = False
+        self._id_index.remove(self.ids[rows])
+
+    def partition_rows(self, partition: int):
+        """
+        Live rows of a partition, in insertion order
+        """
+        return np.flatnonzero(self.alive[:self.size]
+                              & (self.partitions[:self.size] == partition))
+
+    def compact(self):
+        """
+        Drop the deleted rows, into new arrays so running searches keep
+        theirs
+        """
+        rows = np.flatnonzero(self.alive[:self.size])
+        if len(rows) == self.size:
+            return
+
+        capacity = max(_INITIAL_CAPACITY, len(self.ids))
+        arrays = self._allocate(capacity)
+        for new, old in zip(arrays, self.arrays()):
+            new[:len(rows)] = old[rows]
+        self._replace(arrays)
+        self.vectors, self.ids, self.partitions, self.alive = arrays
+        if self.ivf is not None and self.ivf.trained:
+            mapping = np.full(self.size, -1, dtype=np.int64)
+            mapping[rows] = np.arange(len(rows))
+            self.ivf = self.ivf.remapped(mapping)
+        self.meta["size"] = len(rows)
+        self._reindex()
+
+    def save(self, arrays: bool = True):
+        """
+        Write the meta file, and the arrays to disk unless `arrays` is False,
+        the rows of unsaved arrays persist unless the system crashes
+        """
+        if self._directory is None:
+            return
+
+        if arrays:
+            for array in self.arrays():
+                array.flush()
+            self._save_ivf()
+        path = os.path.join(self._directory, _META)
+        with open(path + ".tmp", mode='w', encoding='utf-8') as file:
+            json.dump(self.meta, file)
+        os.replace(path + ".tmp", path)
+
+    def _save_ivf(self):
+        path = os.path.join(self._directory, _IVF)
+        if self.ivf is None or not self.ivf.trained:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        with open(path + ".tmp", mode='wb') as file:
+            np.savez(file, size=self.size, **self.ivf.state())
+        os.replace(path + ".tmp", path)
+
+    def set_index(self, index_type: IndexType, params: dict):
+        self.meta["index"] = {
+            "index_type": int(index_type),
+            "params": dict(params or {})
+        }
+        self.ivf = IvfIndex(index_type, self.meta["metric_type"],
+                            params["nlist"]) if self.indexable(
+                                index_type) else None
+        self.build_index()
+        self.save(arrays=self.ivf is None or self.ivf.trained)
+
+    def close(self):
+        self.save()
+        self.vectors = self.ids = self.partitions = self.alive = None
+
+    def remove(self):
+        self.vectors = self.ids = self.partitions = self.alive = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class LocalHandler(MilvusAbstract):
+    """
+    In-process engine with the methods of HttpHandler, for unit tests, edge
+    deployments and small collections: no server, no network hop
+
+    Searches are exact (FLAT) for every MetricType, or go through an
+    IVF_FLAT or IVF_SQ8 index of float vectors, see `create_index`. L2
+    distances are squared like the server's. Inserted rows are searchable
+    and deleted ones gone at once, without waiting for a flush. An id
+    inserted again replaces its previous vector.
+
+    :type  path: str
+    :param path: directory persisting the collections as memory-mapped .npy
+        files, reopened by the next handler on it; None keeps them in memory.
+        One handler of one process uses a directory at a time: another
+        handler on it raises NotConnectError until this one is closed, and
+        so does a call from a process forked after it was opened
+
+    :type  time_bucket: str
+    :param time_bucket: `day`, `week` or `month` partitions of timestamped
+        inserts
+
+    :type  max_bytes: int
+    :param max_bytes: size of the intermediate matrices of exact searches,
+        see `metrics.top_k`
+
+    :type  autotune: dict
+    :param autotune: AutoTuner options, see HttpHandler
+
+    Other HttpHandler options, such as `host` and `port`, are accepted and
+    ignored.
+    """
+    def __init__(self, path: str = None, **kwargs):
+        self._status = Status()
+        self._path = path
+        self._time_bucket = kwargs.get("time_bucket", DAY)
+        self._max_bytes = kwargs.get("max_bytes", MAX_BYTES)
+        self._autotuner = None
+        if kwargs.get("autotune", None) is not None:
+            self._autotuner = AutoTuner(**kwargs["autotune"])
+        self._collections = dict()
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._lock_file = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._lock_file = _lock_directory(path)
+            for name in sorted(os.listdir(path)):
+                directory = os.path.join(path, name)
+                if os.path.exists(os.path.join(directory, _META)):
+                    self._collections[name] = _Collection.open(directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Save the collections, they are unusable afterwards
+        """
+        with self._lock:
+            if self._forked():
+                # the collections belong to the parent process
+                return
+
+            for collection in self._collections.values():
+                collection.close()
+            self._collections.clear()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def autotuner(self):
+        return self._autotuner
+
+    def ping(self, timeout: int = 10, deadline=None):
+        return Status()
+
+    @handle_error(returns=(None, ))
+    def server_version(self, timeout: int = None):
+        return Status(), VERSION
+
+    @handle_error(returns=(None, ))
+    def server_status(self, timeout: int = None):
+        return Status(), "OK"
+
+    def _forked(self):
+        return self._path is not None and os.getpid() != self._pid
+
+    def _owned(self):
+        """
+        Collections of the handler, refused to a process forked after the
+        directory was opened: its writes would race those of the parent
+        """
+        if self._forked():
+            raise NotConnectError(
+                "{} is used by process {}".format(self._path, self._pid))
+        return self._collections
+
+    def _get(self, collection_name: str):
+        return self._owned().get(collection_name, None)
+
+    @handle_error()
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          index_file_size: int,
+                          metric_type: MetricType,
+                          timeout: int = None):
+        """
+        Create collection
+
+        :return: Status, indicate if connect is successful
+        """
+        if not isinstance(collection_name, str) or not _NAME.match(
+                collection_name):
+            return Status(Status.ILLEGAL_COLLECTION_NAME,
+                          "Illegal collection name {}".format(collection_name))
+        try:
+            metric_type = MetricType(metric_type)
+        except ValueError:
+            metric_type = MetricType.INVALID
+        if metric_type == MetricType.INVALID:
+            return Status(Status.ILLEGAL_METRIC_TYPE,
+                          "Illegal metric type {}".format(metric_type))
+        if (not isinstance(dimension, int)
+                or not 0 < dimension <= _MAX_DIMENSION
+                or (metric_type in BINARY_METRICS and dimension % 8)):
+            return Status(Status.ILLEGAL_DIMENSION,
+                          "Illegal dimension {}".format(dimension))
+
+        with self._lock:
+            if collection_name in self._owned():
+                return Status(
+                    Status.ILLEGAL_COLLECTION_NAME,
+                    "Collection {} already exists".format(collection_name))
+
+            directory = None if self._path is None else os.path.join(
+                self._path, collection_name)
+            self._collections[collection_name] = _Collection.create(
+                collection_name, dimension, index_file_size, metric_type,
+                directory)
+        return Status(message='Create table successfully!')
+
+    @handle_error(returns=(False, ))
+    def has_collection(self, collection_name: str, timeout: int = None):
+        return Status(), collection_name in self._owned()
+
+    @handle_error(returns=(None, ))
+    def get_table_row_count(self, table_name: str, timeout: int = None):
+        collection = self._get(table_name)
+        if collection is None:
+            return _not_found(table_name), None
+        return Status(), collection.count
+
+    @handle_error(returns=(None, ))
+    def describe_collection(self, collection_name: str, timeout: int = None):
+        collection = self._get(collection_name)
+        if collection is None:
+            return _not_found(collection_name), None
+
+        meta = collection.meta
+        table = CollectionSchema(collection_name=collection_name,
+                                 dimension=meta["dimension"],
+                                 index_file_size=meta["index_file_size"],
+                                 metric_type=meta["metric_type"])
+        return Status(message='Described table successfully!'), table
+
+    @handle_error(returns=([], ))
+    def show_collections(self, timeout: int = None):
+        return Status(), sorted(self._owned())
+
+    @handle_error(returns=(None, ))
+    def show_collection_info(self, collection_name: str, timeout: int = 10):
+        """
+        Statistics in the layout of the server's, every partition being one
+        segment named after the number of the partition
+        """
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name), None
+
+            index_type = IndexType(collection.meta["index"]["index_type"])
+            partitions = []
+            for tag, number in collection.meta["partitions"].items():
+                count = len(collection.partition_rows(number))
+                segments = [{
+                    "name": str(number),
+                    "count": count,
+                    "data_size": count * collection.vectors.itemsize *
+                    collection.width,
+                    "index_name": index_type.name,
+                }] if count else []
+                partitions.append({
+                    "tag": tag,
+                    "count": count,
+                    "segments": segments
+                })
+            return Status(), {
+                "count": collection.count,
+                "partitions": partitions
+            }
+
+    @handle_error()
+    def preload_collection(self,
+                           collection_name: str,
+                           timeout: int = None,
+                           partition_tags: List = None):
+        if self._get(collection_name) is None:
+            return _not_found(collection_name)
+        return Status(message="Load successfully")
+
+    @handle_error()
+    def drop_collection(self, collection_name: str, timeout: int = None):
+        with self._lock:
+            collection = self._owned().pop(collection_name, None)
+            if collection is None:
+                return _not_found(collection_name)
+            collection.remove()
+        if self._autotuner is not None:
+            self._autotuner.forget(collection_name)
+        return Status(message="Delete successfully!")
+
+    def _partition(self, collection, partition_tag: str):
+        number = collection.meta["partitions"].get(partition_tag or
+                                                   DEFAULT_TAG)
+        if number is None:
+            return Status(
+                Status.ILLEGAL_ARGUMENT,
+                "Partition {} does not exist".format(partition_tag)), None
+        return Status(), number
+
+    def _insert(self, collection_name: str, records, ids, partition_tag: str,
+                timestamp, validate: bool):
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name), []
+
+            if validate is None:
+                validate = validation_enabled()
+            if validate:
+                check_records(records,
+                              dimension=collection.meta["dimension"],
+                              validate=True,
+                              binary=collection.binary)
+
+            if timestamp is not None:
+                if partition_tag:
+                    raise ParamError(
+                        "`partition_tag` and `timestamp` are exclusive")
+                partition_tag = bucket_tag(timestamp, self._time_bucket)
+                if partition_tag not in collection.meta["partitions"]:
+                    self._add_partition(collection, partition_tag)
+
+            status, partition = self._partition(collection, partition_tag)
+            if not status.ok():
+                return status, []
+
+            try:
+                vectors = collection.convert(records)
+            except ParamError as error:
+                return Status(Status.ILLEGAL_ROWRECORD, str(error)), []
+
+            auto_id = ids is None or len(ids) == 0
+            if collection.meta["auto_id"] not in (None, auto_id):
+                return Status(
+                    Status.ILLEGAL_VECTOR_ID,
+                    "Ids must be given for every insert into {}, or never".
+                    format(collection_name)), []
+
+            if not auto_id:
+                ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+                if len(ids) != len(vectors):
+                    return Status(
+                        Status.ILLEGAL_ROWRECORD,
+                        "{} ids for {} vectors".format(
+                            len(ids), len(vectors))), []
+                if len(np.unique(ids)) != len(ids):
+                    return Status(Status.ILLEGAL_VECTOR_ID,
+                                  "Ids of an insert must be unique"), []
+
+            collection.meta["auto_id"] = auto_id
+            ids = collection.insert(vectors, None if auto_id else ids,
+                                    partition)
+            collection.save(arrays=False)
+        return Status(message='Add vectors successfully!'), ids.tolist()
+
+    @handle_error(returns=([], ))
+    def add_vectors(self,
+                    collection_name: str,
+                    records,
+                    ids: List = None,
+                    partition_tag: str = None,
+                    timestamp=None,
+                    timeout: int = None,
+                    validate: bool = None):
+        """
+        Add vectors to table
+
+        :type  records: list[list[float]], list[bytes] or numpy.ndarray
+        :param records: float vectors, or binary vectors as bytes or as
+            uint8 arrays of their packed bits
+
+        :returns:
+            Status : indicate if vectors inserted successfully
+            ids :list of id, after inserted every vector is given a id
+        """
+        return self._insert(collection_name, records, ids, partition_tag,
+                            timestamp, validate)
+
+    @handle_error(returns=([], ))
+    def add_vectors_stream(self,
+                           collection_name: str,
+                           records,
+                           ids: List = None,
+                           partition_tag: str = None,
+                           chunk_rows: int = 4096,
+                           timeout: int = None,
+                           validate: bool = None):
+        """
+        Add vectors given as an ndarray or an iterable of rows and chunks,
+        see HttpHandler.add_vectors_stream
+        """
+        if not isinstance(records, np.ndarray):
+            chunks = [
+                np.asarray(chunk) if not isinstance(chunk, list)
+                or not chunk or not isinstance(chunk[0], bytes) else
+                np.frombuffer(b"".join(chunk), dtype=np.uint8).reshape(
+                    len(chunk), -1)
+                for chunk in row_chunks(records, chunk_rows)
+            ]
+            records = np.concatenate(chunks) if chunks else np.empty((0, 0))
+        return self._insert(collection_name, records, ids, partition_tag,
+                            None, validate)
+
+    @handle_error(returns=(None, ))
+    def get_vectors_by_ids(self, collection_name: str, ids: List,
+                           timeout: int = None):
+        """
+        Vectors of the ids, lists of floats or bytes, empty for unknown ids
+        """
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name), None
+
+            rows = collection.lookup(ids)
+            vectors = collection.vectors[np.maximum(rows, 0)]
+        if collection.binary:
+            return Status(), [
+                bytes(vector) if row >= 0 else []
+                for row, vector in zip(rows, vectors)
+            ]
+        return Status(), [
+            vector if row >= 0 else []
+            for row, vector in zip(rows.tolist(), vectors.tolist())
+        ]
+
+    @handle_error(returns=(None, ))
+    def get_vector_ids(self,
+                       collection_name: str,
+                       segment_name: str,
+                       timeout: int = None,
+                       offset: int = 0,
+                       page_size: int = 1000000):
+        """
+        Page of the ids of a segment, see `show_collection_info`
+        """
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name), None
+
+            numbers = set(collection.meta["partitions"].values())
+            if not segment_name.isdigit() or int(segment_name) not in numbers:
+                return Status(
+                    Status.ILLEGAL_ARGUMENT,
+                    "Segment {} does not exist".format(segment_name)), None
+
+            rows = collection.partition_rows(int(segment_name))
+            rows = rows[offset:offset + page_size]
+            return Status(), collection.ids[rows].tolist()
+
+    @handle_error()
+    def create_index(self,
+                     collection_name: str,
+                     index_type: IndexType,
+                     index_params: Dict = None,
+                     timeout: int = None):
+        """
+        Build the index of a collection
+
+        IVF_FLAT and IVF_SQ8 indexes of float vectors are built in process,
+        once the collection holds `nlist` rows, and searched with the
+        `nprobe` search param; other index types are recorded and searched
+        exactly.
+
+        :type index_params: Dict
+        :param index_params: e.g. {"nlist": 1024}
+        """
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name)
+
+            try:
+                index_type = IndexType(index_type)
+            except ValueError:
+                index_type = IndexType.INVALID
+            if index_type == IndexType.INVALID:
+                return Status(Status.ILLEGAL_INDEX_TYPE,
+                              "Illegal index type {}".format(index_type))
+
+            nlist = (index_params or {}).get("nlist", None)
+            if index_type in IVF_TYPES and (
+                    isinstance(nlist, bool) or not isinstance(nlist, int)
+                    or not 0 < nlist <= MAX_NLIST):
+                return Status(Status.ILLEGAL_NLIST,
+                              "Illegal nlist {}".format(nlist))
+
+            collection.set_index(index_type, index_params)
+        if self._autotuner is not None:
+            self._autotuner.invalidate(collection_name)
+        return Status(message="Build index successfully!")
+
+    @handle_error(returns=(None, ))
+    def describe_index(self, collection_name: str, timeout: int = None):
+        collection = self._get(collection_name)
+        if collection is None:
+            return _not_found(collection_name), None
+
+        index = collection.meta["index"]
+        return Status(), IndexParam(collection_name, index["index_type"],
+                                    dict(index["params"]))
+
+    @handle_error()
+    def drop_index(self, collection_name: str, timeout: int = None):
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name)
+
+            collection.set_index(IndexType.FLAT, {})
+        if self._autotuner is not None:
+            self._autotuner.invalidate(collection_name)
+        return Status()
+
+    def _add_partition(self, collection, partition_tag: str):
+        meta = collection.meta
+        meta["partitions"][partition_tag] = meta["next_partition"]
+        meta["next_partition"] += 1
+        collection.save(arrays=False)
+
+    @handle_error()
+    def create_partition(self,
+                         collection_name: str,
+                         partition_tag: str,
+                         timeout: int = None):
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name)
+
+            if partition_tag in collection.meta["partitions"]:
+                return Status(
+                    Status.ILLEGAL_ARGUMENT,
+                    "Partition {} already exists".format(partition_tag))
+            self._add_partition(collection, partition_tag)
+        return Status()
+
+    @handle_error(returns=([], ))
+    def show_partitions(self,
+                        collection_name: str,
+                        timeout: int = None,
+                        offset: int = 0,
+                        page_size: int = 100):
+        collection = self._get(collection_name)
+        if collection is None:
+            return _not_found(collection_name), []
+
+        tags = list(collection.meta["partitions"])[offset:offset + page_size]
+        return Status(), [PartitionParam(collection_name, tag) for tag in tags]
+
+    @handle_error(returns=(False, ))
+    def has_partition(self,
+                      collection_name: str,
+                      tag: str,
+                      timeout: int = None):
+        collection = self._get(collection_name)
+        if collection is None:
+            return _not_found(collection_name), False
+        return Status(), tag in collection.meta["partitions"]
+
+    @handle_error()
+    def drop_partition(self,
+                       collection_name: str,
+                       partition_tag: str,
+                       timeout: int = None):
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name)
+
+            if partition_tag == DEFAULT_TAG:
+                return Status(Status.ILLEGAL_ARGUMENT,
+                              "The default partition cannot be dropped")
+            number = collection.meta["partitions"].pop(partition_tag, None)
+            if number is None:
+                return Status(
+                    Status.ILLEGAL_ARGUMENT,
+                    "Partition {} does not exist".format(partition_tag))
+
+            collection.drop_partition(number)
+            collection.save(arrays=False)
+        return Status()
+
+    def _search(self, collection_name: str, top_k: int, query_records,
+                partitions=None, search_params: Dict = None,
+                validate: bool = None):
+        """
+        Top k of the live rows of the given partition numbers, through the
+        IVF index of the collection or exact
+        """
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name), None
+
+            # the arrays and the rows below `size` never move, only their
+            # alive flags change, the scan needs no lock; compaction swaps in
+            # new arrays and a new IVF index, this pair stays consistent
+            vectors, ids, numbers, alive = collection.arrays()
+            size = collection.size
+            metric = MetricType(collection.meta["metric_type"])
+            ivf = collection.build_index()
+
+        if not isinstance(top_k, int) or not 0 < top_k <= _MAX_TOP_K:
+            return Status(Status.ILLEGAL_TOPK,
+                          "Illegal top k {}".format(top_k)), None
+        nprobe = (search_params or {}).get("nprobe", None)
+        if ivf is not None and (isinstance(nprobe, bool)
+                                or not isinstance(nprobe, int)
+                                or not 0 < nprobe <= MAX_NPROBE):
+            return Status(Status.ILLEGAL_ARGUMENT,
+                          "Illegal nprobe {}".format(nprobe)), None
+        if validate is None:
+            validate = validation_enabled()
+        if validate:
+            check_records(query_records,
+                          dimension=collection.meta["dimension"],
+                          validate=True,
+                          binary=collection.binary)
+        try:
+            queries = collection.convert(query_records)
+        except ParamError as error:
+            return Status(Status.ILLEGAL_ROWRECORD, str(error)), None
+
+        live = alive[:size].copy()
+        if partitions is not None:
+            live &= np.isin(numbers[:size], partitions)
+        if ivf is not None:
+            best_scores, rows = metrics.sort_top_k(
+                *ivf.search(queries, top_k, nprobe, live))
+            distances = metrics.to_distances(metric, best_scores)
+        else:
+            distances, rows = metrics.top_k(metric,
+                                            queries,
+                                            vectors[:size],
+                                            top_k,
+                                            live=live,
+                                            max_bytes=self._max_bytes)
+
+        result_ids = np.where(rows >= 0, ids[rows], -1)
+        return Status(), TopKQueryResult.from_arrays(result_ids, distances)
+
+    def _partition_numbers(self, collection_name: str, partition_tags: List):
+        collection = self._get(collection_name)
+        if collection is None or not partition_tags:
+            return Status(), None
+
+        known = collection.meta["partitions"]
+        missing = [tag for tag in partition_tags if tag not in known]
+        if missing:
+            return Status(
+                Status.ILLEGAL_ARGUMENT,
+                "Partitions {} do not exist".format(", ".join(missing))), None
+        return Status(), [known[tag] for tag in partition_tags]
+
+    @handle_error(returns=(None, ))
+    def search_vectors(self,
+                       collection_name: str,
+                       top_k: int,
+                       query_records,
+                       partition_tags: List = None,
+                       search_params: Dict = None,
+                       query_ranges: List = None,
+                       timeout: int = None,
+                       validate: bool = None,
+                       **kwargs):
+        """
+        Exact search, see HttpHandler.search_vectors
+
+        :returns:
+            Status:  indicate if query is successful
+            query_results: TopKQueryResult
+        """
+        if query_ranges:
+            status, partitions = self.show_partitions(collection_name,
+                                                      page_size=1 << 30)
+            if not status.ok():
+                return status, None
+
+            tags = overlapping_tags([p.tag for p in partitions], query_ranges)
+            if partition_tags:
+                tags = [tag for tag in tags if tag in partition_tags]
+            if not tags:
+                return Status(), TopKQueryResult.empty(len(query_records))
+            partition_tags = tags
+
+        if not search_params and self._autotuner is not None:
+            search_params = self._autotuner.params(self, collection_name,
+                                                   top_k, timeout)
+        status, numbers = self._partition_numbers(collection_name,
+                                                  partition_tags)
+        if not status.ok():
+            return status, None
+        return self._search(collection_name, top_k, query_records, numbers,
+                            search_params, validate)
+
+    @handle_error(returns=(None, ))
+    def search_by_ids(self,
+                      collection_name: str,
+                      ids: List,
+                      top_k: int,
+                      partition_tags: List = None,
+                      search_params: Dict = None,
+                      timeout=None,
+                      **kwargs):
+        """
+        Search with the vectors of the ids as queries
+        """
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name), None
+
+            rows = collection.lookup(ids)
+            if (rows < 0).any():
+                return Status(Status.ILLEGAL_VECTOR_ID,
+                              "Ids {} do not exist".format(
+                                  np.asarray(ids)[rows < 0].tolist())), None
+            queries = collection.vectors[rows]
+
+        status, numbers = self._partition_numbers(collection_name,
+                                                  partition_tags)
+        if not status.ok():
+            return status, None
+        return self._search(collection_name, top_k, queries, numbers,
+                            search_params, False)
+
+    @handle_error(returns=(None, ))
+    def search_vectors_in_files(self, collection_name: str, file_ids: List,
+                                query_records: List, top_k: int,
+                                search_params: Dict = None,
+                                timeout: int = None,
+                                **kwargs):
+        """
+        Search the segments named in `file_ids`, see `show_collection_info`
+        """
+        numbers = [int(file_id) for file_id in file_ids]
+        return self._search(collection_name, top_k, query_records, numbers,
+                            search_params)
+
+    @handle_error()
+    def delete_by_id(self,
+                     collection_name: str,
+                     id_array: List,
+                     timeout: int = None):
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name)
+
+            collection.delete(np.asarray(id_array, dtype=np.int64).reshape(-1))
+            collection.save(arrays=False)
+        return Status()
+
+    @handle_error()
+    def flush(self, collection_name_array: List, timeout: int = None):
+        """
+        Write the memory-mapped files of the collections to disk
+        """
+        with self._lock:
+            for collection_name in collection_name_array:
+                collection = self._get(collection_name)
+                if collection is None:
+                    return _not_found(collection_name)
+                collection.save()
+        return Status()
+
+    @handle_error()
+    def compact(self, collection_name, timeout: int = None):
+        with self._lock:
+            collection = self._get(collection_name)
+            if collection is None:
+                return _not_found(collection_name)
+
+            collection.compact()
+            collection.save()
+        return Status()
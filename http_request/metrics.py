@@ -0,0 +1,338 @@
+"""
+Distances of every MetricType between batches of vectors
+
+Float metrics work on float32 matrices, binary metrics on uint8 matrices of
+packed bits, 8 dimensions per byte. Distances follow the server: squared L2,
+inner products (the higher the closer), Hamming bit counts, Jaccard and
+Tanimoto distances, and for SUBSTRUCTURE and SUPERSTRUCTURE the Jaccard
+distance of the rows which match, inf for the others.
+
+Set bits are counted with a lookup table of 16-bit words. Work is tiled
+over queries and vectors so the intermediate matrices stay within
+`max_bytes`, and top k selection uses argpartition per tile.
+"""
+import numpy as np
+
+from .constants import MetricType
+
+BINARY_METRICS = (MetricType.HAMMING, MetricType.JACCARD, MetricType.TANIMOTO,
+                  MetricType.SUBSTRUCTURE, MetricType.SUPERSTRUCTURE)
+FLOAT_METRICS = (MetricType.L2, MetricType.IP)
+
+# Bytes of the intermediate matrices of one tile
+MAX_BYTES = 32 << 20
+# Queries scored at a time
+QUERY_BLOCK = 1024
+
+# Set bits of every 8 and 16-bit value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)],
+                    dtype=np.uint8)
+_POPCOUNT16 = (POPCOUNT[np.arange(1 << 16) & 0xFF] +
+               POPCOUNT[np.arange(1 << 16) >> 8]).astype(np.uint8)
+_BYTE_SUM = np.uint64(0x0101010101010101)
+
+
+def is_binary(metric_type):
+    return metric_type in BINARY_METRICS
+
+
+def _words(array):
+    """
+    Packed bits as uint16 words, rows zero-padded to a multiple of 16 bytes
+    which leaves the counts of set bits unchanged
+    """
+    array = np.ascontiguousarray(array, dtype=np.uint8)
+    padding = -array.shape[-1] % 16
+    if padding:
+        array = np.pad(array, ((0, 0), (0, padding)))
+    return array.view(np.uint16)
+
+
+def _sum_counts(counts):
+    """
+    Sum the last axis of 16-bit set bit counts, a multiple of 8 long
+
+    Eight counts of at most 16 add up within one byte, so they are summed
+    by a multiplication of their uint64 view instead of a reduction over a
+    short axis.
+    """
+    sums = counts.view(np.uint64) * _BYTE_SUM
+    sums >>= np.uint64(56)
+    return sums.sum(axis=-1, dtype=np.int32)
+
+
+def bit_counts(vectors):
+    """
+    Set bits of every row of packed bits
+    """
+    return _sum_counts(_POPCOUNT16[_words(vectors)])
+
+
+def _pair_counts(operation, queries, vectors):
+    """
+    (queries, vectors) set bits of `operation` applied to every pair
+    """
+    return _sum_counts(_POPCOUNT16[operation(
+        _words(queries)[:, None, :],
+        _words(vectors)[None, :, :])])
+
+
+def scores(metric_type, queries, vectors, query_bits=None,
+           vector_bits=None, vector_norms=None):
+    """
+    (queries, vectors) distances turned so the lower is always the closer:
+    inner products are negated and rows not matching a structure query are
+    inf
+
+    Binary metrics expand a (queries, vectors, width) matrix, keep the
+    blocks small or use `top_k`. Bit counts and squared norms of the
+    vectors may be given when they are reused across calls.
+    """
+    metric_type = MetricType(metric_type)
+    if metric_type == MetricType.L2:
+        products = queries @ vectors.T
+        products *= -2
+        products += np.einsum('ij,ij->i', queries, queries)[:, None]
+        if vector_norms is None:
+            vector_norms = np.einsum('ij,ij->i', vectors, vectors)
+        products += vector_norms[None, :]
+        return np.maximum(products, 0, out=products)
+
+    if metric_type == MetricType.IP:
+        products = queries @ vectors.T
+        return np.negative(products, out=products)
+
+    if metric_type == MetricType.HAMMING:
+        return _pair_counts(np.bitwise_xor, queries,
+                            vectors).astype(np.float32)
+
+    both = _pair_counts(np.bitwise_and, queries, vectors)
+    if query_bits is None:
+        query_bits = bit_counts(queries)
+    if vector_bits is None:
+        vector_bits = bit_counts(vectors)
+    union = query_bits[:, None] + vector_bits[None, :] - both
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(union > 0, both / np.maximum(union, 1), 1.0)
+        if metric_type == MetricType.TANIMOTO:
+            return (0.0 - np.log2(similarity)).astype(np.float32)
+
+    result = (1.0 - similarity).astype(np.float32)
+    if metric_type == MetricType.SUBSTRUCTURE:
+        result[both != query_bits[:, None]] = np.inf
+    elif metric_type == MetricType.SUPERSTRUCTURE:
+        result[both != vector_bits[None, :]] = np.inf
+    return result
+
+
+def to_distances(metric_type, values):
+    """
+    Distances in the server's convention of `scores` values
+    """
+    return -values if metric_type == MetricType.IP else values
+
+
+def _vector_block(metric_type, queries: int, width: int, max_bytes: int):
+    """
+    Vectors per tile so that a tile of `queries` stays within `max_bytes`
+    """
+    # binary pairs hold their padded words, word counts and sums
+    per_pair = 2 * (width - width % -16) + 8 if is_binary(
+        metric_type) else 8
+    return max(1, max_bytes // max(1, queries * per_pair))
+
+
+def distances(metric_type, queries, vectors, max_bytes: int = MAX_BYTES):
+    """
+    (queries, vectors) distances, in the server's convention
+
+    :type  queries: numpy.ndarray
+    :param queries: float32 rows, or uint8 rows of packed bits
+
+    :type  vectors: numpy.ndarray
+    :param vectors: rows of the same type and width
+    """
+    metric_type = MetricType(metric_type)
+    queries, vectors = _prepare(metric_type, queries, vectors)
+    result = np.empty((len(queries), len(vectors)), dtype=np.float32)
+    if not len(queries) or not len(vectors):
+        return result
+
+    query_bits = vector_bits = vector_norms = None
+    if is_binary(metric_type):
+        vector_bits = bit_counts(vectors)
+    elif metric_type == MetricType.L2:
+        vector_norms = np.einsum('ij,ij->i', vectors, vectors)
+    for query_start in range(0, len(queries), QUERY_BLOCK):
+        tile = queries[query_start:query_start + QUERY_BLOCK]
+        if is_binary(metric_type):
+            query_bits = bit_counts(tile)
+        block = _vector_block(metric_type, len(tile), vectors.shape[1],
+                              max_bytes)
+        for start in range(0, len(vectors), block):
+            end = min(len(vectors), start + block)
+            result[query_start:query_start + len(tile), start:end] = \
+                to_distances(metric_type, scores(
+                    metric_type, tile, vectors[start:end], query_bits,
+                    None if vector_bits is None else vector_bits[start:end],
+                    None if vector_norms is None else
+                    vector_norms[start:end]))
+    return result
+
+
+def merge_top_k(best_scores, best_rows, new_scores, rows, k: int):
+    """
+    Keep the k lowest scores of the current best and a new block, unsorted
+
+    :type  rows: numpy.ndarray
+    :param rows: 1-d rows of the block columns, shared by every query, or
+        2-d rows per query
+    """
+    merged = np.concatenate((best_scores, new_scores), axis=1)
+    if rows.ndim == 1:
+        rows = np.broadcast_to(rows, (len(merged), len(rows)))
+    merged_rows = np.concatenate((best_rows, rows), axis=1)
+    if merged.shape[1] > k:
+        pick = np.argpartition(merged, k - 1, axis=1)[:, :k]
+        merged = np.take_along_axis(merged, pick, axis=1)
+        merged_rows = np.take_along_axis(merged_rows, pick, axis=1)
+    return merged, merged_rows
+
+
+def sort_top_k(best_scores, best_rows):
+    """
+    Sort the rows of a top k by score, rows with no hit become -1
+    """
+    order = np.argsort(best_scores, axis=1, kind="stable")
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_rows = np.take_along_axis(best_rows, order, axis=1)
+    best_rows = np.where(np.isfinite(best_scores), best_rows, -1)
+    return best_scores, best_rows
+
+
+def top_k(metric_type,
+          queries,
+          vectors,
+          k: int,
+          live=None,
+          max_bytes: int = MAX_BYTES):
+    """
+    Exact k closest vectors of every query, scored tile by tile
+
+    :type  live: numpy.ndarray
+    :param live: flags of the vectors which may be returned, all by default
+
+    :return: (queries, k) distances in the server's convention and the
+        vector rows, sorted closest first and padded with inf and -1
+    """
+    metric_type = MetricType(metric_type)
+    queries, vectors = _prepare(metric_type, queries, vectors)
+    best_scores = np.full((len(queries), k), np.inf, dtype=np.float32)
+    best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+
+    for query_start in range(0, len(queries), QUERY_BLOCK):
+        query_end = min(len(queries), query_start + QUERY_BLOCK)
+        tile = queries[query_start:query_end]
+        query_bits = bit_counts(tile) if is_binary(metric_type) else None
+        block = max(
+            k, _vector_block(metric_type, len(tile), vectors.shape[1],
+                             max_bytes))
+        tile_scores = best_scores[query_start:query_end]
+        tile_rows = best_rows[query_start:query_end]
+        for start in range(0, len(vectors), block):
+            end = min(len(vectors), start + block)
+            rows = np.arange(start, end, dtype=np.int64)
+            block_vectors = vectors[start:end]
+            if live is not None:
+                keep = live[start:end]
+                if not keep.any():
+                    continue
+                if not keep.all():
+                    rows = rows[keep]
+                    block_vectors = block_vectors[keep]
+
+            tile_scores, tile_rows = merge_top_k(
+                tile_scores, tile_rows,
+                scores(metric_type, tile, block_vectors, query_bits), rows,
+                k)
+        best_scores[query_start:query_end] = tile_scores
+        best_rows[query_start:query_end] = tile_rows
+
+    best_scores, best_rows = sort_top_k(best_scores, best_rows)
+    return to_distances(metric_type, best_scores), best_rows
+
+
+def _candidate_block(metric_type, queries, vectors, rows):
+    """
+    Scores of one tile of `candidate_scores`
+    """
+    gathered = vectors[rows]
+    if metric_type == MetricType.L2:
+        gathered -= queries[:, None, :]
+        return np.einsum('ijk,ijk->ij', gathered, gathered)
+
+    if metric_type == MetricType.IP:
+        return -np.einsum('ijk,ik->ij', gathered, queries)
+
+    query_words = _words(queries)[:, None, :]
+    words = _words(gathered.reshape(-1, gathered.shape[2])).reshape(
+        len(rows), rows.shape[1], -1)
+    if metric_type == MetricType.HAMMING:
+        return _sum_counts(_POPCOUNT16[words ^ query_words]).astype(
+            np.float32)
+
+    both = _sum_counts(_POPCOUNT16[words & query_words])
+    query_bits = bit_counts(queries)[:, None]
+    vector_bits = _sum_counts(_POPCOUNT16[words])
+    union = query_bits + vector_bits - both
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(union > 0, both / np.maximum(union, 1), 1.0)
+        if metric_type == MetricType.TANIMOTO:
+            return (0.0 - np.log2(similarity)).astype(np.float32)
+
+    result = (1.0 - similarity).astype(np.float32)
+    if metric_type == MetricType.SUBSTRUCTURE:
+        result[both != query_bits] = np.inf
+    elif metric_type == MetricType.SUPERSTRUCTURE:
+        result[both != vector_bits] = np.inf
+    return result
+
+
+def candidate_scores(metric_type,
+                     queries,
+                     vectors,
+                     rows,
+                     max_bytes: int = MAX_BYTES):
+    """
+    Scores, the lower the closer, of every query against its own candidate
+    vectors only
+
+    :type  rows: numpy.ndarray
+    :param rows: (queries, candidates) rows of `vectors`, -1 for no
+        candidate which scores inf
+
+    :return: (queries, candidates) float32 scores, see `scores`
+    """
+    metric_type = MetricType(metric_type)
+    queries, vectors = _prepare(metric_type, queries, vectors)
+    rows = np.asarray(rows, dtype=np.int64)
+    result = np.full(rows.shape, np.inf, dtype=np.float32)
+    if not rows.size or not len(vectors):
+        return result
+
+    per_query = rows.shape[1] * (vectors.shape[1] * vectors.itemsize * 3 + 8)
+    block = max(1, max_bytes // max(1, per_query))
+    for start in range(0, len(queries), block):
+        tile_rows = rows[start:start + block]
+        tile = _candidate_block(metric_type, queries[start:start + block],
+                                vectors, np.maximum(tile_rows, 0))
+        result[start:start + block] = np.where(tile_rows >= 0, tile, np.inf)
+    return result
+
+
+def _prepare(metric_type, queries, vectors):
+    if is_binary(metric_type):
+        return (np.ascontiguousarray(queries, dtype=np.uint8),
+                np.ascontiguousarray(vectors, dtype=np.uint8))
+    return (np.ascontiguousarray(queries, dtype=np.float32),
+            np.ascontiguousarray(vectors, dtype=np.float32))
@@ -0,0 +1,239 @@
+import logging
+import time
+from typing import List, Dict
+
+import numpy as np
+
+from .abstracts import TopKQueryResult
+from .constants import Status
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Largest top k the server accepts
+MAX_CANDIDATES = 16384
+
+
+def as_matrix(records, binary: bool):
+    """
+    Records as a float32 matrix, or a uint8 matrix of packed bits
+    """
+    if binary and isinstance(records, list) and records and isinstance(
+            records[0], bytes):
+        return np.frombuffer(b"".join(records), dtype=np.uint8).reshape(
+            len(records), -1)
+    return np.asarray(records, dtype=np.uint8 if binary else np.float32)
+
+
+def fetch_vectors(handler,
+                  collection_name: str,
+                  ids,
+                  binary: bool,
+                  width: int,
+                  cache=None,
+                  chunk_size: int = 1000,
+                  timeout: int = None):
+    """
+    Vectors of ids as one matrix, read from `cache` first and fetched from
+    the handler in chunks of `chunk_size` ids otherwise
+
+    :type  width: int
+    :param width: floats per vector, or bytes per binary vector
+
+    :type  cache: VectorCache
+    :param cache: any object with `get(collection_name, ids)` returning
+        (matrix, found flags) and `put(collection_name, ids, matrix)`, its
+        `generation` being passed to `put` when it has one, see VectorCache
+
+    :returns:
+        Status: indicate if operation is successful
+        vectors: (ids, width) numpy.ndarray
+        found: numpy.ndarray of the flags of the ids which have a vector
+        cached: numpy.ndarray of the flags of the ids read from the cache
+    """
+    ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+    vectors = np.zeros((len(ids), width),
+                       dtype=np.uint8 if binary else np.float32)
+    found = np.zeros(len(ids), dtype=bool)
+    generation = getattr(cache, "generation", None)
+    put_kwargs = {} if generation is None else {
+        "generation": generation(collection_name)
+    }
+    if cache is not None and len(ids):
+        hit_vectors, hit = cache.get(collection_name, ids)
+        if hit.any():
+            vectors[hit] = hit_vectors[hit]
+            found |= hit
+    cached = found.copy()
+
+    missing = np.flatnonzero(~found)
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        status, fetched = handler.get_vectors_by_ids(collection_name,
+                                                     ids[chunk].tolist(),
+                                                     timeout)
+        if not status.ok():
+            return status, vectors, found, cached
+
+        present = np.array([len(vector) > 0 for vector in fetched],
+                           dtype=bool)
+        rows = [vector for vector in fetched if len(vector) > 0]
+        if rows:
+            vectors[chunk[present]] = as_matrix(rows, binary)
+            found[chunk[present]] = True
+            if cache is not None:
+                cache.put(collection_name, ids[chunk[present]],
+                          vectors[chunk[present]], **put_kwargs)
+    return Status(), vectors, found, cached
+
+
+def _overlap(first, second):
+    """
+    Mean fraction of the ids of each row of `second` found in the same row
+    of `first`, -1 being no id
+    """
+    shared = 0
+    total = 0
+    for start in range(0, len(first), 256):
+        a = first[start:start + 256]
+        b = second[start:start + 256]
+        matches = (b[:, :, None] == a[:, None, :]).any(axis=2) & (b >= 0)
+        shared += int(matches.sum())
+        total += int((b >= 0).sum())
+    return shared / total if total else 1.0
+
+
+class RerankReport:
+    """
+    Cost and effect of a re-ranking
+
+    :attribute approximate_recall: fraction of the re-ranked top k which the
+        approximate top k already held, the re-ranked top k being exact
+        within the candidates
+
+    :attribute added_seconds: time spent fetching and re-scoring on top of
+        the search
+    """
+    def __init__(self, queries: int, top_k: int, candidates: int):
+        self.queries = queries
+        self.top_k = top_k
+        self.candidates = candidates
+        self.search_seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.rerank_seconds = 0.0
+        self.cache_hits = 0
+        self.fetched = 0
+        self.missing = 0
+        self.approximate_recall = None
+
+    @property
+    def added_seconds(self):
+        return self.fetch_seconds + self.rerank_seconds
+
+    @property
+    def recall_gain(self):
+        """
+        Fraction of the returned hits which re-ranking brought in
+        """
+        if self.approximate_recall is None:
+            return None
+        return 1.0 - self.approximate_recall
+
+    def __repr__(self):
+        return ('%s(queries=%r, top_k=%r, candidates=%r, '
+                'search_seconds=%.4f, added_seconds=%.4f, cache_hits=%r, '
+                'fetched=%r, missing=%r, approximate_recall=%r)' %
+                (self.__class__.__name__, self.queries, self.top_k,
+                 self.candidates, self.search_seconds, self.added_seconds,
+                 self.cache_hits, self.fetched, self.missing,
+                 self.approximate_recall))
+
+
+def search_and_rerank(handler,
+                      collection_name: str,
+                      top_k: int,
+                      query_records,
+                      candidates: int = None,
+                      partition_tags: List = None,
+                      search_params: Dict = None,
+                      cache=None,
+                      chunk_size: int = 1000,
+                      timeout: int = None,
+                      **kwargs):
+    """
+    Search `candidates` hits per query, re-score them exactly with the
+    original vectors and the metric of the collection, and keep the top k
+
+    Quantized indexes such as IVF_SQ8 or IVF_PQ return approximate
+    distances; re-ranking a few times more candidates than needed corrects
+    most of their ordering errors.
+
+    :type  candidates: int
+    :param candidates: hits searched per query, 4 times `top_k` by default
+
+    :type  cache: VectorCache
+    :param cache: vectors read before fetching, see `fetch_vectors`
+
+    :returns:
+        Status: indicate if query is successful
+        query_results: TopKQueryResult of the exact distances
+        report: RerankReport
+    """
+    candidates = min(MAX_CANDIDATES, max(top_k, candidates or 4 * top_k))
+    report = RerankReport(len(query_records), top_k, candidates)
+
+    status, schema = handler.describe_collection(collection_name, timeout)
+    if not status.ok():
+        return status, None, report
+
+    metric = schema.metric_type
+    binary = metrics.is_binary(metric)
+    start = time.monotonic()
+    status, results = handler.search_vectors(collection_name,
+                                             candidates,
+                                             query_records,
+                                             partition_tags=partition_tags,
+                                             search_params=search_params,
+                                             timeout=timeout,
+                                             **kwargs)
+    report.search_seconds = time.monotonic() - start
+    if not status.ok():
+        return status, None, report
+
+    found_ids = results.id_array
+    start = time.monotonic()
+    unique_ids = np.unique(found_ids[found_ids >= 0])
+    queries = as_matrix(query_records, binary)
+    width = schema.dimension // 8 if binary else schema.dimension
+    status, vectors, found, cached = fetch_vectors(handler,
+                                                   collection_name,
+                                                   unique_ids,
+                                                   binary,
+                                                   width,
+                                                   cache=cache,
+                                                   chunk_size=chunk_size,
+                                                   timeout=timeout)
+    report.fetch_seconds = time.monotonic() - start
+    if not status.ok():
+        return status, None, report
+    report.cache_hits = int(cached.sum())
+    report.fetched = len(unique_ids) - report.cache_hits
+    report.missing = int((~found).sum())
+
+    start = time.monotonic()
+    # candidates deleted since the search have no vector and score inf
+    rows = np.searchsorted(unique_ids, found_ids)
+    rows = np.where(found_ids >= 0, rows, -1)
+    rows[rows >= 0] = np.where(found[rows[rows >= 0]], rows[rows >= 0], -1)
+    scores = metrics.candidate_scores(metric, queries, vectors, rows)
+    best_scores, best_rows = metrics.merge_top_k(
+        np.empty((len(rows), 0), dtype=np.float32),
+        np.empty((len(rows), 0), dtype=np.int64), scores, rows, top_k)
+    best_scores, best_rows = metrics.sort_top_k(best_scores, best_rows)
+    reranked = np.where(best_rows >= 0, unique_ids[np.maximum(best_rows, 0)],
+                        -1)
+    distances = metrics.to_distances(metric, best_scores)
+    report.rerank_seconds = time.monotonic() - start
+    report.approximate_recall = _overlap(found_ids[:, :top_k], reranked)
+    logger.debug("Rerank of {}: {}".format(collection_name, report))
+    return Status(), TopKQueryResult.from_arrays(reranked, distances), report
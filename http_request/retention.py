@@ -0,0 +1,314 @@
+import datetime
+import logging
+import threading
+from typing import List
+
+from .constants import MetricType
+from .metrics import BINARY_METRICS
+from .time_partition import parse_bucket_tag, bucket_end
+
+logger = logging.getLogger(__name__)
+
+# Index names of segments holding raw vectors only
+RAW_INDEX_NAMES = ("IDMAP", "BIN_IDMAP", "FLAT", "INVALID")
+
+
+class RetentionPolicy:
+    """
+    Retention rules of a collection
+
+    :type  max_age_days: int
+    :param max_age_days: time bucket partitions ending more than this many
+        days ago are dropped, None keeps every partition
+
+    :type  compact_threshold: float
+    :param compact_threshold: compact once the estimated deleted ratio of the
+        collection passes this value, after partitions were dropped or rows
+        deleted
+
+    :type  keep_tags: list[str]
+    :param keep_tags: partition tags which are never dropped
+    """
+    def __init__(self,
+                 max_age_days: int = None,
+                 compact_threshold: float = 0.2,
+                 keep_tags: List = ("_default", )):
+        self.max_age_days = max_age_days
+        self.compact_threshold = compact_threshold
+        self.keep_tags = set(keep_tags)
+
+    def is_expired(self, tag: str, today: datetime.date):
+        if self.max_age_days is None or tag in self.keep_tags:
+            return False
+
+        bucket = parse_bucket_tag(tag)
+        if bucket is None:
+            return False
+
+        granularity, start = bucket
+        age = (today - bucket_end(start, granularity)).days
+        return age > self.max_age_days
+
+    def __repr__(self):
+        attr_list = [
+            '%s=%r' % (key, value) for key, value in self.__dict__.items()
+        ]
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(attr_list))
+
+
+class RetentionReport:
+    """
+    What a retention pass dropped or would drop on a collection
+
+    :attribute expired: list of (partition tag, vector count)
+
+    :attribute dropped: tags of the partitions dropped
+
+    :attribute deleted_ratio: estimated deleted ratio before compaction
+    """
+    def __init__(self, collection_name: str, dry_run: bool):
+        self.collection_name = collection_name
+        self.dry_run = dry_run
+        self.expired = []
+        self.dropped = []
+        self.deleted_rows = 0
+        self.deleted_ratio = 0.0
+        self.compact = False
+        self.errors = []
+
+    @property
+    def reclaimed_vectors(self):
+        return sum(count for _, count in self.expired)
+
+    def __repr__(self):
+        return ('%s(collection_name=%r, dry_run=%r, expired=%r, '
+                'reclaimed_vectors=%r, deleted_rows=%r, deleted_ratio=%.3f, '
+                'compact=%r, errors=%r)' %
+                (self.__class__.__name__, self.collection_name, self.dry_run,
+                 self.expired, self.reclaimed_vectors, self.deleted_rows,
+                 self.deleted_ratio, self.compact, self.errors))
+
+
+def row_size(dimension: int, metric_type: MetricType):
+    """
+    Bytes stored per vector, id included
+    """
+    if metric_type in BINARY_METRICS:
+        return dimension // 8 + 8
+
+    return dimension * 4 + 8
+
+
+def stored_rows(stats: dict, size: int):
+    """
+    Estimate the rows stored and the live rows of the segments of a
+    collection from `show_collection_info`
+
+    Deleted vectors stay in segment files until compaction, so the rows
+    stored on disk exceed the live `count` of a segment. Only the raw data
+    is counted: an index file size reported as `index_size` is taken off
+    `data_size`, and segments of another index without it are left out,
+    their `data_size` mixing in the index files.
+
+    :return: (stored rows, live rows)
+    """
+    stored = 0.0
+    live = 0
+    for partition in stats.get("partitions", []):
+        for segment in partition.get("segments", None) or []:
+            data_size = segment.get("data_size", 0)
+            if "index_size" in segment:
+                data_size -= segment["index_size"]
+            elif segment.get("index_name", "IDMAP") not in RAW_INDEX_NAMES:
+                continue
+            stored += data_size / size if size else 0
+            live += segment.get("count", 0)
+    return stored, live
+
+
+def deleted_ratio(stats: dict, size: int):
+    """
+    Estimate the deleted ratio of a collection, see `stored_rows`
+    """
+    stored, live = stored_rows(stats, size)
+    if stored <= 0:
+        return 0.0
+
+    return max(0.0, 1.0 - live / stored)
+
+
+class RetentionManager:
+    """
+    Drop expired partitions and compact collections
+
+    A collection is compacted when its deleted ratio passes the threshold
+    and the pass dropped some of its partitions, the server finished the
+    last compaction, or more rows were deleted since the manager started
+    it; a compaction still in progress on the server is not started again.
+
+    :type  handler: MilvusAbstract
+    :param handler: client handler
+
+    :type  collections: list[str]
+    :param collections: collections managed by the policy
+
+    :type  policy: RetentionPolicy
+    :param policy: retention rules
+
+    :type  interval: float
+    :param interval: seconds between two passes of the background thread
+    """
+    def __init__(self,
+                 handler,
+                 collections: List,
+                 policy: RetentionPolicy,
+                 interval: float = 3600,
+                 timeout: int = 30,
+                 page_size: int = 100):
+        self._handler = handler
+        self._collections = list(collections)
+        self._policy = policy
+        self._interval = interval
+        self._timeout = timeout
+        self._page_size = page_size
+        self._stop = threading.Event()
+        self._thread = None
+        # (stored rows, deleted rows) of every collection when it was last
+        # compacted
+        self._compacted = dict()
+
+    def _partition_tags(self, collection_name: str):
+        tags = []
+        offset = 0
+        while True:
+            status, partitions = self._handler.show_partitions(
+                collection_name=collection_name,
+                timeout=self._timeout,
+                offset=offset,
+                page_size=self._page_size)
+            if not status.ok():
+                return status, tags
+
+            tags.extend(partition.tag for partition in partitions)
+            if len(partitions) < self._page_size:
+                return status, tags
+            offset += self._page_size
+
+    def apply(self, collection_name: str, dry_run: bool = False,
+              today: datetime.date = None):
+        """
+        Run the policy on one collection
+
+        :return: RetentionReport
+        """
+        today = today or datetime.date.today()
+        report = RetentionReport(collection_name, dry_run)
+
+        status, tags = self._partition_tags(collection_name)
+        if not status.ok():
+            report.errors.append(status)
+            return report
+
+        status, stats = self._handler.show_collection_info(
+            collection_name=collection_name, timeout=self._timeout)
+        if not status.ok():
+            report.errors.append(status)
+            return report
+
+        counts = {
+            partition.get("tag"): partition.get("count", 0)
+            for partition in stats.get("partitions", [])
+        }
+        for tag in tags:
+            if not self._policy.is_expired(tag, today):
+                continue
+
+            report.expired.append((tag, counts.get(tag, 0)))
+            if dry_run:
+                continue
+
+            status = self._handler.drop_partition(
+                collection_name=collection_name,
+                partition_tag=tag,
+                timeout=self._timeout)
+            if status.ok():
+                report.dropped.append(tag)
+            else:
+                report.errors.append(status)
+
+        if report.dropped:
+            # the dropped partitions took their deleted rows with them
+            status, stats = self._handler.show_collection_info(
+                collection_name=collection_name, timeout=self._timeout)
+            if not status.ok():
+                report.errors.append(status)
+                return report
+
+        status, schema = self._handler.describe_collection(
+            collection_name, self._timeout)
+        if not status.ok():
+            report.errors.append(status)
+            return report
+
+        size = row_size(schema.dimension, schema.metric_type)
+        stored, live = stored_rows(stats, size)
+        report.deleted_rows = max(0, int(round(stored - live)))
+        report.deleted_ratio = deleted_ratio(stats, size)
+        # a compaction is pending until the stored rows shrink, unless rows
+        # were deleted since it was started
+        compacted = self._compacted.get(collection_name, None)
+        deleted = compacted is None or stored < compacted[0] or \
+            report.deleted_rows > compacted[1]
+        report.compact = report.deleted_ratio > \
+            self._policy.compact_threshold and (bool(report.dropped)
+                                                or deleted)
+        if report.compact and not dry_run:
+            status = self._handler.compact(collection_name)
+            if status.ok():
+                self._compacted[collection_name] = (stored,
+                                                    report.deleted_rows)
+            else:
+                report.errors.append(status)
+
+        return report
+
+    def run_once(self, dry_run: bool = False):
+        """
+        Run the policy on every managed collection
+
+        :return: list[RetentionReport]
+        """
+        reports = []
+        for collection_name in self._collections:
+            report = self.apply(collection_name, dry_run=dry_run)
+            logger.info("Retention {}".format(report))
+            reports.append(report)
+
+        return reports
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as ex:
+                logger.error("Retention pass failed: {}".format(str(ex)))
+            self._stop.wait(self._interval)
+
+    def start(self):
+        """
+        Run the policy periodically on a daemon thread
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name="milvus-retention",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
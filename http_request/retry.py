@@ -0,0 +1,174 @@
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+class RetryableResponseError(requests.exceptions.RequestException):
+    """
+    Server answered with a status worth retrying, e.g. 503
+    """
+    def __init__(self, response):
+        super().__init__("Status code : {}, reason : {}".format(
+            response.status_code, response.reason),
+                         response=response)
+        self.retry_after = parse_retry_after(
+            response.headers.get("Retry-After", None))
+
+
+RETRYABLE_ERRORS = (requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError,
+                    RetryableResponseError)
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a `Retry-After` header, delay-seconds or HTTP-date
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+
+    return max(0.0, date.timestamp() - time.time())
+
+
+class RetryBudget:
+    """
+    Cap retries to a ratio of the calls, so an outage can't turn every
+    call into `max_attempts` requests
+
+    Every call deposits `ratio` token, every retry withdraws one. A floor
+    of `min_per_second` retries keeps low traffic clients retrying.
+    """
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 10,
+                 max_tokens: float = 100):
+        self._ratio = ratio
+        self._min_per_second = min_per_second
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self._max_tokens,
+            self._tokens + (now - self._last) * self._min_per_second)
+        self._last = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+    def withdraw(self):
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter
+
+    :type  max_attempts: int
+    :param max_attempts: attempts per call, the first one included
+
+    :type  base_delay: float
+    :param base_delay: seconds, upper bound of the first backoff
+
+    :type  max_delay: float
+    :param max_delay: seconds, upper bound of any backoff
+
+    :type  max_retry_after: float
+    :param max_retry_after: longest `Retry-After` honoured, longer ones fail
+
+    :type  budget: RetryBudget
+    :param budget: shared retry budget, None for no budget
+    """
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 0.05,
+                 max_delay: float = 2.0,
+                 multiplier: float = 2.0,
+                 max_retry_after: float = 30.0,
+                 retry_status_codes=RETRY_STATUS_CODES,
+                 budget: RetryBudget = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.max_retry_after = max_retry_after
+        self.retry_status_codes = tuple(retry_status_codes)
+        self.budget = budget
+
+    def is_retryable_status(self, status_code: int):
+        return status_code in self.retry_status_codes
+
+    def backoff(self, attempt: int, error: Exception = None):
+        """
+        Seconds to wait before retry number `attempt`, starting at 1,
+        None when the `Retry-After` of the server is too long
+        """
+        ceiling = min(self.max_delay,
+                      self.base_delay * self.multiplier**(attempt - 1))
+        delay = random.uniform(0, ceiling)
+
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+
+        return delay
+
+    def next_delay(self, attempt: int, error: Exception, idempotent: bool):
+        """
+        Seconds to wait before retry number `attempt`, None for no retry
+        """
+        if not idempotent or attempt >= self.max_attempts:
+            return None
+        if not isinstance(error, RETRYABLE_ERRORS):
+            return None
+
+        delay = self.backoff(attempt, error)
+        if delay is None:
+            return None
+        if self.budget is not None and not self.budget.withdraw():
+            return None
+
+        return delay
+
+    def __repr__(self):
+        attr_list = [
+            '%s=%r' % (key, value) for key, value in self.__dict__.items()
+        ]
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(attr_list))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
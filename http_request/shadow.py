@@ -0,0 +1,273 @@
+import collections
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def jaccard(first_ids, second_ids):
+    """
+    Jaccard index of the id sets of every row of two top k, -1 being no id;
+    two empty rows are identical
+    """
+    result = []
+    for first, second in zip(first_ids, second_ids):
+        first = set(int(id_) for id_ in first if id_ >= 0)
+        second = set(int(id_) for id_ in second if id_ >= 0)
+        union = len(first | second)
+        result.append(len(first & second) / union if union else 1.0)
+    return result
+
+
+class ShadowSample:
+    """
+    One search mirrored to a candidate collection
+
+    :attribute overlaps: Jaccard index of the primary and candidate hits of
+        every query, None when the candidate search failed
+    """
+    def __init__(self, collection_name: str, candidate: str, queries: int,
+                 top_k: int, primary_seconds: float, shadow_seconds: float,
+                 overlaps=None, error: str = None):
+        self.collection_name = collection_name
+        self.candidate = candidate
+        self.queries = queries
+        self.top_k = top_k
+        self.primary_seconds = primary_seconds
+        self.shadow_seconds = shadow_seconds
+        self.overlaps = overlaps
+        self.error = error
+        self.created = time.time()
+
+    @property
+    def delta(self):
+        """
+        Seconds the candidate took more than the primary
+        """
+        return self.shadow_seconds - self.primary_seconds
+
+    def to_dict(self):
+        return {
+            "collection_name": self.collection_name,
+            "candidate": self.candidate,
+            "queries": self.queries,
+            "top_k": self.top_k,
+            "primary_seconds": self.primary_seconds,
+            "shadow_seconds": self.shadow_seconds,
+            "delta": self.delta,
+            "overlaps": self.overlaps,
+            "error": self.error,
+            "created": self.created,
+        }
+
+    def __repr__(self):
+        return ('%s(collection_name=%r, candidate=%r, queries=%r, '
+                'delta=%.4f, error=%r)' %
+                (self.__class__.__name__, self.collection_name,
+                 self.candidate, self.queries, self.delta, self.error))
+
+
+class ShadowReport:
+    """
+    Last `max_samples` mirrored searches, summarized per primary and
+    candidate collection pair
+    """
+    def __init__(self, max_samples: int = 10000):
+        self._samples = collections.deque(maxlen=max_samples)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, sample: ShadowSample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    @property
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.dropped = 0
+
+    def summary(self):
+        """
+        Per "primary -> candidate": calls, queries, errors, mean Jaccard
+        overlap of the hits and percentiles of the latency deltas
+        """
+        groups = collections.defaultdict(list)
+        for sample in self.samples:
+            groups[(sample.collection_name, sample.candidate)].append(sample)
+
+        summary = dict()
+        for (primary, candidate), samples in groups.items():
+            done = [sample for sample in samples if sample.error is None]
+            overlaps = [
+                overlap for sample in done for overlap in sample.overlaps
+            ]
+            deltas = np.array([sample.delta for sample in done])
+            entry = {
+                "calls": len(samples),
+                "queries": sum(sample.queries for sample in samples),
+                "errors": len(samples) - len(done),
+                "mean_overlap": float(np.mean(overlaps)) if overlaps else None,
+                "min_overlap": float(np.min(overlaps)) if overlaps else None,
+                "mean_primary_seconds": float(
+                    np.mean([sample.primary_seconds for sample in done]))
+                if done else None,
+                "mean_shadow_seconds": float(
+                    np.mean([sample.shadow_seconds for sample in done]))
+                if done else None,
+            }
+            for percent in (50, 95, 99):
+                entry["delta_p{}".format(percent)] = float(
+                    np.percentile(deltas, percent)) if len(deltas) else None
+            summary["{} -> {}".format(primary, candidate)] = entry
+        return summary
+
+    def to_dict(self):
+        return {
+            "dropped": self.dropped,
+            "summary": self.summary(),
+            "samples": [sample.to_dict() for sample in self.samples],
+        }
+
+    def dump(self, path: str):
+        with open(path + ".tmp", mode='w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def __repr__(self):
+        with self._lock:
+            samples = len(self._samples)
+        return '%s(samples=%r, dropped=%r, summary=%r)' % (
+            self.__class__.__name__, samples, self.dropped, self.summary())
+
+
+class ShadowMirror:
+    """
+    Mirror of a sampled fraction of the searches of some collections to
+    candidate collections, e.g. the same data under another index
+
+    Mirrored searches run on a small worker pool once the primary search
+    returned; when `max_pending` of them are queued further ones are
+    dropped, so the primary path never waits on the candidate.
+
+    :type  targets: dict
+    :param targets: candidate collection of every primary collection
+
+    :type  fraction: float
+    :param fraction: share of the searches mirrored
+
+    :type  search_params: dict
+    :param search_params: search params of the candidate collection of
+        every primary collection, by default those the caller gave the
+        primary search, None letting the autotuner choose
+    """
+    def __init__(self,
+                 targets: Dict,
+                 fraction: float = 0.01,
+                 search_params: Dict = None,
+                 max_workers: int = 2,
+                 max_pending: int = 64,
+                 max_samples: int = 10000,
+                 timeout: int = 60,
+                 seed: int = None):
+        if not 0 <= fraction <= 1:
+            raise ValueError("fraction must be within [0, 1]")
+
+        self.targets = dict(targets)
+        self.fraction = fraction
+        self._search_params = search_params or {}
+        self._max_pending = max_pending
+        self._timeout = timeout
+        self._pending = 0
+        self._random = random.Random(seed)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="milvus-shadow")
+        self._lock = threading.Lock()
+        self.report = ShadowReport(max_samples)
+
+    def sampled(self, collection_name: str):
+        """
+        Whether a search of the collection is to be mirrored
+        """
+        if collection_name not in self.targets:
+            return False
+        with self._lock:
+            return self._random.random() < self.fraction
+
+    def mirror(self, handler, collection_name: str, top_k: int,
+               query_records, partition_tags, search_params,
+               primary_seconds: float, results):
+        """
+        Queue the search of the candidate collection, comparing its hits
+        with `results` of the primary one
+        """
+        with self._lock:
+            if self._pending >= self._max_pending:
+                self.report.drop()
+                return
+            self._pending += 1
+
+        candidate = self.targets[collection_name]
+        params = self._search_params.get(collection_name, search_params)
+        if isinstance(query_records, list):
+            query_records = list(query_records)
+        self._executor.submit(self._run, handler, collection_name, candidate,
+                              top_k, query_records, partition_tags, params,
+                              primary_seconds, results)
+
+    def _run(self, handler, collection_name, candidate, top_k, query_records,
+             partition_tags, params, primary_seconds, results):
+        queries = len(query_records)
+        try:
+            start = time.monotonic()
+            status, shadow_results = handler.search_vectors(
+                candidate,
+                top_k,
+                query_records,
+                partition_tags=partition_tags,
+                search_params=params,
+                timeout=self._timeout)
+            seconds = time.monotonic() - start
+            if status.ok():
+                overlaps = jaccard(results.id_array,
+                                   shadow_results.id_array)
+                sample = ShadowSample(collection_name, candidate, queries,
+                                      top_k, primary_seconds, seconds,
+                                      overlaps)
+            else:
+                sample = ShadowSample(collection_name, candidate, queries,
+                                      top_k, primary_seconds, seconds,
+                                      error=status.message)
+            self.report.record(sample)
+        except Exception as ex:
+            logger.debug("Shadow search of {} failed: {}".format(
+                candidate, ex))
+            self.report.record(
+                ShadowSample(collection_name, candidate, queries, top_k,
+                             primary_seconds, 0.0, error=str(ex)))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def __repr__(self):
+        return '%s(targets=%r, fraction=%r, report=%r)' % (
+            self.__class__.__name__, self.targets, self.fraction, self.report)
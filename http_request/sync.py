@@ -0,0 +1,214 @@
+import logging
+
+import numpy as np
+
+from milvus import ParamError
+from .bulk_insert import BulkInserter
+from .constants import Status
+
+logger = logging.getLogger(__name__)
+
+# Bitmaps are used while the id span is at most this many times the ids
+_BITMAP_FACTOR = 8
+
+
+def collection_ids(handler, collection_name: str, page_size: int = 100000,
+                   timeout: int = 60):
+    """
+    Sorted ids of a collection, paged segment by segment
+
+    :returns:
+        Status: indicate if operation is successful
+        ids: numpy.ndarray of int64
+    """
+    status, stats = handler.show_collection_info(collection_name, timeout)
+    if not status.ok():
+        return status, None
+
+    pages = []
+    for partition in stats.get("partitions", None) or []:
+        for segment in partition.get("segments", None) or []:
+            offset = 0
+            while True:
+                status, ids = handler.get_vector_ids(collection_name,
+                                                     segment["name"],
+                                                     timeout,
+                                                     offset=offset,
+                                                     page_size=page_size)
+                if not status.ok():
+                    return status, None
+
+                pages.append(np.asarray(ids, dtype=np.int64))
+                offset += len(ids)
+                if len(ids) < page_size:
+                    break
+
+    if not pages:
+        return Status(), np.empty(0, dtype=np.int64)
+    return Status(), np.unique(np.concatenate(pages))
+
+
+def contains(values, reference):
+    """
+    Whether each of the sorted unique `values` is in the sorted unique
+    `reference`, with a bitmap over dense id ranges and a binary search
+    otherwise
+    """
+    if not len(values) or not len(reference):
+        return np.zeros(len(values), dtype=bool)
+
+    low = min(values[0], reference[0])
+    span = int(max(values[-1], reference[-1]) - low) + 1
+    if span <= _BITMAP_FACTOR * (len(values) + len(reference)):
+        bitmap = np.zeros(span, dtype=bool)
+        bitmap[reference - low] = True
+        return bitmap[values - low]
+
+    index = np.searchsorted(reference, values)
+    index[index == len(reference)] = 0
+    return reference[index] == values
+
+
+class SyncPlan:
+    """
+    Rows to insert and ids to delete to make a collection match a source
+
+    :attribute new_rows: positions in the source of the rows missing from
+        the collection
+
+    :attribute removed_ids: ids of the collection missing from the source
+    """
+    def __init__(self, new_rows, removed_ids, unchanged: int):
+        self.new_rows = new_rows
+        self.removed_ids = removed_ids
+        self.unchanged = unchanged
+
+    def __repr__(self):
+        return '%s(new=%r, removed=%r, unchanged=%r)' % (
+            self.__class__.__name__, len(self.new_rows),
+            len(self.removed_ids), self.unchanged)
+
+
+def plan_sync(source_ids, target_ids):
+    """
+    Set differences between the ids of a source and of a collection
+
+    :type  source_ids: numpy.ndarray
+    :param source_ids: ids of the source rows, in row order
+
+    :type  target_ids: numpy.ndarray
+    :param target_ids: sorted unique ids of the collection
+
+    :return: SyncPlan
+    """
+    source_ids = np.asarray(source_ids, dtype=np.int64).reshape(-1)
+    target_ids = np.asarray(target_ids, dtype=np.int64).reshape(-1)
+    order = np.argsort(source_ids, kind="stable")
+    ordered = source_ids[order]
+    if len(ordered) > 1 and (ordered[1:] == ordered[:-1]).any():
+        raise ParamError("Source ids must be unique")
+
+    present = contains(ordered, target_ids)
+    kept = contains(target_ids, ordered)
+    return SyncPlan(new_rows=np.sort(order[~present]),
+                    removed_ids=target_ids[~kept],
+                    unchanged=int(present.sum()))
+
+
+class SyncReport:
+    """
+    Outcome of a sync
+    """
+    def __init__(self, collection_name: str, plan: SyncPlan,
+                 dry_run: bool):
+        self.collection_name = collection_name
+        self.plan = plan
+        self.dry_run = dry_run
+        self.inserted = 0
+        self.deleted = 0
+        self.errors = []
+
+    @property
+    def status(self):
+        return self.errors[0] if self.errors else Status()
+
+    def __repr__(self):
+        return ('%s(collection_name=%r, plan=%r, dry_run=%r, inserted=%r, '
+                'deleted=%r, errors=%r)' %
+                (self.__class__.__name__, self.collection_name, self.plan,
+                 self.dry_run, self.inserted, self.deleted, self.errors))
+
+
+def sync_collection(handler,
+                    collection_name: str,
+                    records,
+                    ids,
+                    partition_tag: str = None,
+                    delete_batch: int = 10000,
+                    insert_batch: int = 10000,
+                    page_size: int = 100000,
+                    dry_run: bool = False,
+                    flush: bool = True,
+                    timeout: int = 60,
+                    **kwargs):
+    """
+    Insert the source rows missing from a collection and delete the
+    collection ids missing from the source
+
+    Only the ids of the collection are read, and only the changed rows of
+    the source are touched, so a memory-mapped source costs little beyond
+    the size of the change.
+
+    :type  records: numpy.ndarray
+    :param records: source vectors, e.g. a memory-mapped array
+
+    :type  ids: numpy.ndarray
+    :param ids: unique ids of the source rows
+
+    :return: SyncReport
+    """
+    if not isinstance(records, np.ndarray):
+        records = np.asarray(records)
+    if len(records) != len(ids):
+        raise ParamError("{} ids for {} rows".format(len(ids), len(records)))
+
+    status, target_ids = collection_ids(handler, collection_name,
+                                        page_size=page_size,
+                                        timeout=timeout)
+    report = SyncReport(collection_name, None, dry_run)
+    if not status.ok():
+        report.errors.append(status)
+        return report
+
+    ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+    report.plan = plan = plan_sync(ids, target_ids)
+    logger.info("Sync of {}: {}".format(collection_name, plan))
+    if dry_run:
+        return report
+
+    for start in range(0, len(plan.removed_ids), delete_batch):
+        batch = plan.removed_ids[start:start + delete_batch]
+        status = handler.delete_by_id(collection_name, batch.tolist(),
+                                      timeout=timeout)
+        if not status.ok():
+            report.errors.append(status)
+            return report
+        report.deleted += len(batch)
+
+    if len(plan.new_rows):
+        inserter = BulkInserter(handler,
+                                collection_name,
+                                partition_tag=partition_tag,
+                                **kwargs)
+        result = inserter.insert_chunks(
+            (records[plan.new_rows[start:start + insert_batch]],
+             ids[plan.new_rows[start:start + insert_batch]])
+            for start in range(0, len(plan.new_rows), insert_batch))
+        report.inserted = result.inserted
+        report.errors.extend(status for status, _ in result.failures)
+
+    if flush and (report.inserted or report.deleted):
+        status = handler.flush([collection_name], timeout=timeout)
+        if not status.ok():
+            report.errors.append(status)
+    return report
@@ -0,0 +1,143 @@
+import datetime
+from typing import List
+
+from milvus import ParamError
+from milvus.check import parser_range_date, is_legal_date_range
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+
+GRANULARITIES = (DAY, WEEK, MONTH)
+
+
+def _to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(
+            value, datetime.timezone.utc).date()
+
+    return datetime.datetime.strptime(parser_range_date(value),
+                                      "%Y-%m-%d").date()
+
+
+def bucket_start(value, granularity: str = DAY):
+    """
+    First day of the bucket containing `value`
+
+    :type  value: datetime.date, datetime.datetime, str or unix timestamp
+    :param value: a point in time
+
+    :type  granularity: str
+    :param granularity: `day`, `week` (starting on monday) or `month`
+    """
+    date = _to_date(value)
+    if granularity == DAY:
+        return date
+    if granularity == WEEK:
+        return date - datetime.timedelta(days=date.weekday())
+    if granularity == MONTH:
+        return date.replace(day=1)
+
+    raise ParamError("`granularity` value {} is illegal".format(granularity))
+
+
+def bucket_end(start: datetime.date, granularity: str = DAY):
+    """
+    Last day of the bucket starting at `start`
+    """
+    if granularity == DAY:
+        return start
+    if granularity == WEEK:
+        return start + datetime.timedelta(days=6)
+    if granularity == MONTH:
+        following = (start.replace(day=28) + datetime.timedelta(days=4))
+        return following.replace(day=1) - datetime.timedelta(days=1)
+
+    raise ParamError("`granularity` value {} is illegal".format(granularity))
+
+
+def bucket_tag(value, granularity: str = DAY):
+    """
+    Partition tag of the bucket containing `value`
+
+        day_2021_06_30, week_2021_06_28, month_2021_06
+    """
+    start = bucket_start(value, granularity)
+    if granularity == MONTH:
+        return "{}_{:04d}_{:02d}".format(granularity, start.year, start.month)
+
+    return "{}_{:04d}_{:02d}_{:02d}".format(granularity, start.year,
+                                            start.month, start.day)
+
+
+def parse_bucket_tag(tag: str):
+    """
+    (granularity, first day) of a bucket tag, None for other tags
+    """
+    parts = tag.split("_")
+    if not parts or parts[0] not in GRANULARITIES:
+        return None
+
+    try:
+        if parts[0] == MONTH and len(parts) == 3:
+            return MONTH, datetime.date(int(parts[1]), int(parts[2]), 1)
+        if parts[0] != MONTH and len(parts) == 4:
+            return parts[0], datetime.date(int(parts[1]), int(parts[2]),
+                                           int(parts[3]))
+    except ValueError:
+        return None
+
+    return None
+
+
+def parse_query_ranges(query_ranges: List):
+    """
+    Validate a list of (start, end) date pairs
+
+    :return: list of (datetime.date, datetime.date)
+    """
+    if not isinstance(query_ranges, (list, tuple)) or not query_ranges:
+        raise ParamError("`query_ranges` should be a non-empty list of "
+                         "(start, end) date pairs")
+
+    ranges = []
+    for item in query_ranges:
+        if not isinstance(item, (list, tuple)) or len(item) != 2:
+            raise ParamError("`query_ranges` item {} is illegal".format(item))
+
+        start, end = parser_range_date(item[0]), parser_range_date(item[1])
+        if not is_legal_date_range(start, end):
+            raise ParamError("Range end {} is before start {}".format(
+                end, start))
+        ranges.append((_to_date(start), _to_date(end)))
+
+    return ranges
+
+
+def overlapping_tags(tags: List, query_ranges: List):
+    """
+    Bucket tags overlapping any of the query ranges
+
+    :type  tags: list[str]
+    :param tags: existing partition tags, non bucket tags are ignored
+
+    :type  query_ranges: list
+    :param query_ranges: list of (start, end) date pairs, both ends included
+    """
+    ranges = parse_query_ranges(query_ranges)
+    selected = []
+    for tag in tags:
+        bucket = parse_bucket_tag(tag)
+        if bucket is None:
+            continue
+
+        granularity, start = bucket
+        end = bucket_end(start, granularity)
+        if any(start <= high and low <= end for low, high in ranges):
+            selected.append(tag)
+
+    return selected
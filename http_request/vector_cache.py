@@ -0,0 +1,280 @@
+import threading
+
+import numpy as np
+
+# Rows of every slab, slabs are allocated as a collection's cache fills up
+SLAB_ROWS = 4096
+
+
+class _Slabs:
+    """
+    Vectors of one collection in fixed size slabs of contiguous rows, a
+    slot being a row of a slab, with the sorted ids of the occupied slots
+
+    Slots are recycled with CLOCK: a read sets the referenced flag of its
+    slots, eviction sweeps from the hand, clearing the flags it passes and
+    taking the slots found unreferenced.
+    """
+    def __init__(self, width: int, dtype, capacity: int):
+        self.width = width
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.slabs = []
+        self.slot_ids = np.full(capacity, -1, dtype=np.int64)
+        self.referenced = np.zeros(capacity, dtype=bool)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.slots = np.empty(0, dtype=np.int64)
+        self.free = np.empty(0, dtype=np.int64)
+        self.allocated = 0
+        self.hand = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, ids):
+        """
+        Slot of every id, -1 for ids not cached
+        """
+        if not len(self.keys):
+            return np.full(len(ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, ids),
+                               len(self.keys) - 1)
+        return np.where(self.keys[positions] == ids, self.slots[positions],
+                        -1)
+
+    def gather(self, slots):
+        """
+        (slots, width) matrix of the vectors of the slots, marked referenced
+        """
+        result = np.empty((len(slots), self.width), dtype=self.dtype)
+        slabs = slots // SLAB_ROWS
+        for slab in np.unique(slabs):
+            picked = slabs == slab
+            result[picked] = self.slabs[slab][slots[picked] % SLAB_ROWS]
+        self.referenced[slots] = True
+        return result
+
+    def scatter(self, slots, vectors):
+        slabs = slots // SLAB_ROWS
+        for slab in np.unique(slabs):
+            picked = slabs == slab
+            self.slabs[slab][slots[picked] % SLAB_ROWS] = vectors[picked]
+
+    def _victims(self, count: int, protected):
+        """
+        `count` occupied slots to evict, CLOCK order, none of `protected`
+        """
+        order = (np.arange(self.capacity) + self.hand) % self.capacity
+        candidates = order[(self.slot_ids[order] >= 0)
+                           & ~np.isin(order, protected)]
+        unreferenced = candidates[~self.referenced[candidates]]
+        if len(unreferenced) >= count:
+            victims = unreferenced[:count]
+            passed = (victims[-1] - self.hand) % self.capacity
+            self.referenced[order[:passed + 1]] = False
+        else:
+            # a full turn clears every flag, then the sweep goes on
+            referenced = candidates[self.referenced[candidates]]
+            victims = np.concatenate(
+                (unreferenced, referenced[:count - len(unreferenced)]))
+            self.referenced[:] = False
+        if len(victims):
+            self.hand = (int(victims[-1]) + 1) % self.capacity
+        return victims
+
+    def _allocate(self, count: int, protected):
+        """
+        `count` empty slots: freed ones first, then slots of new slabs, then
+        evicted ones
+
+        :return: slots and the number of evicted ones
+        """
+        taken = self.free[:count]
+        self.free = self.free[count:]
+        count -= len(taken)
+        fresh = min(count, self.capacity - self.allocated)
+        if fresh > 0:
+            start = self.allocated
+            self.allocated += fresh
+            while len(self.slabs) * SLAB_ROWS < self.allocated:
+                rows = min(SLAB_ROWS,
+                           self.capacity - len(self.slabs) * SLAB_ROWS)
+                self.slabs.append(
+                    np.empty((rows, self.width), dtype=self.dtype))
+            taken = np.concatenate(
+                (taken, np.arange(start, start + fresh, dtype=np.int64)))
+            count -= fresh
+        evicted = 0
+        if count > 0:
+            victims = self._victims(count, protected)
+            self._unindex(self.slot_ids[victims])
+            self.slot_ids[victims] = -1
+            taken = np.concatenate((taken, victims))
+            evicted = len(victims)
+        return taken, evicted
+
+    def _unindex(self, ids):
+        if len(ids):
+            positions = np.searchsorted(self.keys, ids)
+            self.keys = np.delete(self.keys, positions)
+            self.slots = np.delete(self.slots, positions)
+
+    def store(self, ids, vectors):
+        """
+        Cache vectors, replacing those of ids already cached
+
+        :return: number of evicted vectors
+        """
+        ids, first = np.unique(ids, return_index=True)
+        vectors = vectors[first]
+        if len(ids) > self.capacity:
+            ids, vectors = ids[-self.capacity:], vectors[-self.capacity:]
+
+        slots = self.lookup(ids)
+        known = slots >= 0
+        self.scatter(slots[known], vectors[known])
+        self.referenced[slots[known]] = True
+        ids, vectors = ids[~known], vectors[~known]
+        if not len(ids):
+            return 0
+
+        new_slots, evicted = self._allocate(len(ids), slots[known])
+        self.scatter(new_slots, vectors)
+        self.slot_ids[new_slots] = ids
+        self.referenced[new_slots] = False
+        positions = np.searchsorted(self.keys, ids)
+        self.keys = np.insert(self.keys, positions, ids)
+        self.slots = np.insert(self.slots, positions, new_slots)
+        return evicted
+
+    def discard(self, ids):
+        slots = self.lookup(np.unique(ids))
+        slots = slots[slots >= 0]
+        self._unindex(self.slot_ids[slots])
+        self.slot_ids[slots] = -1
+        self.referenced[slots] = False
+        self.free = np.concatenate((self.free, slots))
+
+
+class VectorCache:
+    """
+    Bounded cache of the vectors of ids, per collection
+
+    Vectors are kept as float32 rows, or uint8 rows of packed bits, in
+    slabs of `SLAB_ROWS` rows allocated as the cache fills up, and evicted
+    with CLOCK once a collection holds `max_bytes` of them.
+
+    Every discard or drop of a collection bumps its generation. A reader
+    takes the generation before fetching and passes it to `put`, which
+    drops vectors fetched before a write of the collection completed.
+
+    :type  max_bytes: int
+    :param max_bytes: bytes of vectors cached per collection
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._collections = dict()
+        self._generations = dict()
+        self._lock = threading.Lock()
+
+    def generation(self, collection_name: str):
+        """
+        Counter of the invalidations of a collection, see `put`
+        """
+        with self._lock:
+            return self._generations.get(collection_name, 0)
+
+    def _invalidate(self, collection_name: str):
+        self._generations[collection_name] = \
+            self._generations.get(collection_name, 0) + 1
+
+    def get(self, collection_name: str, ids):
+        """
+        Cached vectors of ids
+
+        :returns:
+            vectors: (ids, width) numpy.ndarray, rows of the ids not cached
+                are undefined, None when nothing of the collection is cached
+            found: numpy.ndarray of the flags of the cached ids
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        with self._lock:
+            slabs = self._collections.get(collection_name, None)
+            if slabs is None:
+                self.misses += len(ids)
+                return None, np.zeros(len(ids), dtype=bool)
+
+            slots = slabs.lookup(ids)
+            found = slots >= 0
+            vectors = np.empty((len(ids), slabs.width), dtype=slabs.dtype)
+            vectors[found] = slabs.gather(slots[found])
+            hits = int(found.sum())
+            self.hits += hits
+            self.misses += len(ids) - hits
+            return vectors, found
+
+    def put(self, collection_name: str, ids, vectors, generation=None):
+        """
+        Cache vectors of ids, a collection whose vectors changed of width or
+        type is cached again from scratch
+
+        :type  generation: int
+        :param generation: `generation` of the collection when the vectors
+            were fetched, they are dropped if it changed since
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        vectors = np.asarray(vectors)
+        if not len(ids):
+            return
+
+        with self._lock:
+            if generation is not None and generation != \
+                    self._generations.get(collection_name, 0):
+                return
+            slabs = self._collections.get(collection_name, None)
+            if slabs is None or slabs.width != vectors.shape[1] or \
+                    slabs.dtype != vectors.dtype:
+                row_bytes = max(1, vectors.shape[1] * vectors.itemsize)
+                capacity = self.max_bytes // row_bytes
+                if capacity < 1:
+                    return
+                slabs = _Slabs(vectors.shape[1], vectors.dtype, capacity)
+                self._collections[collection_name] = slabs
+            self.evictions += slabs.store(ids, vectors)
+
+    def discard(self, collection_name: str, ids):
+        """
+        Forget vectors of ids, e.g. once deleted
+        """
+        with self._lock:
+            self._invalidate(collection_name)
+            slabs = self._collections.get(collection_name, None)
+            if slabs is not None:
+                slabs.discard(np.asarray(ids, dtype=np.int64).reshape(-1))
+
+    def drop(self, collection_name: str):
+        """
+        Forget every vector of a collection
+        """
+        with self._lock:
+            self._invalidate(collection_name)
+            self._collections.pop(collection_name, None)
+
+    def clear(self):
+        with self._lock:
+            for collection_name in list(self._generations):
+                self._invalidate(collection_name)
+            self._collections.clear()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(slabs) for slabs in self._collections.values())
+
+    def __repr__(self):
+        return ('%s(max_bytes=%r, vectors=%r, hits=%r, misses=%r, '
+                'evictions=%r)' %
+                (self.__class__.__name__, self.max_bytes, len(self),
+                 self.hits, self.misses, self.evictions))
@@ -1,5 +1,8 @@
 from celery import Celery
 
+from milvus.settings import MILVUS_RETENTION_INTERVAL, MILVUS_TARGET_RECALL
+from milvus.settings import MILVUS_TUNING_INTERVAL
+
 
 app = Celery(
         'milvus_test',
@@ -10,6 +13,19 @@ app = Celery(
 
 app.autodiscover_tasks()
 
+beat_schedule = {
+    'apply-retention': {
+        'task': 'deployments.tasks.apply_retention',
+        'schedule': MILVUS_RETENTION_INTERVAL,
+    },
+}
+if MILVUS_TARGET_RECALL:
+    beat_schedule['tune-collections'] = {
+        'task': 'deployments.tasks.tune_collections',
+        'schedule': MILVUS_TUNING_INTERVAL,
+    }
+
 app.conf.update(
     result_expires=3600,
+    beat_schedule=beat_schedule,
 )
@@ -4,8 +4,23 @@ import numpy as np
 from urllib.parse import urlparse
 
 from milvus import ParamError
+from milvus.settings import MILVUS_VALIDATE_RECORDS
 from http_request.constants import MetricType, IndexType
 
+_validation = {"enabled": MILVUS_VALIDATE_RECORDS}
+
+
+def set_validation(enabled: bool):
+    """
+    Switch record validation on or off for the whole process, off by
+    default: HttpHandler describes a collection to check its records
+    """
+    _validation["enabled"] = bool(enabled)
+
+
+def validation_enabled():
+    return _validation["enabled"]
+
 
 def is_legal_host(host):
     if not isinstance(host, str):
@@ -56,38 +71,113 @@ def is_legal_numpy_array(array):
     return False if array is None or array.size == 0 else True
 
 
-def is_legal_records(value):
-    param_error = ParamError(
+def _records_error():
+    return ParamError(
         'A vector must be a non-empty, 2-dimensional array and '
         'must contain only elements with the float data type or the bytes data type.'
     )
 
-    if isinstance(value, np.ndarray):
-        if not is_legal_numpy_array(value):
-            raise param_error
 
+def _dimension_error(dim, dimension):
+    return ParamError(
+        'Vector dimension {} does not match the collection dimension {}'.
+        format(dim, dimension))
+
+
+def _check_array(array, dimension, binary=None):
+    if array.ndim != 2 or array.size == 0 or array.dtype.kind not in 'fiu':
+        raise _records_error()
+
+    packed = array.dtype == np.uint8
+    if binary and not packed:
+        raise ParamError('Binary vectors must be bytes or uint8 arrays')
+
+    if array.dtype.kind == 'f' and not np.isfinite(array).all():
+        raise ParamError('Vectors must not contain NaN or infinite values')
+
+    if dimension is None:
+        return
+    # packed binary vectors hold 8 dimensions per byte, a uint8 array of a
+    # collection of unknown type may be either
+    if binary:
+        dims = (array.shape[1] * 8, )
+    elif binary is None and packed:
+        dims = (array.shape[1], array.shape[1] * 8)
+    else:
+        dims = (array.shape[1], )
+    if dimension not in dims:
+        raise _dimension_error(dims[-1], dimension)
+
+
+def _check_bin_vectors(value, dimension):
+    if any(type(record) is not bytes for record in value):
+        raise _records_error()
+
+    lengths = np.fromiter(map(len, value), dtype=np.int64, count=len(value))
+    if lengths[0] == 0:
+        raise _records_error()
+    if (lengths != lengths[0]).any():
+        raise ParamError('Whole vectors must have the same dimension')
+
+    if dimension is not None and lengths[0] * 8 != dimension:
+        raise _dimension_error(lengths[0] * 8, dimension)
+
+
+def is_legal_records(value, dimension=None, binary=None):
+    """
+    Check records in one vectorized pass, lists are converted once
+
+    :type  dimension: int
+    :param dimension: dimension of the collection, bits for binary vectors,
+        None skips the check
+
+    :type  binary: bool
+    :param binary: whether the collection holds binary vectors, given as
+        bytes or as uint8 arrays of `dimension // 8` columns; None accepts
+        uint8 arrays of either width
+    """
+    if isinstance(value, np.ndarray):
+        _check_array(value, dimension, binary)
         return True
 
     if not isinstance(value, list) or len(value) == 0:
-        raise param_error
+        raise _records_error()
 
     if isinstance(value[0], bytes):
-        check_func = is_legal_bin_vector
-    elif isinstance(value[0], list):
-        check_func = is_legal_vector
-    else:
-        raise param_error
+        _check_bin_vectors(value, dimension)
+        return True
+
+    if binary or not isinstance(value[0], list):
+        raise _records_error()
 
-    _dim = len(value[0])
-    for record in value:
-        if not check_func(record):
-            raise param_error
-        if _dim != len(record):
+    try:
+        with np.errstate(over='ignore'):
+            array = np.asarray(value, dtype=np.float32)
+    except (ValueError, TypeError):
+        if all(isinstance(record, list) for record in value):
             raise ParamError('Whole vectors must have the same dimension')
+        raise _records_error()
 
+    _check_array(array, dimension)
     return True
 
 
+def check_records(records, dimension=None, validate=None, binary=None):
+    """
+    Validate records unless validation is switched off
+
+    :type  validate: bool
+    :param validate: per-call switch, None follows `validation_enabled()`
+
+    :type  binary: bool
+    :param binary: see `is_legal_records`
+    """
+    if validate is None:
+        validate = validation_enabled()
+    if validate:
+        is_legal_records(records, dimension, binary)
+
+
 def int_or_str(item):
     if isinstance(item, int):
         return str(item)
@@ -219,49 +309,31 @@ def _raise_param_error(param_name, param_value):
                                                        param_value))
 
 
+_PARAM_CHECKS = {
+    "collection_name": is_legal_table_name,
+    "dimension": is_legal_dimension,
+    "index_type": is_legal_index_type,
+    "index_file_size": is_legal_index_size,
+    "metric_type": is_legal_metric_type,
+    "topk": is_legal_topk,
+    "top_k": is_legal_topk,
+    "ids": is_legal_ids,
+    "nprobe": is_legal_nprobe,
+    "nlist": is_legal_nlist,
+    "cmd": is_legal_cmd,
+    "partition_tag": is_legal_partition_tag,
+    "partition_tag_array": is_legal_partition_tag_array,
+    "records": is_legal_records,
+}
+
+
 def check_pass_param(*args, **kwargs):
     if kwargs is None:
         raise ParamError("Param should not be None")
 
     for key, value in kwargs.items():
-        if key in ("collection_name", ):
-            if not is_legal_table_name(value):
-                _raise_param_error(key, value)
-        elif key == "dimension":
-            if not is_legal_dimension(value):
-                _raise_param_error(key, value)
-        elif key in ("index_type", ):
-            if not is_legal_index_type(value):
-                _raise_param_error(key, value)
-        elif key == "index_file_size":
-            if not is_legal_index_size(value):
-                _raise_param_error(key, value)
-        elif key == "metric_type":
-            if not is_legal_metric_type(value):
-                _raise_param_error(key, value)
-        elif key in ("topk", "top_k"):
-            if not is_legal_topk(value):
-                _raise_param_error(key, value)
-        elif key in ("ids", ):
-            if not is_legal_ids(value):
-                _raise_param_error(key, value)
-        elif key in ("nprobe", ):
-            if not is_legal_nprobe(value):
-                _raise_param_error(key, value)
-        elif key in ("nlist", ):
-            if not is_legal_nlist(value):
-                _raise_param_error(key, value)
-        elif key in ("cmd", ):
-            if not is_legal_cmd(value):
-                _raise_param_error(key, value)
-        elif key in ("partition_tag", ):
-            if not is_legal_partition_tag(value):
-                _raise_param_error(key, value)
-        elif key in ("partition_tag_array", ):
-            if not is_legal_partition_tag_array(value):
-                _raise_param_error(key, value)
-        elif key in ("records", ):
-            if not is_legal_records(value):
-                _raise_param_error(key, value)
-        else:
+        check = _PARAM_CHECKS.get(key, None)
+        if check is None:
             raise ParamError("unknown param `{}`".format(key))
+        if not check(value):
+            _raise_param_error(key, value)
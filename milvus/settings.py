@@ -7,3 +7,28 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Milvus database information
 MILVUS_DATABASE_HOST = os.environ.get('MILVUS_DATABASE_HOST', '192.168.18.24')
 MILVUS_DATABASE_PORT = os.environ.get('MILVUS_DATABASE_PORT', 30111)
+
+# Directory of the embedded engine, used instead of the server when set;
+# one process at a time opens it
+MILVUS_LOCAL_PATH = os.environ.get('MILVUS_LOCAL_PATH') or None
+
+# Recall@10 the search params of indexed collections are tuned for, searches
+# keep their explicit params when unset
+MILVUS_TARGET_RECALL = float(os.environ.get('MILVUS_TARGET_RECALL') or 0) \
+    or None
+# Tunings shared by every process, written by the tuning task alone
+MILVUS_TUNING_PATH = os.environ.get('MILVUS_TUNING_PATH') or str(
+    BASE_DIR / 'autotune.json')
+MILVUS_TUNING_INTERVAL = float(
+    os.environ.get('MILVUS_TUNING_INTERVAL') or 3600)
+
+# Retention policy
+MILVUS_RETENTION_DAYS = os.environ.get('MILVUS_RETENTION_DAYS') or None
+MILVUS_COMPACT_THRESHOLD = float(
+    os.environ.get('MILVUS_COMPACT_THRESHOLD') or 0.2)
+MILVUS_RETENTION_INTERVAL = float(
+    os.environ.get('MILVUS_RETENTION_INTERVAL') or 3600)
+
+# Record validation, off unless enabled for untrusted clients
+MILVUS_VALIDATE_RECORDS = (os.environ.get('MILVUS_VALIDATE_RECORDS') or
+                           '').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,33 @@
+import numpy as np
+
+from http_request.constants import MetricType
+from http_request.local_handler import LocalHandler
+
+
+def filled_handler(rows: int = 250,
+                   dimension: int = 4,
+                   collection_names=("vectors", ),
+                   first_id: int = 0,
+                   index_type=None,
+                   index_params=None,
+                   seed: int = 0,
+                   **kwargs):
+    """
+    LocalHandler whose collections hold the same `rows` random float32
+    vectors, ids counting from `first_id`, indexed when `index_type` is
+    given; other keyword arguments go to the LocalHandler
+
+    :return: (handler, vectors)
+    """
+    handler = LocalHandler(**kwargs)
+    vectors = np.random.default_rng(seed).random((rows, dimension),
+                                                 dtype=np.float32)
+    for name in collection_names:
+        handler.create_collection(name, dimension, 1024, MetricType.L2)
+        if rows:
+            handler.add_vectors(name,
+                                vectors,
+                                ids=list(range(first_id, first_id + rows)))
+        if index_type is not None:
+            handler.create_index(name, index_type, index_params or {})
+    return handler, vectors
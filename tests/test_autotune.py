@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from http_request import autotune
+from http_request.autotune import AutoTuner
+from http_request.constants import IndexType, MetricType
+from tests import filled_handler
+
+
+INDEX = {"index_type": IndexType.IVFLAT, "index_params": {"nlist": 64}}
+
+
+class TuneTest(unittest.TestCase):
+    def test_smallest_nprobe_reaching_the_target(self):
+        handler, _ = filled_handler(2000, 16, **INDEX)
+        status, result = autotune.tune(handler, "vectors", 0.9, sample=50)
+        self.assertTrue(status.ok())
+        self.assertTrue(result.reached)
+        nprobe = result.params["nprobe"]
+        self.assertGreaterEqual(result.evaluations[nprobe], 0.9)
+        if nprobe > 1:
+            self.assertLess(result.evaluations[nprobe - 1], 0.9)
+
+    def test_large_collections_are_not_exported(self):
+        handler, _ = filled_handler(2000, 16, **INDEX)
+        with mock.patch.object(autotune.evaluation,
+                               "collection_ground_truth") as export:
+            status, result = autotune.tune(handler,
+                                           "vectors",
+                                           0.9,
+                                           sample=50,
+                                           max_rows=1000)
+        self.assertFalse(status.ok())
+        self.assertIsNone(result)
+        export.assert_not_called()
+
+
+class AutoTunerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "autotune.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_searches_do_not_tune_by_default(self):
+        handler, _ = filled_handler(2000, 16, **INDEX)
+        tuner = AutoTuner(target_recall=0.9, sample=50)
+        with mock.patch.object(tuner, "_tune") as run:
+            params = tuner.params(handler, "vectors", 10)
+        run.assert_not_called()
+        self.assertEqual(params, {"nprobe": 16})
+
+    def test_tunings_are_shared_through_the_path(self):
+        handler, _ = filled_handler(2000, 16, **INDEX)
+        reader = AutoTuner(target_recall=0.9,
+                           path=self.path,
+                           auto_tune=False,
+                           check_interval=0)
+        writer = AutoTuner(target_recall=0.9,
+                           sample=50,
+                           path=self.path,
+                           auto_tune=False)
+        self.assertTrue(writer.stale(handler, "vectors"))
+        result = writer.tune(handler, "vectors")
+        self.assertFalse(writer.stale(handler, "vectors"))
+
+        self.assertEqual(reader.params(handler, "vectors", 10), result.params)
+        restarted = AutoTuner(target_recall=0.9, path=self.path)
+        self.assertEqual(restarted.result("vectors").params, result.params)
+
+    def test_saving_keeps_other_collections(self):
+        handler, _ = filled_handler(2000, 16, **INDEX)
+        first = AutoTuner(target_recall=0.9, sample=50, path=self.path)
+        second = AutoTuner(target_recall=0.9, sample=50, path=self.path)
+        handler.create_collection("other", 16, 1024, MetricType.L2)
+        handler.add_vectors("other", np.ones((100, 16), np.float32))
+        handler.create_index("other", IndexType.IVFLAT, {"nlist": 4})
+        first.tune(handler, "vectors")
+        second.tune(handler, "other")
+        stored = AutoTuner(path=self.path)
+        self.assertIsNotNone(stored.result("vectors"))
+        self.assertIsNotNone(stored.result("other"))
+
+        second.forget("other")
+        stored = AutoTuner(path=self.path)
+        self.assertIsNotNone(stored.result("vectors"))
+        self.assertIsNone(stored.result("other"))
+
+    def test_a_larger_top_k_is_logged_once(self):
+        handler, _ = filled_handler(2000, 16, **INDEX)
+        tuner = AutoTuner(target_recall=0.9, sample=50)
+        result = tuner.tune(handler, "vectors")
+        with self.assertLogs(autotune.logger, "WARNING") as logs:
+            self.assertEqual(tuner.params(handler, "vectors", 100),
+                             result.params)
+            tuner.params(handler, "vectors", 100)
+            autotune.logger.warning("end")
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("recall@10", logs.output[0])
+
+    def test_a_new_index_is_stale(self):
+        handler, _ = filled_handler(2000, 16, **INDEX)
+        tuner = AutoTuner(target_recall=0.9, sample=50, auto_tune=False)
+        tuner.tune(handler, "vectors")
+        handler.create_index("vectors", IndexType.IVFLAT, {"nlist": 32})
+        self.assertTrue(tuner.stale(handler, "vectors"))
+
+
+if __name__ == "__main__":
+    unittest.main()
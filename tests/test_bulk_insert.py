@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+
+from http_request.bulk_insert import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.now += seconds
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_sustained_rate_with_batches_larger_than_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1000, burst=100, clock=clock, sleep=clock.sleep)
+        for _ in range(10):
+            bucket.acquire(2000)
+        # 20000 vectors, only the first 100 ride on the initial burst
+        self.assertGreaterEqual(clock.now, (20000 - 100) / 1000)
+        self.assertAlmostEqual(clock.now, 19.9)
+
+    def test_burst_is_free(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1000, burst=500, clock=clock, sleep=clock.sleep)
+        bucket.acquire(200)
+        bucket.acquire(300)
+        self.assertEqual(clock.now, 0.0)
+        bucket.acquire(100)
+        self.assertAlmostEqual(clock.now, 0.1)
+
+    def test_idle_refill_is_capped_at_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1000, burst=100, clock=clock, sleep=clock.sleep)
+        bucket.acquire(100)
+        clock.now += 60.0
+        bucket.acquire(1100)
+        self.assertAlmostEqual(clock.now, 61.0)
+
+    def test_real_clock_rate(self):
+        bucket = TokenBucket(50000, burst=1000)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire(5000)
+        self.assertGreaterEqual(time.monotonic() - start, 24000 / 50000 * 0.95)
+
+    def test_concurrent_callers_share_the_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1000, burst=100, clock=clock, sleep=clock.sleep)
+        threads = [
+            threading.Thread(target=bucket.acquire, args=(1000, ))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # every caller sleeps off its own debt on the shared clock
+        self.assertGreaterEqual(clock.now, (4000 - 100) / 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from http_request.abstracts import CollectionSchema
+from http_request.constants import MetricType, Status
+from http_request.handler import HttpHandler
+from http_request.local_handler import LocalHandler
+from milvus import ParamError
+from milvus.check import (check_records, is_legal_records,
+                          set_validation, validation_enabled)
+
+
+class RecordsTest(unittest.TestCase):
+    def test_float_lists_and_arrays(self):
+        self.assertTrue(is_legal_records([[0.1, 0.2], [0.3, 0.4]], 2))
+        self.assertTrue(is_legal_records(np.ones((3, 2), np.float32), 2))
+        with self.assertRaises(ParamError):
+            is_legal_records([[0.1, 0.2], [0.3]], 2)
+        with self.assertRaises(ParamError):
+            is_legal_records(np.ones((3, 4), np.float32), 2)
+        with self.assertRaises(ParamError):
+            is_legal_records(np.array([[np.nan, 1.0]]), 2)
+
+    def test_binary_bytes(self):
+        self.assertTrue(is_legal_records([b"\x01" * 4, b"\x02" * 4], 32))
+        with self.assertRaises(ParamError):
+            is_legal_records([b"\x01" * 4, b"\x02" * 3], 32)
+        with self.assertRaises(ParamError):
+            is_legal_records([b"\x01" * 4], 64)
+
+    def test_binary_arrays_have_dimension_over_eight_columns(self):
+        packed = np.zeros((5, 4), dtype=np.uint8)
+        self.assertTrue(is_legal_records(packed, 32, binary=True))
+        with self.assertRaises(ParamError):
+            is_legal_records(packed, 4, binary=True)
+        with self.assertRaises(ParamError):
+            is_legal_records(np.zeros((5, 4), np.float32), 32, binary=True)
+        with self.assertRaises(ParamError):
+            is_legal_records([[1.0] * 32], 32, binary=True)
+
+    def test_uint8_arrays_of_unknown_collections(self):
+        # packed binary, or bvecs-like components of float vectors
+        self.assertTrue(is_legal_records(np.zeros((5, 4), np.uint8), 32))
+        self.assertTrue(is_legal_records(np.zeros((5, 32), np.uint8), 32))
+        self.assertTrue(
+            is_legal_records(np.zeros((5, 32), np.uint8), 32, binary=False))
+        with self.assertRaises(ParamError):
+            is_legal_records(np.zeros((5, 4), np.uint8), 32, binary=False)
+
+    def test_validation_can_be_skipped(self):
+        check_records([[1.0]], 2, validate=False)
+        with self.assertRaises(ParamError):
+            check_records([[1.0]], 2, validate=True)
+
+
+class HandlerRecordsTest(unittest.TestCase):
+    def test_http_handler_accepts_binary_arrays(self):
+        handler = HttpHandler("127.0.0.1", 1)
+        schema = CollectionSchema("bin", 64, 1024, MetricType.HAMMING)
+        with mock.patch.object(handler, "describe_collection",
+                               return_value=(Status(), schema)):
+            handler._check_records("bin", np.zeros((3, 8), np.uint8), True,
+                                   10)
+            with self.assertRaises(ParamError):
+                handler._check_records("bin", np.zeros((3, 64), np.uint8),
+                                       True, 10)
+
+    def test_handlers_only_validate_on_request(self):
+        self.assertFalse(validation_enabled())
+        handler = HttpHandler("127.0.0.1", 1)
+        with mock.patch.object(handler, "describe_collection") as describe:
+            handler._check_records("vectors", [[1.0]], None, 10)
+        describe.assert_not_called()
+        try:
+            set_validation(True)
+            schema = CollectionSchema("vectors", 2, 1024, MetricType.L2)
+            with mock.patch.object(handler, "describe_collection",
+                                   return_value=(Status(), schema)):
+                with self.assertRaises(ParamError):
+                    handler._check_records("vectors", [[1.0]], None, 10)
+        finally:
+            set_validation(False)
+
+    def test_local_handler_validates_binary_arrays(self):
+        handler = LocalHandler()
+        handler.create_collection("bin", 64, 1024, MetricType.HAMMING)
+        status, ids = handler.add_vectors("bin",
+                                          np.zeros((3, 8), np.uint8),
+                                          validate=True)
+        self.assertTrue(status.ok())
+        self.assertEqual(len(ids), 3)
+        with self.assertRaises(ParamError):
+            handler.add_vectors("bin", np.zeros((3, 64), np.uint8),
+                                validate=True)
+        status, results = handler.search_vectors(
+            "bin", 1, np.zeros((1, 8), np.uint8), validate=True)
+        self.assertTrue(status.ok())
+        self.assertEqual(results.distance_array[0, 0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
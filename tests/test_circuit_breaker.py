@@ -0,0 +1,142 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from http_request import handler as handler_module
+from http_request.circuit_breaker import (CLOSED, HALF_OPEN, OPEN,
+                                          CircuitBreaker)
+from http_request.constants import Status
+from http_request.handler import HttpHandler
+from http_request.retry import RetryPolicy
+from milvus import ParamError
+
+
+class Response:
+    status_code = 200
+
+    def json(self):
+        return {"reply": "0.10.6"}
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def breaker(self, **kwargs):
+        self.changes = []
+        options = dict(window=4, min_calls=4, open_seconds=60, probes=2)
+        options.update(kwargs)
+        return CircuitBreaker(
+            on_state_change=lambda *change: self.changes.append(change),
+            **options)
+
+    def test_failures_open_the_circuit(self):
+        breaker = self.breaker()
+        for success in [True, False, True]:
+            breaker.record(success, 0.0)
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record(False, 0.0)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertEqual(self.changes, [(CLOSED, OPEN)])
+
+    def test_slow_calls_open_the_circuit(self):
+        breaker = self.breaker(slow_call_seconds=0.1, slow_call_rate=0.75)
+        for latency in [0.0, 0.5, 0.5, 0.5]:
+            breaker.record(True, latency)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_probes_close_the_circuit(self):
+        breaker = self.breaker(open_seconds=0)
+        for _ in range(4):
+            breaker.record(False, 0.0)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        # a probe without outcome lets another one through
+        breaker.release()
+        self.assertTrue(breaker.allow())
+        breaker.record(True, 0.0)
+        breaker.record(True, 0.0)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(self.changes[-1], (HALF_OPEN, CLOSED))
+
+    def test_a_failing_probe_reopens_the_circuit(self):
+        breaker = self.breaker(open_seconds=60)
+        for _ in range(4):
+            breaker.record(False, 0.0)
+        breaker._opened_at -= 60
+        self.assertTrue(breaker.allow())
+        breaker.record(False, 0.0)
+        self.assertEqual(breaker._state, OPEN)
+        self.assertFalse(breaker.allow())
+
+
+class HandlerCircuitTest(unittest.TestCase):
+    def test_an_open_circuit_fails_without_a_request(self):
+        handler = HttpHandler("127.0.0.1",
+                              1,
+                              retry_policy=RetryPolicy(max_attempts=1),
+                              circuit_breaker={
+                                  "window": 2,
+                                  "min_calls": 2,
+                                  "open_seconds": 60
+                              })
+        with mock.patch.object(
+                handler_module.requests,
+                "request",
+                side_effect=requests.exceptions.ConnectionError("refused")):
+            for _ in range(2):
+                status, _ = handler.server_version(10)
+                self.assertEqual(status.code, Status.CONNECT_FAILED)
+        self.assertEqual(handler.circuit_state(), OPEN)
+
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               return_value=Response()) as request:
+            status, _ = handler.server_version(10)
+        self.assertEqual(status.code, Status.CIRCUIT_OPEN)
+        request.assert_not_called()
+
+    def test_a_probe_without_outcome_is_given_back(self):
+        handler = HttpHandler("127.0.0.1",
+                              1,
+                              retry_policy=RetryPolicy(max_attempts=1),
+                              circuit_breaker={
+                                  "window": 2,
+                                  "min_calls": 2,
+                                  "open_seconds": 0,
+                                  "probes": 1
+                              })
+        with mock.patch.object(
+                handler_module.requests,
+                "request",
+                side_effect=requests.exceptions.ConnectionError("refused")):
+            for _ in range(2):
+                handler.server_version(10)
+        self.assertEqual(handler.circuit_state(), HALF_OPEN)
+
+        def consume(method, url, **kwargs):
+            b"".join(kwargs.get("data", None) or [])
+            return Response()
+
+        # the body generator fails midway on an invalid chunk
+        handler._dimensions["vectors"] = (2, False)
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               side_effect=consume):
+            with self.assertRaises(ParamError):
+                handler.add_vectors_stream("vectors",
+                                           iter([[1.0, 2.0], [3.0]]),
+                                           chunk_rows=1,
+                                           validate=True)
+            status, version = handler.server_version(10)
+        self.assertTrue(status.ok())
+        self.assertEqual(handler.circuit_state(), CLOSED)
+
+    def test_breakers_can_be_disabled(self):
+        handler = HttpHandler("127.0.0.1", 1, circuit_breaker=None)
+        self.assertIsNone(handler.circuit_state())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import unittest
+from unittest import mock
+
+from http_request import handler as handler_module
+from http_request.compression import (CompressionStats, Compressor,
+                                      rejects_gzip)
+from http_request.handler import HttpHandler
+
+
+class Response:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+class CompressorTest(unittest.TestCase):
+    def test_bodies_are_gzip_members(self):
+        compressor = Compressor(threshold=10)
+        data = b"[0.1,0.2,0.3]" * 1000
+        self.assertTrue(compressor.accepts(data))
+        self.assertFalse(compressor.accepts(b"short"))
+        self.assertFalse(compressor.accepts(iter([data])))
+        self.assertEqual(gzip.decompress(compressor.compress(data)), data)
+        self.assertEqual(gzip.decompress(compressor.compress(data.decode())),
+                         data)
+
+    def test_large_bodies_are_deflated_in_chunks(self):
+        compressor = Compressor(parallel_threshold=1000,
+                                chunk_size=333,
+                                max_workers=2)
+        data = bytes(range(256)) * 40
+        try:
+            self.assertEqual(gzip.decompress(compressor.compress(data)), data)
+        finally:
+            compressor.shutdown()
+        with self.assertRaises(ValueError):
+            Compressor(level=0)
+
+    def test_stats(self):
+        stats = CompressionStats()
+        self.assertEqual(stats.ratio, 1.0)
+        stats.record(100, 25)
+        stats.record(100, 100)
+        self.assertEqual((stats.requests, stats.compressed), (2, 1))
+        self.assertEqual(stats.ratio, 0.625)
+
+    def test_only_decoding_errors_reject_gzip(self):
+        self.assertTrue(rejects_gzip(Response(415)))
+        self.assertTrue(
+            rejects_gzip(Response(400, '{"message": "Cannot parse body"}')))
+        self.assertFalse(
+            rejects_gzip(Response(400, '{"message": "Illegal dimension"}')))
+        self.assertFalse(rejects_gzip(Response(500, "gzip")))
+
+
+class HandlerCompressionTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = HttpHandler("127.0.0.1",
+                                   1,
+                                   compression={"threshold": 10})
+        self.url = self.handler._uri + "/collections/vectors/vectors"
+        self.data = b"[0.1,0.2,0.3]" * 100
+
+    def test_bodies_are_sent_gzipped(self):
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               return_value=Response(200)) as request:
+            self.handler._request("post", self.url, data=self.data)
+        kwargs = request.call_args[1]
+        self.assertEqual(kwargs["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(kwargs["data"]), self.data)
+        self.assertEqual(self.handler.compression_stats.compressed, 1)
+
+    def test_an_endpoint_rejecting_gzip_gets_plain_bodies(self):
+        def request(method, url, **kwargs):
+            gzipped = "Content-Encoding" in (kwargs.get("headers") or {})
+            return Response(415 if gzipped else 200)
+
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               side_effect=request) as sent:
+            response = self.handler._request("post", self.url,
+                                             data=self.data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sent.call_count, 2)
+
+            self.handler._request("post", self.url, data=self.data)
+            self.assertEqual(sent.call_count, 3)
+            self.assertEqual(sent.call_args[1]["data"], self.data)
+
+    def test_parameter_errors_are_not_sent_again(self):
+        with mock.patch.object(
+                handler_module.requests,
+                "request",
+                return_value=Response(400, "Partition not found")) as sent:
+            response = self.handler._request("post", self.url,
+                                             data=self.data)
+            self.handler._request("post", self.url, data=self.data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sent.call_count, 2)
+        self.assertIn("Content-Encoding", sent.call_args[1]["headers"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from http_request.datasets import VectorDataset, open_array
+from milvus import ParamError
+
+
+def write_vecs(path, array):
+    dims = np.full((len(array), 1), array.shape[1], dtype=np.int32)
+    with open(path, "wb") as file:
+        file.write(
+            np.hstack((dims.view(np.uint8).reshape(len(array), 4),
+                       array.view(np.uint8).reshape(len(array), -1))).tobytes())
+
+
+class VecsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.floats = rng.random((50, 7), dtype=np.float32)
+        self.ints = rng.integers(0, 1000, (50, 3), dtype=np.int32)
+        self.bytes = rng.integers(0, 256, (50, 5), dtype=np.uint8)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_round_trip_of_every_format(self):
+        for name, array in (("a.fvecs", self.floats), ("a.ivecs", self.ints),
+                            ("a.bvecs", self.bytes)):
+            write_vecs(self._path(name), array)
+            mapped = open_array(self._path(name))
+            self.assertEqual(mapped.dtype, array.dtype)
+            np.testing.assert_array_equal(mapped, array)
+            np.testing.assert_array_equal(mapped[10:20:3], array[10:20:3])
+
+    def test_npy(self):
+        np.save(self._path("a.npy"), self.floats)
+        np.testing.assert_array_equal(open_array(self._path("a.npy")),
+                                      self.floats)
+
+    def test_mixed_dimensions_are_refused(self):
+        write_vecs(self._path("a.fvecs"), self.floats)
+        with open(self._path("a.fvecs"), "r+b") as file:
+            file.seek(-(4 + 7 * 4), os.SEEK_END)
+            file.write(np.int32(6).tobytes())
+        with self.assertRaises(ParamError):
+            open_array(self._path("a.fvecs"))
+
+    def test_truncated_file_is_refused(self):
+        write_vecs(self._path("a.fvecs"), self.floats)
+        with open(self._path("a.fvecs"), "r+b") as file:
+            file.truncate(os.path.getsize(self._path("a.fvecs")) - 3)
+        with self.assertRaises(ParamError):
+            open_array(self._path("a.fvecs"))
+
+    def test_shards_cover_the_dataset(self):
+        write_vecs(self._path("a.fvecs"), self.floats)
+        dataset = VectorDataset(self._path("a.fvecs"), offset=5, limit=40)
+        shards = [dataset.shard(index, 3) for index in range(3)]
+        np.testing.assert_array_equal(
+            np.concatenate([shard.rows for shard in shards]),
+            self.floats[5:45])
+        chunks = list(shards[1].chunks(batch_size=4, row_ids=True))
+        ids = np.concatenate([ids for _, ids in chunks])
+        np.testing.assert_array_equal(ids, np.arange(18, 31))
+
+
+if __name__ == "__main__":
+    unittest.main()
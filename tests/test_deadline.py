@@ -0,0 +1,75 @@
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from http_request import handler as handler_module
+from http_request.constants import Status
+from http_request.deadline import Deadline, current_deadline, deadline_scope
+from http_request.handler import HttpHandler
+from http_request.retry import RetryPolicy
+from milvus import NotConnectError
+
+
+class Response:
+    status_code = 200
+
+    def json(self):
+        return {"reply": "0.10.6"}
+
+
+class DeadlineTest(unittest.TestCase):
+    def test_timeout_is_capped(self):
+        deadline = Deadline(1.0)
+        self.assertLessEqual(deadline.timeout(10), 1.0)
+        self.assertEqual(deadline.timeout(0.5), 0.5)
+        self.assertFalse(deadline.expired())
+        self.assertTrue(Deadline(-1).expired())
+        self.assertEqual(Deadline(-1).timeout(), 0.0)
+
+    def test_scopes_keep_the_earliest_deadline(self):
+        self.assertIsNone(current_deadline.get())
+        with deadline_scope(1.0) as outer:
+            with deadline_scope(5.0) as inner:
+                self.assertIs(inner, outer)
+            with deadline_scope(0.5) as inner:
+                self.assertIsNot(inner, outer)
+                self.assertIs(current_deadline.get(), inner)
+            self.assertIs(current_deadline.get(), outer)
+        self.assertIsNone(current_deadline.get())
+
+
+class HandlerDeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = HttpHandler(
+            "127.0.0.1",
+            1,
+            retry_policy=RetryPolicy(max_attempts=100, base_delay=0.05))
+
+    def test_ping_gives_up_at_the_deadline(self):
+        with mock.patch.object(
+                handler_module.requests,
+                "request",
+                side_effect=requests.exceptions.ConnectionError("refused")):
+            start = time.monotonic()
+            with self.assertRaises(NotConnectError):
+                self.handler.ping(timeout=10, deadline=0.2)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_server_calls_take_a_deadline(self):
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               return_value=Response()) as request:
+            status, version = self.handler.server_version(10, deadline=0.5)
+            self.assertTrue(status.ok())
+            self.assertEqual(version, "0.10.6")
+            self.assertLessEqual(request.call_args[1]["timeout"], 0.5)
+
+            status, _ = self.handler.server_status(10, deadline=-1)
+        self.assertEqual(status.code, Status.DEADLINE_EXCEEDED)
+        self.assertEqual(request.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
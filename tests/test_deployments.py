@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import deployments
+from http_request.handler import HttpHandler
+from http_request.local_handler import LocalHandler
+
+
+def square(origin, steps=4):
+    x, y = origin
+    ring = [[x + i / steps, y] for i in range(steps)]
+    ring += [[x + 1, y + i / steps] for i in range(steps)]
+    ring += [[x + 1 - i / steps, y + 1] for i in range(steps)]
+    ring += [[x, y + 1 - i / steps] for i in range(steps)]
+    return ring + [[x, y]]
+
+
+class LoadRingsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "features.geojson")
+        features = [{
+            "type": "Feature",
+            "properties": {},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [square(origin)]
+            }
+        } for origin in [(0, 0), (5, 5)]]
+        with open(self.path, mode='w', encoding='utf-8') as file:
+            json.dump({"type": "FeatureCollection", "features": features},
+                      file)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_rings_keep_their_feature_index(self):
+        rings = deployments.load_rings(self.path)
+        self.assertEqual([index for index, _ in rings], [0, 1])
+        self.assertEqual(len(rings[1][1]), 17)
+
+        rings = deployments.load_rings(self.path, tolerance=0.01)
+        self.assertEqual([index for index, _ in rings], [0, 1])
+        self.assertEqual(rings[1][1][0], [5.0, 5.0])
+        self.assertEqual(len(rings[0][1]), 5)
+
+
+class HandlerFactoryTest(unittest.TestCase):
+    def test_the_handler_follows_the_settings(self):
+        with mock.patch.object(deployments, "MILVUS_TARGET_RECALL", None):
+            self.assertIsNone(deployments.autotune_options())
+            with mock.patch.object(deployments, "MILVUS_LOCAL_PATH", None):
+                self.assertIsInstance(deployments.create_handler(),
+                                      HttpHandler)
+
+    def test_each_process_opens_its_own_handler(self):
+        with tempfile.TemporaryDirectory() as path, \
+                mock.patch.object(deployments, "MILVUS_LOCAL_PATH", path), \
+                mock.patch.object(deployments, "_handler", None), \
+                mock.patch.object(deployments, "_handler_pid", None):
+            handler = deployments.shared_handler()
+            self.assertIsInstance(handler, LocalHandler)
+            self.assertIs(deployments.shared_handler(), handler)
+            handler.close()
+            with mock.patch.object(deployments.os,
+                                   "getpid",
+                                   return_value=os.getpid() + 1):
+                other = deployments.shared_handler()
+            self.assertIsNot(other, handler)
+            other.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import unittest
+
+import numpy as np
+
+from http_request.encoder import VECTORS, VectorEncoder, shortest_digits
+
+
+class ShortestDigitsTest(unittest.TestCase):
+    def test_values_round_trip(self):
+        values = np.random.RandomState(7).standard_normal(
+            (64, 16)).astype(np.float32)
+        values[0, :4] = [0.0, 0.5, 1e-30, 3.4e38]
+        digits = shortest_digits(values)
+        self.assertEqual(digits.shape, values.shape)
+        for value, count in zip(values.ravel(), digits.ravel()):
+            text = "%.{}g".format(count) % float(value)
+            self.assertEqual(np.float32(float(text)), value)
+        self.assertEqual(digits[0, :2].tolist(), [1, 1])
+
+    def test_whole_numbers_stay_positional(self):
+        values = np.array([[100.0, 123456.0]], dtype=np.float32)
+        digits = shortest_digits(values)
+        self.assertEqual(["%.{}g".format(count) % value for value, count in
+                          zip(values.ravel().tolist(), digits.ravel())],
+                         ["100", "123456"])
+
+
+class VectorEncoderTest(unittest.TestCase):
+    def test_float_vectors(self):
+        encoder = VectorEncoder()
+        vectors = [[0.1, 2.0, -3.5], [1e-8, 0.0, 100.0]]
+        text = encoder.encode_vectors(vectors)
+        self.assertEqual(text, "[[0.1,2,-3.5],[1e-08,0,100]]")
+        self.assertEqual(
+            np.array(json.loads(text), np.float32).tolist(),
+            np.array(vectors, np.float32).tolist())
+
+    def test_fixed_digits(self):
+        encoder = VectorEncoder(digits=3)
+        self.assertEqual(encoder.digits, 3)
+        self.assertEqual(encoder.encode_vectors(np.array([[0.123456, 2.0]])),
+                         "[[0.123,2]]")
+        with self.assertRaises(ValueError):
+            VectorEncoder(digits=0)
+
+    def test_binary_and_irregular_vectors(self):
+        encoder = VectorEncoder()
+        self.assertEqual(encoder.encode_vectors([b"\x01\xff", b"\x00\x02"]),
+                         "[[1,255],[0,2]]")
+        self.assertEqual(encoder.encode_vectors([[1, 2], [3]]),
+                         "[[1, 2], [3]]")
+        self.assertEqual(encoder.encode_vectors(np.empty((0, 4))), "[]")
+
+    def test_dumps_replaces_the_marker(self):
+        encoder = VectorEncoder()
+        body = encoder.dumps({"search": {"topk": 2, "vectors": VECTORS}},
+                             np.array([[1.5, 2.0]], np.float32))
+        self.assertEqual(json.loads(body),
+                         {"search": {"topk": 2, "vectors": [[1.5, 2.0]]}})
+        with self.assertRaises(TypeError):
+            encoder.dumps({"vectors": VECTORS, "other": object()}, [[1.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from http_request import evaluation
+from http_request.constants import MetricType
+from milvus import ParamError
+from tests import filled_handler
+
+
+class ExcludeTest(unittest.TestCase):
+    def test_excluded_ids_are_dropped_and_rows_padded(self):
+        ids = np.array([[5, 1, 2], [3, 4, 6], [7, -1, -1]])
+        excluded = evaluation.exclude(ids, [5, 4, 8], 2)
+        np.testing.assert_array_equal(excluded, [[1, 2], [3, 6], [7, -1]])
+
+    def test_ground_truth_leaves_out_the_query_itself(self):
+        vectors = np.random.default_rng(1).random((50, 4), dtype=np.float32)
+        rows = np.array([3, 10, 42])
+        truth, distances = evaluation.ground_truth(MetricType.L2,
+                                                   vectors[rows],
+                                                   vectors,
+                                                   5,
+                                                   exclude_ids=rows)
+        self.assertEqual(truth.shape, (3, 5))
+        self.assertFalse((truth == rows[:, None]).any())
+        self.assertTrue((distances > 0).all())
+
+
+class EvaluateTest(unittest.TestCase):
+    def setUp(self):
+        self.handler, _ = filled_handler(300, 8)
+        self.handler.create_partition("vectors", "old")
+        self.handler.add_vectors("vectors",
+                                 np.random.default_rng(1).random(
+                                     (300, 8), dtype=np.float32),
+                                 ids=list(range(300, 600)),
+                                 partition_tag="old")
+
+    def test_sampled_queries_do_not_count_themselves(self):
+        handler = self.handler
+        status, ids, queries = evaluation.sample_queries(
+            handler, "vectors", 20)
+        self.assertTrue(status.ok())
+        with tempfile.TemporaryDirectory() as directory:
+            status, truth = evaluation.collection_ground_truth(
+                handler, "vectors", queries, 10, directory, exclude_ids=ids)
+        self.assertTrue(status.ok())
+        self.assertFalse((truth == ids[:, None]).any())
+
+        report = evaluation.evaluate(handler,
+                                     "vectors",
+                                     queries,
+                                     truth,
+                                     10, [{}],
+                                     exclude_ids=ids)
+        self.assertEqual(report.results[0].recall, 1.0)
+
+        # searches dropping a true neighbour are no longer hidden by the
+        # query finding itself
+        report = evaluation.evaluate(handler, "vectors", queries,
+                                     np.roll(truth, 1, axis=0), 10, [{}],
+                                     exclude_ids=ids)
+        self.assertLess(report.results[0].recall, 0.5)
+
+    def test_partitions_searched_match_the_truth(self):
+        handler = self.handler
+        queries = np.random.default_rng(2).random((5, 8), dtype=np.float32)
+        with tempfile.TemporaryDirectory() as directory:
+            status, truth = evaluation.collection_ground_truth(
+                handler, "vectors", queries, 10, directory)
+        with self.assertRaises(ParamError):
+            evaluation.evaluate(handler,
+                                "vectors",
+                                queries,
+                                truth,
+                                10, [{}],
+                                partition_tags=["old"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            status, truth = evaluation.collection_ground_truth(
+                handler,
+                "vectors",
+                queries,
+                10,
+                directory,
+                partition_tags=["old"])
+        self.assertTrue(status.ok())
+        self.assertTrue((truth >= 300).all())
+        report = evaluation.evaluate(handler,
+                                     "vectors",
+                                     queries,
+                                     truth,
+                                     10, [{}],
+                                     partition_tags=["old"],
+                                     truth_partition_tags=["old"])
+        self.assertEqual(report.results[0].recall, 1.0)
+
+    def test_an_export_of_other_partitions_is_not_resumed(self):
+        handler = self.handler
+        queries = np.zeros((1, 8), dtype=np.float32)
+        with tempfile.TemporaryDirectory() as directory:
+            status, _ = evaluation.collection_ground_truth(
+                handler, "vectors", queries, 10, directory)
+            self.assertTrue(status.ok())
+            status, _ = evaluation.collection_ground_truth(
+                handler,
+                "vectors",
+                queries,
+                10,
+                directory,
+                partition_tags=["old"])
+            self.assertFalse(status.ok())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from http_request.constants import MetricType, Status
+from http_request.export import (IDS, MANIFEST, VECTORS, CollectionExporter,
+                                 export_collection)
+from tests import filled_handler
+
+
+class CollectionExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.directory = self.temp.name
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def load(self):
+        return (np.load(os.path.join(self.directory, IDS)),
+                np.load(os.path.join(self.directory, VECTORS)))
+
+    def test_the_collection_is_exported(self):
+        handler, vectors = filled_handler()
+        status, manifest = export_collection(handler,
+                                             "vectors",
+                                             self.directory,
+                                             chunk_size=40,
+                                             page_size=64)
+        self.assertTrue(status.ok())
+        self.assertTrue(manifest.complete)
+        self.assertEqual(manifest.document["total"], 250)
+        ids, exported = self.load()
+        np.testing.assert_array_equal(exported, vectors[ids])
+        self.assertEqual(sorted(ids.tolist()), list(range(250)))
+
+    def test_an_interrupted_export_resumes(self):
+        handler, vectors = filled_handler()
+        fetch = handler.get_vectors_by_ids
+        calls = []
+
+        def failing(collection_name, ids, timeout):
+            calls.append(ids)
+            if len(calls) == 3:
+                return Status(Status.UNEXPECTED_ERROR, "gone"), []
+            return fetch(collection_name, ids, timeout)
+
+        exporter = CollectionExporter(handler,
+                                      "vectors",
+                                      self.directory,
+                                      chunk_size=50,
+                                      max_workers=1)
+        with mock.patch.object(handler, "get_vectors_by_ids",
+                               side_effect=failing):
+            status, manifest = exporter.run()
+        self.assertFalse(status.ok())
+        self.assertFalse(manifest.complete)
+        done = len(manifest.document["chunks_done"])
+        self.assertLess(done, 5)
+
+        with mock.patch.object(handler, "get_vectors_by_ids",
+                               side_effect=fetch) as resumed:
+            status, manifest = exporter.run()
+        self.assertTrue(status.ok())
+        self.assertEqual(resumed.call_count, 5 - done)
+        ids, exported = self.load()
+        np.testing.assert_array_equal(exported, vectors[ids])
+
+    def test_vectors_deleted_midway_are_reported_missing(self):
+        handler, _ = filled_handler()
+        fetch = handler.get_vectors_by_ids
+
+        def deleting(collection_name, ids, timeout):
+            handler.delete_by_id(collection_name, [ids[0]])
+            return fetch(collection_name, ids, timeout)
+
+        with mock.patch.object(handler, "get_vectors_by_ids",
+                               side_effect=deleting):
+            status, manifest = export_collection(handler,
+                                                 "vectors",
+                                                 self.directory,
+                                                 chunk_size=100,
+                                                 max_workers=1)
+        self.assertTrue(status.ok())
+        self.assertEqual(sorted(manifest.document["missing"]), [0, 100, 200])
+
+    def test_another_collection_is_not_resumed(self):
+        handler, _ = filled_handler(10)
+        handler.create_collection("other", 4, 1024, MetricType.L2)
+        status, _ = export_collection(handler, "vectors", self.directory)
+        self.assertTrue(status.ok())
+        self.assertTrue(os.path.exists(os.path.join(self.directory,
+                                                    MANIFEST)))
+        status, _ = export_collection(handler, "other", self.directory)
+        self.assertEqual(status.code, Status.ILLEGAL_ARGUMENT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+import numpy as np
+
+from deployments.feature_ids import (FeatureIdCodec, group_by_feature,
+                                     search_features)
+from http_request.constants import MetricType
+from http_request.local_handler import LocalHandler
+from milvus import ParamError
+
+
+class FeatureIdCodecTest(unittest.TestCase):
+    def test_round_trip(self):
+        codec = FeatureIdCodec(vertex_bits=4)
+        ids = codec.encode_ring(3, 5)
+        self.assertEqual(ids.tolist(), [48, 49, 50, 51, 52])
+        self.assertEqual(codec.feature_of(ids).tolist(), [3] * 5)
+        self.assertEqual(codec.feature_of([-1, 17]).tolist(), [-1, 1])
+
+    def test_vertices_are_numbered_within_their_feature(self):
+        codec = FeatureIdCodec(vertex_bits=4)
+        ids = codec.encode_features([0, 0, 2, 2, 2])
+        self.assertEqual(ids.tolist(), [0, 1, 32, 33, 34])
+        self.assertEqual(len(codec.encode_features([])), 0)
+
+    def test_ranges_are_checked(self):
+        with self.assertRaises(ParamError):
+            FeatureIdCodec(vertex_bits=63)
+        codec = FeatureIdCodec(vertex_bits=4)
+        with self.assertRaises(ParamError):
+            codec.encode_ring(0, 17)
+        with self.assertRaises(ParamError):
+            codec.encode(-1, 0)
+
+
+class GroupByFeatureTest(unittest.TestCase):
+    def test_the_best_hit_of_every_feature_is_kept(self):
+        features = np.array([[4, 4, 1, 4, 2, -1], [7, -1, -1, -1, -1, -1]])
+        positions, count = group_by_feature(features, top_k=2)
+        self.assertEqual(positions.tolist(), [[0, 2], [0, -1]])
+        self.assertEqual(count.tolist(), [3, 1])
+
+
+class SearchFeaturesTest(unittest.TestCase):
+    def setUp(self):
+        self.codec = FeatureIdCodec(vertex_bits=8)
+        self.handler = LocalHandler()
+        self.handler.create_collection("shapes", 2, 1024, MetricType.L2)
+        # three features of 20 vertices, spread along the x axis
+        vectors, ids = [], []
+        for feature in range(3):
+            vectors += [[feature * 10.0 + vertex * 0.01, 0.0]
+                        for vertex in range(20)]
+            ids += self.codec.encode_ring(feature, 20).tolist()
+        status, _ = self.handler.add_vectors("shapes", vectors, ids=ids)
+        self.assertTrue(status.ok())
+
+    def test_features_are_distinct(self):
+        status, result = search_features(self.handler,
+                                         "shapes", [[0.0, 0.0]],
+                                         top_k=3,
+                                         codec=self.codec,
+                                         over_fetch=2)
+        self.assertTrue(status.ok())
+        # the first search only returns vertices of feature 0, the retry
+        # doubles the topk until the other features show up
+        self.assertEqual(result.shape, (1, 3))
+        self.assertEqual(result.features.tolist(), [[0, 1, 2]])
+        self.assertEqual(result.ids[0].tolist(),
+                         self.codec.encode([0, 1, 2], 0).tolist())
+        self.assertEqual(result.distances[0, 0], 0.0)
+
+    def test_missing_features_are_padded(self):
+        status, result = search_features(self.handler,
+                                         "shapes", [[0.0, 0.0]],
+                                         top_k=4,
+                                         codec=self.codec,
+                                         max_top_k=64)
+        self.assertTrue(status.ok())
+        self.assertEqual(result.features.tolist(), [[0, 1, 2, -1]])
+        self.assertEqual(result.ids[0, 3], -1)
+        self.assertEqual(result.distances[0, 3], np.inf)
+
+        self.handler.create_collection("empty", 2, 1024, MetricType.L2)
+        status, result = search_features(self.handler, "empty",
+                                         [[0.0, 0.0], [1.0, 0.0]],
+                                         top_k=2,
+                                         codec=self.codec)
+        self.assertTrue(status.ok())
+        self.assertEqual(result.features.tolist(), [[-1, -1]] * 2)
+        self.assertEqual(result.ids.tolist(), [[-1, -1]] * 2)
+        self.assertTrue(np.isinf(result.distances).all())
+
+        status, result = search_features(self.handler, "missing",
+                                         [[0.0, 0.0]], top_k=1)
+        self.assertFalse(status.ok())
+        self.assertIsNone(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from deployments.geo_partition import (GeoTilePartitioner, parse_tile_tag,
+                                       tile_tag)
+from tests import filled_handler
+
+
+class TileTagTest(unittest.TestCase):
+    def test_round_trip(self):
+        for tile in [(0, 0), (3, -7), (-12, 5)]:
+            self.assertEqual(parse_tile_tag(tile_tag(*tile)), tile)
+        self.assertEqual(tile_tag(-1, 2), "tile_m1_2")
+        self.assertIsNone(parse_tile_tag("_default"))
+        self.assertIsNone(parse_tile_tag("tile_a_b"))
+
+
+class GeoTilePartitionerTest(unittest.TestCase):
+    def test_vectors_go_to_the_partition_of_their_tile(self):
+        handler, _ = filled_handler(0, 2, collection_names=("points", ))
+        partitioner = GeoTilePartitioner(handler, "points", tile_size=10)
+        status, ids = partitioner.add_vectors([[1.0, 1.0], [-5.0, 12.0]],
+                                              ids=[1, 2])
+        self.assertTrue(status.ok())
+        self.assertEqual(ids, [1, 2])
+        self.assertEqual(partitioner.tiles, {(0, 0), (-1, 1)})
+
+    def test_a_tile_created_by_another_partitioner_is_reused(self):
+        handler, _ = filled_handler(0, 2, collection_names=("points", ))
+        first = GeoTilePartitioner(handler, "points", tile_size=10)
+        second = GeoTilePartitioner(handler, "points", tile_size=10)
+        # both listed the partitions before either created the tile
+        self.assertEqual(first.tiles, set())
+        self.assertEqual(second.tiles, set())
+        self.assertTrue(first.add_vectors([[1.0, 1.0]], ids=[1])[0].ok())
+
+        status, ids = second.add_vectors([[2.0, 2.0]], ids=[2])
+        self.assertTrue(status.ok())
+        self.assertEqual(ids, [2])
+        status, count = handler.get_table_row_count("points")
+        self.assertEqual(count, 2)
+
+    def test_search_widens_to_neighbouring_tiles(self):
+        handler, _ = filled_handler(0, 2, collection_names=("points", ))
+        partitioner = GeoTilePartitioner(handler,
+                                         "points",
+                                         tile_size=10,
+                                         squared_distance=True)
+        records = np.array([[9.5, 5.0], [10.5, 5.0], [35.0, 35.0]])
+        partitioner.add_vectors(records, ids=[1, 2, 3])
+        status, results, tags = partitioner.search_vectors([[9.0, 5.0]], 2)
+        self.assertTrue(status.ok())
+        self.assertEqual([hit.id for hit in results[0]], [1, 2])
+        self.assertIn(tile_tag(1, 0), tags)
+        self.assertNotIn(tile_tag(3, 3), tags)
+
+
+if __name__ == "__main__":
+    unittest.main()
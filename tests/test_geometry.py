@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from deployments.geometry import (DOUGLAS_PEUCKER, GRID_SNAP,
+                                  douglas_peucker, simplify_features,
+                                  simplify_rings, snap_to_grid)
+from milvus import ParamError
+
+
+def square_ring(steps=10):
+    """
+    Closed unit square with `steps` collinear vertices on every edge
+    """
+    edge = np.linspace(0, 1, steps, endpoint=False)
+    points = np.concatenate([
+        np.stack([edge, np.zeros(steps)], axis=1),
+        np.stack([np.ones(steps), edge], axis=1),
+        np.stack([1 - edge, np.ones(steps)], axis=1),
+        np.stack([np.zeros(steps), 1 - edge], axis=1),
+        [[0.0, 0.0]],
+    ])
+    return points
+
+
+class DouglasPeuckerTest(unittest.TestCase):
+    def test_collinear_vertices_are_dropped(self):
+        points = square_ring()
+        kept = points[douglas_peucker(points, 0.01)]
+        self.assertEqual(
+            sorted(map(tuple, kept.tolist())),
+            sorted([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0),
+                    (0.0, 0.0)]))
+
+    def test_vertices_further_than_the_tolerance_stay(self):
+        points = np.array([[0.0, 0.0], [1.0, 0.05], [2.0, 0.0]])
+        self.assertEqual(douglas_peucker(points, 0.1).tolist(),
+                         [True, False, True])
+        self.assertEqual(douglas_peucker(points, 0.01).tolist(),
+                         [True, True, True])
+        self.assertEqual(len(douglas_peucker(np.empty((0, 2)), 1.0)), 0)
+
+
+class GridSnapTest(unittest.TestCase):
+    def test_first_vertex_of_every_cell_is_kept(self):
+        points = np.array([[0.1, 0.1], [0.2, 0.2], [1.5, 0.1], [0.3, 0.4]])
+        self.assertEqual(snap_to_grid(points, 1.0).tolist(),
+                         [True, False, True, False])
+
+
+class SimplifyRingsTest(unittest.TestCase):
+    def test_features_keep_their_index(self):
+        rings = [square_ring().tolist(), [[5, 5], [6, 5], [6, 6], [5, 5]]]
+        simplified = simplify_rings(rings, tolerance=0.01)
+        self.assertEqual(simplified.original_count, 41 + 4)
+        self.assertEqual(simplified.count, 5 + 4)
+        self.assertAlmostEqual(simplified.ratio, 45 / 9)
+        records = list(simplified.feature_records())
+        self.assertEqual([index for index, _ in records], [0, 1])
+        self.assertEqual(records[1][1].tolist(),
+                         [[5, 5], [6, 5], [6, 6], [5, 5]])
+
+    def test_features_and_methods(self):
+        features = [{"geometry": {"coordinates": [square_ring().tolist()]}}]
+        # the ring crosses every cell of a 3x3 grid but the centre one
+        simplified = simplify_features(features, 0.5, method=GRID_SNAP)
+        self.assertEqual(simplified.count, 8)
+        with self.assertRaises(ParamError):
+            simplify_rings([[[0, 0]]], 1.0, method="unknown")
+        empty = simplify_rings([], 1.0, method=DOUGLAS_PEUCKER)
+        self.assertEqual(empty.count, 0)
+        self.assertEqual(list(empty.feature_records()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
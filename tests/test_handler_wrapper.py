@@ -0,0 +1,78 @@
+import unittest
+
+import requests
+
+from http_request.constants import Status
+from http_request.deadline import Deadline
+from http_request.handler_wrapper import handle_error
+from http_request.retry import RetryPolicy
+
+
+class Client:
+    def __init__(self, failures=0):
+        self._retry_policy = RetryPolicy(max_attempts=3, base_delay=0)
+        self.failures = failures
+        self.calls = {"inner": 0, "outer": 0}
+
+    @handle_error(returns=(None, ))
+    def inner(self):
+        self.calls["inner"] += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise requests.exceptions.ConnectionError("refused")
+        return Status(), "value"
+
+    @handle_error(returns=(None, ))
+    def outer(self):
+        self.calls["outer"] += 1
+        status, value = self.inner()
+        if not status.ok():
+            return status, None
+        return Status(), value.upper()
+
+    @handle_error(returns=(None, ), idempotent=False)
+    def write(self):
+        self.calls["outer"] += 1
+        return self.inner()
+
+
+class HandleErrorTest(unittest.TestCase):
+    def test_errors_are_retried(self):
+        client = Client(failures=2)
+        status, value = client.inner()
+        self.assertTrue(status.ok())
+        self.assertEqual(client.calls["inner"], 3)
+
+        client = Client(failures=3)
+        status, value = client.inner()
+        self.assertEqual(status.code, Status.CONNECT_FAILED)
+        self.assertIsNone(value)
+
+    def test_nested_calls_do_not_multiply_attempts(self):
+        client = Client(failures=10)
+        status, _ = client.outer()
+        self.assertEqual(status.code, Status.CONNECT_FAILED)
+        self.assertEqual(client.calls, {"inner": 3, "outer": 3})
+
+    def test_the_outer_call_retries_a_nested_failure(self):
+        client = Client(failures=1)
+        status, value = client.outer()
+        self.assertTrue(status.ok())
+        self.assertEqual(value, "VALUE")
+        self.assertEqual(client.calls, {"inner": 2, "outer": 2})
+
+    def test_a_non_idempotent_outer_call_is_not_retried(self):
+        client = Client(failures=1)
+        status, _ = client.write()
+        self.assertFalse(status.ok())
+        self.assertEqual(client.calls, {"inner": 1, "outer": 1})
+
+    def test_an_expired_deadline_fails_before_the_call(self):
+        client = Client()
+        status, _ = client.inner(deadline=Deadline(-1))
+        self.assertEqual(status.code, Status.DEADLINE_EXCEEDED)
+        self.assertEqual(client.calls["inner"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
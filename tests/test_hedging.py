@@ -0,0 +1,148 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from http_request import handler as handler_module
+from http_request.hedging import Hedger, LatencyTracker
+
+
+class Response:
+    def __init__(self, endpoint, document=None, status_code=200):
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.closed = False
+        self._document = document or {}
+
+    def json(self):
+        return self._document
+
+    def close(self):
+        self.closed = True
+
+
+def warmed(hedger, operation, latency=0.01, count=20):
+    for _ in range(count):
+        hedger.tracker.record(operation, latency)
+    return hedger
+
+
+class LatencyTrackerTest(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker(window=4)
+        self.assertIsNone(tracker.percentile("search", 95))
+        for latency in [5.0, 1.0, 2.0, 3.0, 4.0]:
+            tracker.record("search", latency)
+        self.assertEqual(tracker.count("search"), 4)
+        self.assertEqual(tracker.percentile("search", 100), 4.0)
+        self.assertEqual(tracker.percentile("search", 0), 1.0)
+
+
+class HedgerTest(unittest.TestCase):
+    def test_requests_without_samples_run_inline(self):
+        hedger = Hedger(["http://a", "http://b"])
+        threads = []
+
+        def send(endpoint):
+            threads.append(threading.current_thread())
+            return Response(endpoint)
+
+        response = hedger.run("search", send)
+        self.assertEqual(response.endpoint, "http://a")
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(hedger.tracker.count("search"), 1)
+
+    def test_slow_primary_is_hedged_and_closed(self):
+        hedger = warmed(Hedger(["http://a", "http://b"], max_ratio=1.0),
+                        "search")
+        release = threading.Event()
+        responses = []
+
+        def send(endpoint):
+            if endpoint == "http://a":
+                release.wait(5)
+            response = Response(endpoint)
+            responses.append(response)
+            return response
+
+        response = hedger.run("search", send)
+        self.assertEqual(response.endpoint, "http://b")
+        release.set()
+        for _ in range(100):
+            if hedger.in_flight == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(hedger.in_flight, 0)
+        loser = [item for item in responses if item.endpoint == "http://a"]
+        self.assertTrue(loser[0].closed)
+        self.assertFalse(response.closed)
+
+    def test_in_flight_requests_are_bounded(self):
+        hedger = warmed(
+            Hedger(["http://a", "http://b"], max_ratio=1.0, max_workers=2),
+            "search")
+        release = threading.Event()
+        threads = []
+
+        def stuck(endpoint):
+            release.wait(5)
+            return Response(endpoint)
+
+        runner = threading.Thread(target=hedger.run, args=("search", stuck))
+        runner.start()
+        for _ in range(100):
+            if hedger.in_flight == 2:
+                break
+            time.sleep(0.01)
+
+        def send(endpoint):
+            threads.append(threading.current_thread())
+            return Response(endpoint)
+
+        # the pool is full, the next request goes inline
+        hedger.run("search", send)
+        self.assertEqual(threads, [threading.current_thread()])
+        release.set()
+        runner.join()
+
+
+class HandlerHedgingTest(unittest.TestCase):
+    def test_a_hedged_search_is_mirrored_once(self):
+        handler = handler_module.HttpHandler(
+            "127.0.0.1",
+            1,
+            replicas=[("127.0.0.2", 1)],
+            hedge={"max_ratio": 1.0},
+            shadow={
+                "targets": {
+                    "vectors": "candidate"
+                },
+                "fraction": 1.0
+            })
+        warmed(handler._hedger, "search_vectors")
+        document = {"num": 1, "result": [[{"id": "1", "distance": "0.5"}]]}
+
+        def request(method, url, **kwargs):
+            if url.startswith(handler._uri):
+                # the primary is slower than the hedge delay
+                time.sleep(0.2)
+            return Response(url, document)
+
+        with mock.patch.object(handler_module.requests, "request",
+                               side_effect=request) as sent, \
+                mock.patch.object(handler._shadow, "mirror") as mirror:
+            status, results = handler.search_vectors("vectors",
+                                                     1, [[0.1, 0.2]],
+                                                     search_params={},
+                                                     validate=False)
+            # the losing request returns meanwhile
+            time.sleep(0.3)
+        self.assertTrue(status.ok())
+        self.assertEqual(results.id_array.tolist(), [[1]])
+        self.assertEqual(mirror.call_count, 1)
+        self.assertEqual(sent.call_count, 2)
+        handler._hedger.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+import numpy as np
+
+from http_request.constants import IndexType, MetricType
+from http_request import ivf, metrics
+from http_request.local_handler import LocalHandler
+
+
+class Sq8RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = (rng.random((4000, 16), dtype=np.float32) * 8 - 3)
+        self.index = ivf.IvfIndex(IndexType.IVF_SQ8, MetricType.L2, 8)
+        self.index.train(self.vectors)
+
+    def test_error_is_unbiased_and_within_half_a_step(self):
+        decoded = self.index.decode(self.index.encode(self.vectors))
+        error = decoded - self.vectors
+        step = self.index._scale / 255.0
+        self.assertTrue(np.all(np.abs(error) <= step / 2 + 1e-5))
+        # rounding errors average out, a shift would be step / 2
+        self.assertTrue(np.all(np.abs(error.mean(axis=0)) < step / 20))
+
+    def test_extremes_decode_exactly(self):
+        low = self.vectors.min(axis=0, keepdims=True)
+        high = self.vectors.max(axis=0, keepdims=True)
+        for value in (low, high):
+            decoded = self.index.decode(self.index.encode(value))
+            np.testing.assert_allclose(decoded, value, atol=1e-5)
+
+    def test_ivf_flat_codes_are_the_vectors(self):
+        index = ivf.IvfIndex(IndexType.IVFLAT, MetricType.L2, 8)
+        index.train(self.vectors)
+        np.testing.assert_array_equal(
+            index.decode(index.encode(self.vectors)), self.vectors)
+
+
+class IvfSearchTest(unittest.TestCase):
+    def test_probing_every_list_is_exact(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.random((3000, 8), dtype=np.float32)
+        queries = rng.random((20, 8), dtype=np.float32)
+        for metric in (MetricType.L2, MetricType.IP):
+            index = ivf.IvfIndex(IndexType.IVFLAT, metric, 16)
+            index.train(vectors)
+            index.add(vectors, np.arange(len(vectors)))
+            scores, rows = metrics.sort_top_k(
+                *index.search(queries, 10, 16, np.ones(3000, dtype=bool)))
+            _, expected = metrics.top_k(metric, queries, vectors, 10)
+            np.testing.assert_array_equal(rows, expected)
+
+    def test_dead_rows_are_skipped(self):
+        rng = np.random.default_rng(2)
+        vectors = rng.random((500, 4), dtype=np.float32)
+        index = ivf.IvfIndex(IndexType.IVF_SQ8, MetricType.L2, 4)
+        index.train(vectors)
+        index.add(vectors, np.arange(500))
+        live = np.ones(500, dtype=bool)
+        live[::2] = False
+        _, rows = index.search(vectors[:10], 20, 4, live)
+        rows = rows[rows >= 0]
+        self.assertTrue(np.all(rows % 2 == 1))
+
+    def test_remap_after_compaction(self):
+        rng = np.random.default_rng(3)
+        vectors = rng.random((400, 4), dtype=np.float32)
+        index = ivf.IvfIndex(IndexType.IVFLAT, MetricType.L2, 4)
+        index.train(vectors)
+        index.add(vectors, np.arange(400))
+        mapping = np.where(np.arange(400) < 200, -1,
+                           np.arange(400) - 200)
+        remapped = index.remapped(mapping)
+        self.assertEqual(len(remapped), 200)
+        _, rows = remapped.search(vectors[300:301], 1, 4,
+                                  np.ones(200, dtype=bool))
+        self.assertEqual(rows[0, 0], 100)
+        # a search running on the old index keeps the old rows
+        self.assertEqual(len(index), 400)
+        _, rows = index.search(vectors[300:301], 1, 4,
+                               np.ones(400, dtype=bool))
+        self.assertEqual(rows[0, 0], 300)
+
+    def test_compaction_swaps_the_index(self):
+        handler = LocalHandler()
+        handler.create_collection("vectors", 4, 1024, MetricType.L2)
+        vectors = np.random.default_rng(4).random((400, 4), dtype=np.float32)
+        handler.add_vectors("vectors", vectors, ids=list(range(400)))
+        handler.create_index("vectors", IndexType.IVFLAT, {"nlist": 4})
+        collection = handler._get("vectors")
+        # what a search took under the lock before the compaction
+        ids, alive, index = collection.ids, collection.alive, collection.ivf
+        size = collection.size
+
+        handler.delete_by_id("vectors", list(range(200)))
+        handler.compact("vectors")
+        self.assertIsNot(collection.ivf, index)
+        _, rows = index.search(vectors[300:301], 1, 4, alive[:size])
+        self.assertEqual(ids[rows[0, 0]], 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from http_request import local_handler
+from http_request.constants import IndexType, MetricType, Status
+from http_request.local_handler import LocalHandler
+from milvus import NotConnectError
+
+
+def vectors(rows, dimension=4, seed=0):
+    return np.random.default_rng(seed).random((rows, dimension),
+                                              dtype=np.float32)
+
+
+class CollectionTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = LocalHandler()
+        status = self.handler.create_collection("vectors", 4, 1024,
+                                                MetricType.L2)
+        self.assertTrue(status.ok())
+
+    def test_collections_are_checked(self):
+        handler = self.handler
+        self.assertEqual(
+            handler.create_collection("vectors", 4, 1024,
+                                      MetricType.L2).code,
+            Status.ILLEGAL_COLLECTION_NAME)
+        self.assertEqual(
+            handler.create_collection("bad-name", 4, 1024,
+                                      MetricType.L2).code,
+            Status.ILLEGAL_COLLECTION_NAME)
+        self.assertEqual(
+            handler.create_collection("hamming", 12, 1024,
+                                      MetricType.HAMMING).code,
+            Status.ILLEGAL_DIMENSION)
+        self.assertEqual(handler.show_collections()[1], ["vectors"])
+        self.assertEqual(handler.describe_collection("vectors")[1].dimension,
+                         4)
+        self.assertTrue(handler.drop_collection("vectors").ok())
+        self.assertFalse(handler.has_collection("vectors")[1])
+        self.assertFalse(handler.get_table_row_count("vectors")[0].ok())
+
+    def test_insert_get_and_delete(self):
+        handler = self.handler
+        data = vectors(3)
+        status, ids = handler.add_vectors("vectors", data, ids=[7, 8, 9])
+        self.assertTrue(status.ok())
+        self.assertEqual(ids, [7, 8, 9])
+
+        # an id inserted again replaces its vector
+        handler.add_vectors("vectors", np.ones((1, 4)), ids=[8])
+        self.assertEqual(handler.get_table_row_count("vectors")[1], 3)
+        _, found = handler.get_vectors_by_ids("vectors", [8, 9, 10])
+        self.assertEqual(found[0], [1.0] * 4)
+        self.assertEqual(found[1], data[2].tolist())
+        self.assertEqual(found[2], [])
+
+        self.assertTrue(handler.delete_by_id("vectors", [7]).ok())
+        self.assertEqual(handler.get_table_row_count("vectors")[1], 2)
+        status, _ = handler.add_vectors("vectors", data)
+        self.assertEqual(status.code, Status.ILLEGAL_VECTOR_ID)
+
+    def test_partitions(self):
+        handler = self.handler
+        self.assertTrue(handler.create_partition("vectors", "old").ok())
+        self.assertFalse(handler.create_partition("vectors", "old").ok())
+        handler.add_vectors("vectors", vectors(2), ids=[1, 2])
+        handler.add_vectors("vectors",
+                            vectors(2, seed=1),
+                            ids=[3, 4],
+                            partition_tag="old")
+        _, partitions = handler.show_partitions("vectors")
+        self.assertEqual([p.tag for p in partitions], ["_default", "old"])
+        _, stats = handler.show_collection_info("vectors")
+        self.assertEqual([p["count"] for p in stats["partitions"]], [2, 2])
+
+        _, results = handler.search_vectors("vectors", 10, vectors(1),
+                                            partition_tags=["old"])
+        self.assertEqual(sorted(results.id_array[0][:2].tolist()), [3, 4])
+        self.assertFalse(handler.drop_partition("vectors", "_default").ok())
+        self.assertTrue(handler.drop_partition("vectors", "old").ok())
+        self.assertEqual(handler.get_table_row_count("vectors")[1], 2)
+
+
+class SearchTest(unittest.TestCase):
+    def test_exact_search(self):
+        handler = LocalHandler()
+        handler.create_collection("vectors", 4, 1024, MetricType.L2)
+        data = vectors(100)
+        handler.add_vectors("vectors", data, ids=list(range(100)))
+        status, results = handler.search_vectors("vectors", 3, data[:2])
+        self.assertTrue(status.ok())
+        self.assertEqual(results.id_array[:, 0].tolist(), [0, 1])
+        # squared L2 like the server's
+        expected = ((data - data[0])**2).sum(axis=1)
+        np.testing.assert_allclose(results.distance_array[0],
+                                   np.sort(expected)[:3],
+                                   atol=1e-6)
+
+        status, by_ids = handler.search_by_ids("vectors", [5], 1)
+        self.assertEqual(by_ids.id_array[0].tolist(), [5])
+        status, _ = handler.search_by_ids("vectors", [500], 1)
+        self.assertEqual(status.code, Status.ILLEGAL_VECTOR_ID)
+
+    def test_ivf_index(self):
+        handler = LocalHandler()
+        handler.create_collection("vectors", 4, 1024, MetricType.L2)
+        data = vectors(500)
+        handler.add_vectors("vectors", data, ids=list(range(500)))
+        status = handler.create_index("vectors", IndexType.IVF_FLAT,
+                                      {"nlist": 8})
+        self.assertTrue(status.ok())
+        _, results = handler.search_vectors("vectors",
+                                            1,
+                                            data[:20],
+                                            search_params={"nprobe": 8})
+        self.assertEqual(results.id_array[:, 0].tolist(), list(range(20)))
+        self.assertEqual(
+            handler.create_index("vectors", IndexType.IVF_FLAT,
+                                 {"nlist": 0}).code, Status.ILLEGAL_NLIST)
+
+
+class PersistenceTest(unittest.TestCase):
+    def test_collections_are_reopened(self):
+        data = vectors(10)
+        with tempfile.TemporaryDirectory() as path:
+            with LocalHandler(path) as handler:
+                handler.create_collection("vectors", 4, 1024,
+                                          MetricType.IP)
+                handler.create_partition("vectors", "old")
+                handler.add_vectors("vectors",
+                                    data,
+                                    ids=list(range(10)),
+                                    partition_tag="old")
+                handler.delete_by_id("vectors", [3])
+
+            with LocalHandler(path) as handler:
+                self.assertEqual(handler.get_table_row_count("vectors")[1],
+                                 9)
+                self.assertTrue(handler.has_partition("vectors", "old")[1])
+                _, found = handler.get_vectors_by_ids("vectors", [2, 3])
+                self.assertEqual(found[0], data[2].tolist())
+                self.assertEqual(found[1], [])
+                schema = handler.describe_collection("vectors")[1]
+                self.assertEqual(MetricType(schema.metric_type),
+                                 MetricType.IP)
+
+    def test_a_directory_serves_one_handler(self):
+        with tempfile.TemporaryDirectory() as path:
+            with LocalHandler(path) as handler:
+                with self.assertRaises(NotConnectError):
+                    LocalHandler(path)
+                handler.create_collection("vectors", 4, 1024, MetricType.L2)
+            with LocalHandler(path) as handler:
+                self.assertEqual(handler.show_collections()[1], ["vectors"])
+
+    def test_a_forked_process_is_refused(self):
+        with tempfile.TemporaryDirectory() as path:
+            with LocalHandler(path) as handler:
+                with mock.patch.object(local_handler.os,
+                                       "getpid",
+                                       return_value=os.getpid() + 1):
+                    with self.assertRaises(NotConnectError):
+                        handler.show_collections()
+                    # the parent saves the collections, not the child
+                    handler.close()
+                self.assertEqual(handler.show_collections()[1], [])
+
+
+class DeadlineTest(unittest.TestCase):
+    def test_every_call_takes_a_deadline(self):
+        handler = LocalHandler()
+        status = handler.create_collection("vectors",
+                                           4,
+                                           1024,
+                                           MetricType.L2,
+                                           deadline=5)
+        self.assertTrue(status.ok())
+        status, ids = handler.add_vectors("vectors",
+                                          vectors(2),
+                                          ids=[1, 2],
+                                          deadline=5)
+        self.assertEqual(ids, [1, 2])
+
+        status, results = handler.search_vectors("vectors",
+                                                 1,
+                                                 vectors(1),
+                                                 deadline=-1)
+        self.assertEqual(status.code, Status.DEADLINE_EXCEEDED)
+        self.assertIsNone(results)
+        status = handler.delete_by_id("vectors", [1], deadline=-1)
+        self.assertEqual(status.code, Status.DEADLINE_EXCEEDED)
+        self.assertEqual(handler.get_table_row_count("vectors")[1], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
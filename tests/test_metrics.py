@@ -0,0 +1,124 @@
+import unittest
+
+import numpy as np
+
+from http_request import metrics
+from http_request.constants import MetricType
+
+
+def reference(metric_type, queries, vectors):
+    """
+    Distances computed pair by pair from the unpacked bits
+    """
+    result = np.empty((len(queries), len(vectors)), dtype=np.float64)
+    for i, query in enumerate(queries):
+        for j, vector in enumerate(vectors):
+            if metric_type == MetricType.L2:
+                result[i, j] = ((query - vector)**2).sum()
+                continue
+            if metric_type == MetricType.IP:
+                result[i, j] = (query * vector).sum()
+                continue
+
+            a = np.unpackbits(query).astype(bool)
+            b = np.unpackbits(vector).astype(bool)
+            both, union = (a & b).sum(), (a | b).sum()
+            similarity = both / union if union else 1.0
+            if metric_type == MetricType.HAMMING:
+                result[i, j] = (a ^ b).sum()
+            elif metric_type == MetricType.TANIMOTO:
+                result[i, j] = -np.log2(similarity) if both else np.inf
+            elif metric_type == MetricType.SUBSTRUCTURE:
+                result[i, j] = 1 - similarity if both == a.sum() else np.inf
+            elif metric_type == MetricType.SUPERSTRUCTURE:
+                result[i, j] = 1 - similarity if both == b.sum() else np.inf
+            else:
+                result[i, j] = 1 - similarity
+    return result
+
+
+def data(metric_type, rows, seed):
+    rng = np.random.default_rng(seed)
+    if metrics.is_binary(metric_type):
+        # sparse bits so that some vectors contain the queries
+        bits = rng.random((rows, 40)) < 0.2
+        return np.packbits(bits, axis=1)
+    return rng.random((rows, 6), dtype=np.float32)
+
+
+class DistancesTest(unittest.TestCase):
+    def test_every_metric_matches_the_reference(self):
+        for metric_type in metrics.FLOAT_METRICS + metrics.BINARY_METRICS:
+            queries = data(metric_type, 5, 1)
+            vectors = data(metric_type, 37, 2)
+            vectors[0] = queries[0]
+            expected = reference(metric_type, queries, vectors)
+            # tiny tiles exercise the tiling
+            for max_bytes in (metrics.MAX_BYTES, 64):
+                np.testing.assert_allclose(metrics.distances(
+                    metric_type, queries, vectors, max_bytes=max_bytes),
+                                           expected,
+                                           rtol=1e-5,
+                                           atol=1e-5,
+                                           err_msg=metric_type.name)
+
+    def test_bit_counts(self):
+        rows = np.packbits(np.eye(24, dtype=bool)[:3], axis=1)
+        self.assertEqual(metrics.bit_counts(rows).tolist(), [1, 1, 1])
+        self.assertEqual(metrics.bit_counts(np.full((1, 33), 255,
+                                                    np.uint8)).tolist(),
+                         [264])
+
+
+class TopKTest(unittest.TestCase):
+    def test_every_metric_matches_a_sort(self):
+        for metric_type in metrics.FLOAT_METRICS + metrics.BINARY_METRICS:
+            queries = data(metric_type, 4, 3)
+            vectors = data(metric_type, 50, 4)
+            live = np.arange(50) % 3 != 0
+            distances, rows = metrics.top_k(metric_type,
+                                            queries,
+                                            vectors,
+                                            5,
+                                            live=live,
+                                            max_bytes=256)
+            expected = reference(metric_type, queries, vectors)
+            if metric_type == MetricType.IP:
+                expected = -expected
+            expected[:, ~live] = np.inf
+            expected = metrics.to_distances(
+                metric_type,
+                np.sort(expected, axis=1)[:, :5])
+            np.testing.assert_allclose(distances, expected, rtol=1e-5,
+                                       atol=1e-5, err_msg=metric_type.name)
+            self.assertTrue(live[rows[rows >= 0]].all())
+            self.assertTrue((rows[~np.isfinite(distances)] == -1).all())
+
+    def test_rows_are_padded(self):
+        distances, rows = metrics.top_k(MetricType.L2,
+                                        np.zeros((1, 2)),
+                                        np.array([[2.0, 0.0], [1.0, 0.0]]), 4)
+        self.assertEqual(rows.tolist(), [[1, 0, -1, -1]])
+        self.assertEqual(distances[0].tolist(), [1.0, 4.0, np.inf, np.inf])
+
+
+class CandidateScoresTest(unittest.TestCase):
+    def test_scores_of_candidates(self):
+        for metric_type in (MetricType.L2, MetricType.IP,
+                            MetricType.JACCARD):
+            queries = data(metric_type, 3, 5)
+            vectors = data(metric_type, 20, 6)
+            rows = np.array([[4, 7, -1], [0, 1, 2], [19, -1, -1]])
+            scores = metrics.candidate_scores(metric_type, queries, vectors,
+                                              rows, max_bytes=64)
+            full = metrics.scores(metric_type, queries, vectors)
+            expected = np.where(rows >= 0,
+                                np.take_along_axis(full,
+                                                   np.maximum(rows, 0),
+                                                   axis=1), np.inf)
+            np.testing.assert_allclose(scores, expected, rtol=1e-5,
+                                       atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from http_request.constants import IndexType
+from http_request.rerank import fetch_vectors, search_and_rerank
+from http_request.vector_cache import VectorCache
+from tests import filled_handler
+
+
+INDEX = {"index_type": IndexType.IVF_SQ8, "index_params": {"nlist": 16}}
+
+
+class FetchVectorsTest(unittest.TestCase):
+    def test_cached_vectors_are_not_fetched(self):
+        handler, data = filled_handler(10, 8, **INDEX)
+        cache = VectorCache()
+        cache.put("vectors", [1, 2], data[[1, 2]])
+        with mock.patch.object(handler,
+                               "get_vectors_by_ids",
+                               wraps=handler.get_vectors_by_ids) as fetch:
+            status, vectors, found, cached = fetch_vectors(handler,
+                                                           "vectors",
+                                                           [1, 2, 3, 99],
+                                                           False,
+                                                           8,
+                                                           cache=cache,
+                                                           chunk_size=1)
+        self.assertTrue(status.ok())
+        self.assertEqual([call[0][1] for call in fetch.call_args_list],
+                         [[3], [99]])
+        self.assertEqual(found.tolist(), [True, True, True, False])
+        self.assertEqual(cached.tolist(), [True, True, False, False])
+        np.testing.assert_array_equal(vectors[:3], data[[1, 2, 3]])
+        _, hit = cache.get("vectors", [3])
+        self.assertTrue(hit.all())
+
+
+class SearchAndRerankTest(unittest.TestCase):
+    def test_candidates_are_reordered_exactly(self):
+        handler, data = filled_handler(2000, 8, **INDEX)
+        queries = data[:20] + 0.01
+        status, results, report = search_and_rerank(
+            handler,
+            "vectors",
+            5,
+            queries,
+            candidates=50,
+            search_params={"nprobe": 16})
+        self.assertTrue(status.ok())
+        self.assertEqual(report.candidates, 50)
+        self.assertEqual(report.fetched, len(np.unique(
+            handler.search_vectors("vectors", 50, queries,
+                                   search_params={"nprobe": 16})[1]
+            .id_array)))
+
+        # nprobe covering every list, the candidates hold the exact top 5
+        ids = results.id_array
+        distances = ((data[ids] - queries[:, None, :])**2).sum(axis=2)
+        np.testing.assert_allclose(results.distance_array, distances,
+                                   rtol=1e-5)
+        self.assertTrue((np.diff(results.distance_array, axis=1) >= 0).all())
+        exact = np.argsort(((data[None] - queries[:, None])**2).sum(axis=2),
+                           axis=1)[:, :5]
+        np.testing.assert_array_equal(ids, exact)
+        self.assertIsNotNone(report.recall_gain)
+
+    def test_deleted_candidates_are_dropped(self):
+        handler, data = filled_handler(100, 8, **INDEX)
+        search = handler.search_vectors
+
+        def deleting(*args, **kwargs):
+            status, results = search(*args, **kwargs)
+            handler.delete_by_id("vectors", [0])
+            return status, results
+
+        with mock.patch.object(handler, "search_vectors",
+                               side_effect=deleting):
+            status, results, report = search_and_rerank(
+                handler,
+                "vectors",
+                3,
+                data[:1],
+                search_params={"nprobe": 16})
+        self.assertTrue(status.ok())
+        self.assertEqual(report.missing, 1)
+        self.assertNotIn(0, results.id_array[0].tolist())
+
+    def test_errors_are_returned(self):
+        handler, data = filled_handler(10, 8, **INDEX)
+        status, results, _ = search_and_rerank(handler, "missing", 3,
+                                               data[:1])
+        self.assertFalse(status.ok())
+        self.assertIsNone(results)
+
+
+if __name__ == "__main__":
+    unittest.main()
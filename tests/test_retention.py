@@ -0,0 +1,148 @@
+import datetime
+import unittest
+
+from http_request.abstracts import CollectionSchema, PartitionParam
+from http_request.constants import MetricType, Status
+from http_request.retention import (RetentionManager, RetentionPolicy,
+                                    deleted_ratio, row_size)
+
+TODAY = datetime.date(2021, 7, 31)
+# 8 floats and an id
+ROW = row_size(8, MetricType.L2)
+
+
+def segment(stored, live, index_name="IDMAP", index_size=None):
+    document = {
+        "name": "segment",
+        "count": live,
+        "data_size": stored * ROW + (index_size or 0),
+        "index_name": index_name,
+    }
+    if index_size is not None:
+        document["index_size"] = index_size
+    return document
+
+
+class Handler:
+    """
+    Server stub holding the partitions and segments of one collection
+    """
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.dropped = []
+        self.compactions = 0
+
+    def show_partitions(self, collection_name, timeout, offset, page_size):
+        tags = sorted(self.partitions)[offset:offset + page_size]
+        return Status(), [PartitionParam(collection_name, tag) for tag in tags]
+
+    def show_collection_info(self, collection_name, timeout):
+        partitions = [{
+            "tag": tag,
+            "count": sum(item["count"] for item in segments),
+            "segments": segments,
+        } for tag, segments in self.partitions.items()]
+        count = sum(partition["count"] for partition in partitions)
+        return Status(), {"count": count, "partitions": partitions}
+
+    def describe_collection(self, collection_name, timeout):
+        return Status(), CollectionSchema(collection_name, 8, 1024,
+                                          MetricType.L2)
+
+    def drop_partition(self, collection_name, partition_tag, timeout):
+        self.partitions.pop(partition_tag)
+        self.dropped.append(partition_tag)
+        return Status()
+
+    def compact(self, collection_name):
+        self.compactions += 1
+        return Status()
+
+
+class DeletedRatioTest(unittest.TestCase):
+    def test_index_bytes_are_not_counted_as_deleted_rows(self):
+        stats = Handler({
+            "_default": [segment(100, 100, "IVF_FLAT", index_size=50000)],
+        }).show_collection_info("trends", 10)[1]
+        self.assertEqual(deleted_ratio(stats, ROW), 0.0)
+
+        stats = Handler({
+            "_default": [segment(100, 50), segment(100, 100, "IVF_FLAT")],
+        }).show_collection_info("trends", 10)[1]
+        self.assertAlmostEqual(deleted_ratio(stats, ROW), 0.5)
+
+
+class RetentionManagerTest(unittest.TestCase):
+    def manager(self, handler, max_age_days=30):
+        return RetentionManager(handler, ["trends"],
+                                RetentionPolicy(max_age_days=max_age_days,
+                                                compact_threshold=0.2))
+
+    def test_expired_partitions_are_dropped(self):
+        handler = Handler({
+            "_default": [segment(10, 10)],
+            "day_2021_05_01": [segment(10, 10)],
+            "day_2021_07_30": [segment(10, 10)],
+        })
+        report = self.manager(handler).apply("trends", today=TODAY)
+        self.assertEqual(report.expired, [("day_2021_05_01", 10)])
+        self.assertEqual(report.dropped, ["day_2021_05_01"])
+        self.assertEqual(handler.dropped, ["day_2021_05_01"])
+        self.assertFalse(report.compact)
+
+    def test_dry_run_changes_nothing(self):
+        handler = Handler({
+            "day_2021_05_01": [segment(10, 10)],
+            "day_2021_07_30": [segment(10, 2)],
+        })
+        report = self.manager(handler).apply("trends",
+                                             dry_run=True,
+                                             today=TODAY)
+        self.assertEqual(report.expired, [("day_2021_05_01", 10)])
+        self.assertTrue(report.compact)
+        self.assertEqual((handler.dropped, handler.compactions), ([], 0))
+
+    def test_compaction_waits_for_new_deletes(self):
+        handler = Handler({"_default": [segment(100, 50)]})
+        manager = self.manager(handler)
+        self.assertTrue(manager.apply("trends", today=TODAY).compact)
+        # the server has not compacted yet, the next beats leave it alone
+        self.assertFalse(manager.apply("trends", today=TODAY).compact)
+        self.assertFalse(manager.apply("trends", today=TODAY).compact)
+        self.assertEqual(handler.compactions, 1)
+
+        handler.partitions["_default"] = [segment(100, 40)]
+        self.assertTrue(manager.apply("trends", today=TODAY).compact)
+        self.assertEqual(handler.compactions, 2)
+
+    def test_compaction_resumes_after_the_server_compacted(self):
+        handler = Handler({"_default": [segment(100, 50)]})
+        manager = self.manager(handler)
+        self.assertTrue(manager.apply("trends", today=TODAY).compact)
+        # compacted, then fewer rows deleted than before the compaction
+        handler.partitions["_default"] = [segment(50, 30)]
+        report = manager.apply("trends", today=TODAY)
+        self.assertAlmostEqual(report.deleted_ratio, 0.4)
+        self.assertTrue(report.compact)
+        self.assertEqual(handler.compactions, 2)
+
+    def test_the_ratio_is_measured_after_the_drops(self):
+        handler = Handler({
+            "_default": [segment(100, 100)],
+            "day_2021_05_01": [segment(100, 10)],
+        })
+        report = self.manager(handler).apply("trends", today=TODAY)
+        self.assertEqual(report.dropped, ["day_2021_05_01"])
+        self.assertEqual(report.deleted_ratio, 0.0)
+        self.assertFalse(report.compact)
+
+    def test_indexed_collections_are_not_compacted_every_pass(self):
+        handler = Handler({"_default": [segment(1000, 1000, "IVF_FLAT")]})
+        report = self.manager(handler).apply("trends", today=TODAY)
+        self.assertEqual(report.deleted_ratio, 0.0)
+        self.assertFalse(report.compact)
+        self.assertEqual(handler.compactions, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
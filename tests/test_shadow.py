@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from http_request.shadow import (ShadowMirror, ShadowReport, ShadowSample,
+                                 jaccard)
+from tests import filled_handler
+
+
+class JaccardTest(unittest.TestCase):
+    def test_overlaps(self):
+        self.assertEqual(
+            jaccard([[1, 2, 3], [-1, -1, -1], [1, 2, -1]],
+                    [[3, 2, 1], [-1, -1, -1], [2, 4, -1]]),
+            [1.0, 1.0, 1 / 3])
+
+
+class ShadowReportTest(unittest.TestCase):
+    def test_summary_per_pair(self):
+        report = ShadowReport(max_samples=3)
+        report.record(ShadowSample("a", "b", 1, 10, 0.1, 0.3, [0.5]))
+        report.record(ShadowSample("a", "b", 2, 10, 0.1, 0.2, [1.0, 0.9]))
+        report.record(ShadowSample("a", "b", 1, 10, 0.1, 0.0, error="down"))
+        report.record(ShadowSample("a", "c", 1, 10, 0.2, 0.1, [1.0]))
+        report.drop()
+        # the oldest sample is out of the window
+        summary = report.summary()
+        self.assertEqual(sorted(summary), ["a -> b", "a -> c"])
+        entry = summary["a -> b"]
+        self.assertEqual((entry["calls"], entry["queries"], entry["errors"]),
+                         (2, 3, 1))
+        self.assertAlmostEqual(entry["mean_overlap"], 0.95)
+        self.assertAlmostEqual(entry["delta_p50"], 0.1)
+        self.assertAlmostEqual(summary["a -> c"]["delta_p99"], -0.1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "shadow.json")
+            report.dump(path)
+            with open(path, encoding='utf-8') as file:
+                document = json.load(file)
+        self.assertEqual(document["dropped"], 1)
+        self.assertEqual(len(document["samples"]), 3)
+
+        report.reset()
+        self.assertEqual((report.samples, report.dropped), ([], 0))
+
+
+class ShadowMirrorTest(unittest.TestCase):
+    def test_searches_are_mirrored(self):
+        handler, data = filled_handler(
+            50, collection_names=("primary", "candidate"))
+        mirror = ShadowMirror({"primary": "candidate"}, fraction=1.0)
+        self.assertTrue(mirror.sampled("primary"))
+        self.assertFalse(mirror.sampled("candidate"))
+
+        _, results = handler.search_vectors("primary", 5, data[:3])
+        mirror.mirror(handler, "primary", 5, data[:3], None, None, 0.01,
+                      results)
+        mirror._executor.shutdown(wait=True)
+        sample, = mirror.report.samples
+        self.assertEqual(sample.overlaps, [1.0, 1.0, 1.0])
+        self.assertEqual((sample.candidate, sample.queries), ("candidate", 3))
+        self.assertIsNone(sample.error)
+
+    def test_failures_are_recorded(self):
+        handler, data = filled_handler(
+            50, collection_names=("primary", "candidate"))
+        handler.drop_collection("candidate")
+        mirror = ShadowMirror({"primary": "candidate"})
+        _, results = handler.search_vectors("primary", 5, data[:1])
+        mirror.mirror(handler, "primary", 5, data[:1], None, None, 0.01,
+                      results)
+        mirror._executor.shutdown(wait=True)
+        sample, = mirror.report.samples
+        self.assertIsNotNone(sample.error)
+        self.assertIsNone(sample.overlaps)
+
+    def test_searches_over_max_pending_are_dropped(self):
+        release = threading.Event()
+
+        class Handler:
+            def search_vectors(self, *args, **kwargs):
+                release.wait(5)
+                raise RuntimeError("candidate down")
+
+        mirror = ShadowMirror({"primary": "candidate"},
+                              max_workers=1,
+                              max_pending=2)
+        for _ in range(5):
+            mirror.mirror(Handler(), "primary", 5, [[0.0]], None, None, 0.01,
+                          None)
+        release.set()
+        mirror._executor.shutdown(wait=True)
+        self.assertEqual(mirror.report.dropped, 3)
+        self.assertEqual(len(mirror.report.samples), 2)
+        with self.assertRaises(ValueError):
+            ShadowMirror({}, fraction=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import types
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from http_request import handler as handler_module
+from http_request.encoder import IDS, VECTORS, VectorEncoder, row_chunks
+from http_request.handler import HttpHandler
+from milvus import ParamError
+
+
+class Response:
+    status_code = 201
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def json(self):
+        return {"ids": [str(id_) for id_ in self.ids]}
+
+
+class RowChunksTest(unittest.TestCase):
+    def test_arrays_are_sliced(self):
+        chunks = list(row_chunks(np.zeros((10, 2)), chunk_rows=4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+
+    def test_rows_and_chunks_are_mixed(self):
+        rows = [[1.0, 2.0], [3.0, 4.0], np.ones((3, 2)), np.zeros(2)]
+        chunks = list(row_chunks(iter(rows), chunk_rows=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1, 1])
+        self.assertEqual(chunks[0], [[1.0, 2.0], [3.0, 4.0]])
+        self.assertIsInstance(chunks[-1], np.ndarray)
+
+
+class IterDumpsTest(unittest.TestCase):
+    def test_the_body_matches_dumps(self):
+        encoder = VectorEncoder()
+        vectors = np.random.RandomState(3).random_sample(
+            (10, 4)).astype(np.float32)
+        document = {"ids": ["1"], "vectors": VECTORS}
+        pieces = list(encoder.iter_dumps(document, row_chunks(vectors, 3)))
+        self.assertEqual(len(pieces), 2 + 4)
+        self.assertEqual(b"".join(pieces), encoder.dumps(document, vectors))
+        self.assertEqual(
+            json.loads(b"".join(encoder.iter_dumps(document, []))),
+            {"ids": ["1"], "vectors": []})
+
+    def test_ids_are_streamed_in_chunks(self):
+        encoder = VectorEncoder()
+        vectors = np.ones((5, 2), dtype=np.float32)
+        ids = np.arange(5, dtype=np.int64) << 40
+        document = {"ids": IDS, "partition_tag": "day", "vectors": VECTORS}
+        pieces = list(
+            encoder.iter_dumps(document, row_chunks(vectors, 2),
+                               row_chunks(ids, 2)))
+        self.assertEqual(len(pieces), 1 + 3 + 1 + 3 + 1)
+        self.assertEqual(json.loads(b"".join(pieces)), {
+            "ids": [str(id_) for id_ in ids],
+            "partition_tag": "day",
+            "vectors": vectors.tolist()
+        })
+
+
+class AddVectorsStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = HttpHandler("127.0.0.1", 1)
+        self.bodies = []
+
+    def request(self, method, url, **kwargs):
+        self.assertIsInstance(kwargs["data"], types.GeneratorType)
+        self.bodies.append(json.loads(b"".join(kwargs["data"])))
+        return Response(self.bodies[-1]["ids"])
+
+    def test_the_body_is_streamed(self):
+        vectors = np.arange(20, dtype=np.float32).reshape(10, 2)
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               side_effect=self.request):
+            status, ids = self.handler.add_vectors_stream(
+                "vectors",
+                vectors,
+                ids=list(range(10)),
+                partition_tag="day",
+                chunk_rows=4,
+                validate=False)
+        self.assertTrue(status.ok())
+        self.assertEqual(ids, list(range(10)))
+        self.assertEqual(self.bodies[0]["partition_tag"], "day")
+        self.assertEqual(self.bodies[0]["vectors"], vectors.tolist())
+
+    def test_array_ids_are_streamed(self):
+        vectors = np.zeros((10, 2), dtype=np.float32)
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               side_effect=self.request):
+            status, ids = self.handler.add_vectors_stream(
+                "vectors",
+                vectors,
+                ids=np.arange(10, 20, dtype=np.int64),
+                chunk_rows=4,
+                validate=False)
+        self.assertTrue(status.ok())
+        self.assertEqual(ids, list(range(10, 20)))
+
+    def test_invalid_chunks_abort_the_request(self):
+        # the dimension is checked chunk by chunk against the collection
+        self.handler._dimensions["vectors"] = (2, False)
+        rows = [[1.0, 2.0], [3.0, 4.0], [5.0]]
+        with mock.patch.object(handler_module.requests,
+                               "request",
+                               side_effect=self.request):
+            with self.assertRaises(ParamError):
+                self.handler.add_vectors_stream("vectors",
+                                                iter(rows),
+                                                chunk_rows=2,
+                                                validate=True)
+        self.assertEqual(self.bodies, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from http_request.constants import Status
+from http_request.sync import (collection_ids, contains, plan_sync,
+                               sync_collection)
+from milvus import ParamError
+from tests import filled_handler
+
+
+class ContainsTest(unittest.TestCase):
+    def test_dense_and_sparse_ids(self):
+        values = np.array([1, 3, 5, 7])
+        reference = np.array([3, 4, 7])
+        self.assertEqual(contains(values, reference).tolist(),
+                         [False, True, False, True])
+        # too sparse for a bitmap
+        self.assertEqual(contains(values * 10**12, reference * 10**12)
+                         .tolist(), [False, True, False, True])
+        self.assertEqual(contains(values, np.empty(0, np.int64)).tolist(),
+                         [False] * 4)
+
+
+class PlanSyncTest(unittest.TestCase):
+    def test_differences(self):
+        plan = plan_sync([9, 2, 7, 4], [1, 2, 3, 4])
+        self.assertEqual(plan.new_rows.tolist(), [0, 2])
+        self.assertEqual(plan.removed_ids.tolist(), [1, 3])
+        self.assertEqual(plan.unchanged, 2)
+        with self.assertRaises(ParamError):
+            plan_sync([1, 1], [])
+
+
+class SyncCollectionTest(unittest.TestCase):
+    def setUp(self):
+        self.handler, _ = filled_handler(5, first_id=1)
+        self.ids = np.array([2, 4, 6, 8])
+        self.records = np.arange(16, dtype=np.float32).reshape(4, 4)
+
+    def test_the_collection_matches_the_source(self):
+        report = sync_collection(self.handler, "vectors", self.records,
+                                 self.ids)
+        self.assertTrue(report.status.ok())
+        self.assertEqual((report.inserted, report.deleted), (2, 3))
+        _, ids = collection_ids(self.handler, "vectors", page_size=2)
+        self.assertEqual(ids.tolist(), [2, 4, 6, 8])
+        _, vectors = self.handler.get_vectors_by_ids("vectors", [8])
+        self.assertEqual(list(vectors[0]), self.records[3].tolist())
+
+    def test_dry_run_changes_nothing(self):
+        report = sync_collection(self.handler,
+                                 "vectors",
+                                 self.records,
+                                 self.ids,
+                                 dry_run=True)
+        self.assertEqual(report.plan.removed_ids.tolist(), [1, 3, 5])
+        self.assertEqual((report.inserted, report.deleted), (0, 0))
+        _, ids = collection_ids(self.handler, "vectors")
+        self.assertEqual(ids.tolist(), [1, 2, 3, 4, 5])
+
+    def test_errors_are_reported(self):
+        report = sync_collection(self.handler, "missing", self.records,
+                                 self.ids)
+        self.assertIsNone(report.plan)
+        self.assertNotEqual(report.status.code, Status.SUCCESS)
+        with self.assertRaises(ParamError):
+            sync_collection(self.handler, "vectors", self.records, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
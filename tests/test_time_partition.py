@@ -0,0 +1,123 @@
+import datetime
+import json
+import unittest
+from unittest import mock
+
+from http_request.constants import Status
+from http_request.handler import HttpHandler
+from http_request.time_partition import (DAY, MONTH, WEEK, bucket_tag,
+                                         overlapping_tags, parse_bucket_tag)
+from milvus import ParamError
+
+
+class BucketTest(unittest.TestCase):
+    def test_tags(self):
+        day = datetime.date(2021, 6, 30)
+        self.assertEqual(bucket_tag(day, DAY), "day_2021_06_30")
+        self.assertEqual(bucket_tag(day, WEEK), "week_2021_06_28")
+        self.assertEqual(bucket_tag(day, MONTH), "month_2021_06")
+        self.assertEqual(parse_bucket_tag("week_2021_06_28"),
+                         (WEEK, datetime.date(2021, 6, 28)))
+        self.assertIsNone(parse_bucket_tag("_default"))
+        self.assertIsNone(parse_bucket_tag("day_2021_13_01"))
+
+    def test_overlapping_tags(self):
+        tags = ["day_2021_06_29", "day_2021_06_30", "month_2021_07", "trend"]
+        self.assertEqual(
+            overlapping_tags(tags, [("2021-06-30", "2021-07-02")]),
+            ["day_2021_06_30", "month_2021_07"])
+        with self.assertRaises(ParamError):
+            overlapping_tags(tags, [("2021-07-02", "2021-06-30")])
+
+
+class EnsurePartitionTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = HttpHandler("127.0.0.1", 1)
+        self.exists = Status(Status.ILLEGAL_ARGUMENT, "already exists")
+
+    def test_a_partition_created_meanwhile_is_taken(self):
+        listings = iter([(Status(), []), (Status(), ["day_2021_06_30"])])
+        with mock.patch.object(self.handler, "_partition_tags",
+                               side_effect=lambda *args: next(listings)), \
+                mock.patch.object(self.handler, "create_partition",
+                                  return_value=self.exists) as create:
+            status = self.handler._ensure_partition("trends",
+                                                    "day_2021_06_30", 10)
+            self.assertTrue(status.ok())
+            # known from now on
+            status = self.handler._ensure_partition("trends",
+                                                    "day_2021_06_30", 10)
+            self.assertTrue(status.ok())
+        self.assertEqual(create.call_count, 1)
+
+    def test_other_failures_are_returned(self):
+        with mock.patch.object(self.handler, "_partition_tags",
+                               return_value=(Status(), [])), \
+                mock.patch.object(self.handler, "create_partition",
+                                  return_value=self.exists):
+            status = self.handler._ensure_partition("trends",
+                                                    "day_2021_06_30", 10)
+        self.assertFalse(status.ok())
+
+
+class Response:
+    def __init__(self, status_code, document=None):
+        self.status_code = status_code
+        self._document = document or {}
+
+    def json(self):
+        return self._document
+
+
+class SearchRangesTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = HttpHandler("127.0.0.1", 1, partition_interval=3600)
+        self.searched = []
+
+    def request(self, method, url, **kwargs):
+        if method == "put":
+            body = json.loads(kwargs["data"])["search"]
+            self.searched.append(body.get("partition_tags", None))
+            return Response(200, {"num": 1, "result": [[]]})
+        return Response(201 if method == "post" else 204)
+
+    def search(self):
+        status, _ = self.handler.search_vectors(
+            "trends",
+            1, [[0.1, 0.2]],
+            search_params={},
+            query_ranges=[("2021-06-01", "2021-06-30")],
+            validate=False)
+        self.assertTrue(status.ok())
+
+    def test_searches_reuse_the_cached_partitions(self):
+        with mock.patch.object(self.handler, "_partition_tags",
+                               return_value=(Status(),
+                                             ["day_2021_06_29"])) as listed, \
+                mock.patch.object(self.handler, "_request",
+                                  side_effect=self.request):
+            self.search()
+            self.handler.create_partition("trends", "day_2021_06_30")
+            self.search()
+            self.handler.drop_partition("trends", "day_2021_06_29")
+            self.search()
+        self.assertEqual(listed.call_count, 1)
+        self.assertEqual(self.searched,
+                         [["day_2021_06_29"],
+                          ["day_2021_06_29", "day_2021_06_30"],
+                          ["day_2021_06_30"]])
+
+    def test_partitions_are_listed_again_after_the_interval(self):
+        self.handler._partition_interval = 0
+        with mock.patch.object(self.handler, "_partition_tags",
+                               return_value=(Status(),
+                                             ["day_2021_06_29"])) as listed, \
+                mock.patch.object(self.handler, "_request",
+                                  side_effect=self.request):
+            self.search()
+            self.search()
+        self.assertEqual(listed.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
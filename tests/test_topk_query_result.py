@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from http_request.abstracts import TopKQueryResult
+
+
+class Response:
+    def __init__(self, document):
+        self._document = document
+
+    def json(self):
+        return self._document
+
+
+def hit(_id, distance):
+    return {"id": str(_id), "distance": str(distance)}
+
+
+class TopKQueryResultTest(unittest.TestCase):
+    def setUp(self):
+        self.result = TopKQueryResult(
+            Response({
+                "num": 3,
+                "result": [
+                    [hit(4, 0.5), hit(2, 1.5), hit(7, 2.0)],
+                    [hit(9, 0.25), hit(-1, 0.0), hit(-1, 0.0)],
+                    [],
+                ],
+            }))
+
+    def test_arrays_pad_missing_hits(self):
+        np.testing.assert_array_equal(self.result.id_array,
+                                      [[4, 2, 7], [9, -1, -1], [-1, -1, -1]])
+        np.testing.assert_array_equal(
+            self.result.distance_array,
+            [[0.5, 1.5, 2.0], [0.25, np.inf, np.inf], [np.inf] * 3])
+        self.assertEqual(self.result.id_array.dtype, np.int64)
+
+    def test_rows_hold_query_results(self):
+        self.assertEqual(len(self.result), 3)
+        self.assertEqual(self.result.shape, (3, 3))
+        self.assertEqual([hit.id for hit in self.result[0]], [4, 2, 7])
+        self.assertEqual([hit.distance for hit in self.result[-3]],
+                         [0.5, 1.5, 2.0])
+        self.assertEqual([(hit.id, hit.distance) for hit in self.result[1]],
+                         [(9, 0.25)])
+        self.assertEqual(self.result[2], [])
+        self.assertEqual([len(row) for row in self.result[1:]], [1, 0])
+        self.assertEqual([len(row) for row in self.result], [3, 1, 0])
+        with self.assertRaises(IndexError):
+            self.result[3]
+
+    def test_from_arrays(self):
+        result = TopKQueryResult.from_arrays([[3, 1], [-1, -1]],
+                                             [[0.1, 0.2], [0.0, 0.0]])
+        self.assertEqual([hit.id for hit in result[0]], [3, 1])
+        self.assertEqual(result[1], [])
+        np.testing.assert_array_equal(result.id_array[0], [3, 1])
+        self.assertTrue(np.isinf(result.distance_array[1]).all())
+
+    def test_empty(self):
+        result = TopKQueryResult.empty(2)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[1], [])
+        self.assertEqual(result.id_array.shape, (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from http_request.constants import Status
+from http_request.handler import HttpHandler
+from http_request.vector_cache import VectorCache
+
+
+class Response:
+    status_code = 200
+
+    def json(self):
+        return {"code": 0, "message": "OK"}
+
+
+class VectorCacheTest(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = VectorCache()
+        vectors, found = cache.get("vectors", [1, 2])
+        self.assertIsNone(vectors)
+        cache.put("vectors", [1, 2], np.array([[1, 2], [3, 4]], np.float32))
+        vectors, found = cache.get("vectors", [2, 3])
+        self.assertEqual(found.tolist(), [True, False])
+        self.assertEqual(vectors[0].tolist(), [3, 4])
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_capacity_is_bounded(self):
+        cache = VectorCache(max_bytes=4 * 2 * 10)
+        for start in range(0, 100, 5):
+            ids = np.arange(start, start + 5)
+            cache.put("vectors", ids, np.ones((5, 2), np.float32))
+        self.assertEqual(len(cache), 10)
+        self.assertEqual(cache.evictions, 90)
+
+    def test_vectors_fetched_before_a_write_are_dropped(self):
+        cache = VectorCache()
+        generation = cache.generation("vectors")
+        cache.discard("vectors", [1])
+        cache.put("vectors", [1], np.ones((1, 2), np.float32),
+                  generation=generation)
+        self.assertEqual(len(cache), 0)
+        cache.put("vectors", [1], np.ones((1, 2), np.float32),
+                  generation=cache.generation("vectors"))
+        self.assertEqual(len(cache), 1)
+        cache.drop("vectors")
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.generation("vectors"), 2)
+
+
+class HandlerCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = HttpHandler("127.0.0.1", 1, vector_cache={})
+        self.cache = self.handler.vector_cache
+
+    def test_a_read_racing_a_delete_is_not_cached(self):
+        def fetch(collection_name, ids, timeout):
+            # the delete completes while the old vector is on its way
+            self.handler._forget_vectors(collection_name, ids)
+            return Status(), [[1.0, 2.0]]
+
+        with mock.patch.object(self.handler, "_fetch_vectors",
+                               side_effect=fetch):
+            status, vectors = self.handler.get_vectors_by_ids(
+                "vectors", [7], 10)
+        self.assertTrue(status.ok())
+        self.assertEqual(vectors, [[1.0, 2.0]])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_delete_invalidates_after_the_response(self):
+        def request(method, url, **kwargs):
+            # a read caches the vector while the delete is in flight
+            self.cache.put("vectors", [7], np.ones((1, 2), np.float32))
+            return Response()
+
+        with mock.patch.object(self.handler, "_request",
+                               side_effect=request):
+            status = self.handler.delete_by_id("vectors", [7], 10)
+        self.assertTrue(status.ok())
+        _, found = self.cache.get("vectors", [7])
+        self.assertFalse(found.any())
+
+
+if __name__ == "__main__":
+    unittest.main()